@@ -0,0 +1,243 @@
+from array import array
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import and_, case, func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import db, DATE_FORMAT, Assignment, Attendance, AttendanceMonth, AttendanceRollup, Exam, Score, Student, Submission
+from gradestats import class_rankings, exam_stats, mark_value
+
+def rollups_enabled():
+    return current_app.config.get('ANALYTICS_ROLLUPS', False)
+
+def bitmaps_enabled():
+    return current_app.config.get('ATTENDANCE_BITMAPS', False)
+
+def attendance_summary(by_period):
+    present = sum(p['present'] for p in by_period)
+    total = sum(p['total'] for p in by_period)
+    percentage = round((present / total * 100), 1) if total > 0 else 0
+    return {'percentage': percentage, 'present': present, 'total': total, 'byPeriod': by_period}
+
+def student_attendance(student_id):
+    """Present/total counts for a student, grouped by period in a single query."""
+    if rollups_enabled():
+        rows = AttendanceRollup.query.filter_by(student_id=student_id).order_by(AttendanceRollup.period).all()
+        return attendance_summary([r.to_dict() for r in rows])
+
+    rows = db.session.execute(
+        db.select(Attendance.period, func.sum(case((Attendance.status == 'P', 1), else_=0)), func.count())
+        .where(Attendance.student_id == student_id)
+        .group_by(Attendance.period).order_by(Attendance.period)
+    ).all()
+    return attendance_summary([{'period': p, 'present': present, 'total': total} for p, present, total in rows])
+
+def student_scores(student_id):
+    """Every score for a student joined with its exam in one query."""
+    rows = db.session.execute(
+        db.select(Exam.title, Exam.total_marks, Score.marks_obtained, Score.marker)
+        .join(Exam, Exam.id == Score.exam_id)
+        .where(Score.student_id == student_id)
+    ).all()
+    return [{'exam': title, 'total': total, 'obtained': mark_value(marks), 'marker': marker} for title, total, marks, marker in rows]
+
+def apply_attendance_deltas(deltas):
+    """Adds {(student_id, period): [present, total]} deltas to the rollup table.
+
+    One INSERT ... ON CONFLICT DO UPDATE adds them in SQL, so the rollup never
+    rewrites a count it read earlier.
+    """
+    values = [{'student_id': student_id, 'period': period, 'present': present, 'total': total}
+              for (student_id, period), (present, total) in deltas.items() if present or total]
+    if not values: return
+    stmt = sqlite_insert(AttendanceRollup)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['student_id', 'period'],
+        set_={'present': AttendanceRollup.present + stmt.excluded.present, 'total': AttendanceRollup.total + stmt.excluded.total}), values)
+
+def rebuild_rollups():
+    """Recomputes the whole rollup table from Attendance. Run once after enabling ANALYTICS_ROLLUPS."""
+    db.session.execute(db.delete(AttendanceRollup))
+    db.session.execute(insert(AttendanceRollup).from_select(
+        ['student_id', 'period', 'present', 'total'],
+        db.select(Attendance.student_id, Attendance.period, func.sum(case((Attendance.status == 'P', 1), else_=0)), func.count())
+        .group_by(Attendance.student_id, Attendance.period)
+    ))
+
+# --- MONTHLY ATTENDANCE BITMAPS ---
+MONTH = func.strftime('%Y-%m', Attendance.date)
+_DAY_BIT = db.literal(1).op('<<')(db.cast(func.strftime('%d', Attendance.date), db.Integer) - 1)
+
+def month_bits_select(*where):
+    """(student_id, month, period, class_id, present, marked) folded from Attendance in SQL. Each day is one
+    bit and (date, student, period) is unique, so the SUM of a group's bits is their OR."""
+    return (db.select(Attendance.student_id, MONTH.label('month'), Attendance.period, func.max(Attendance.class_id),
+                      func.sum(case((Attendance.status == 'P', _DAY_BIT), else_=0)), func.sum(_DAY_BIT))
+            .where(*where).group_by(Attendance.student_id, MONTH, Attendance.period))
+
+def rebuild_attendance_months():
+    """Recomputes the whole AttendanceMonth table. Run once after enabling ATTENDANCE_BITMAPS."""
+    db.session.execute(db.delete(AttendanceMonth))
+    db.session.execute(insert(AttendanceMonth).from_select(
+        ['student_id', 'month', 'period', 'class_id', 'present', 'marked'], month_bits_select(True)))
+
+def attendance_months(student_ids=None, class_id=None, month_from=None, month_to=None):
+    """[{'studentId', 'month', 'period', 'present', 'marked'}] bitmasks for some students or a class.
+
+    Read from AttendanceMonth when ATTENDANCE_BITMAPS is on, otherwise folded from
+    Attendance on the fly (one grouped query over the student/class date index).
+    """
+    if bitmaps_enabled():
+        t = AttendanceMonth
+        where = [t.student_id.in_(student_ids) if student_ids is not None else t.class_id == class_id]
+        if month_from: where.append(t.month >= month_from)
+        if month_to: where.append(t.month <= month_to)
+        rows = db.session.execute(db.select(t.student_id, t.month, t.period, t.class_id, t.present, t.marked)
+                                  .where(*where).order_by(t.student_id, t.month, t.period)).all()
+    else:
+        where = [Attendance.student_id.in_(student_ids) if student_ids is not None else Attendance.class_id == class_id]
+        if month_from: where.append(Attendance.date >= parse_month(month_from))
+        if month_to: where.append(Attendance.date < next_month(parse_month(month_to)))
+        rows = db.session.execute(month_bits_select(*where).order_by(Attendance.student_id, MONTH, Attendance.period)).all()
+    return [{'studentId': sid, 'month': month, 'period': period, 'present': present, 'marked': marked}
+            for sid, month, period, _, present, marked in rows]
+
+def bits_summary(months):
+    """attendance_summary() for bitmask rows: present/total are popcounts, per period."""
+    by_period = {}
+    for m in months:
+        p = by_period.setdefault(m['period'], {'period': m['period'], 'present': 0, 'total': 0})
+        p['present'] += m['present'].bit_count()
+        p['total'] += m['marked'].bit_count()
+    return attendance_summary([by_period[p] for p in sorted(by_period)])
+
+def class_heatmap(class_id, month):
+    """Per-day present/total for a class over one month, plus each student's bitmasks for the cells."""
+    first = parse_month(month)
+    days = (next_month(first) - first).days
+    months = attendance_months(class_id=class_id, month_from=month, month_to=month)
+    present, total = [0] * days, [0] * days
+    for m in months:
+        for d in range(days):
+            bit = 1 << d
+            if m['marked'] & bit:
+                total[d] += 1
+                present[d] += bool(m['present'] & bit)
+    return {'classId': class_id, 'month': month, 'students': months,
+            'days': [{'date': first.replace(day=d + 1).isoformat(), 'present': present[d], 'total': total[d]} for d in range(days)]}
+
+def parse_month(value):
+    """'YYYY-MM' -> the date of its first day; raises ValueError on anything else."""
+    return datetime.strptime(value, '%Y-%m').date()
+
+def next_month(first):
+    return date(first.year + first.month // 12, first.month % 12 + 1, 1)
+
+# --- DATES ---
+def parse_date(value):
+    """A date from 'MM/DD/YYYY' (as the app shows dates, optionally followed by ', time') or ISO
+    'YYYY-MM-DD'; raises ValueError on anything else."""
+    if isinstance(value, date): return value
+    text = str(value).split(',')[0].strip()
+    try: return datetime.strptime(text, DATE_FORMAT).date()
+    except ValueError: return date.fromisoformat(text)
+
+def date_key(col):
+    """Sortable YYYYMMDD expression for the 'MM/DD/YYYY...' strings stored in Assignment.date
+    and Submission.submission_date."""
+    return func.substr(col, 7, 4, type_=db.String) + func.substr(col, 1, 2) + func.substr(col, 4, 2)
+
+def parse_date_key(value):
+    """'MM/DD/YYYY' -> 'YYYYMMDD'; raises ValueError on anything else."""
+    return datetime.strptime(value, DATE_FORMAT).strftime('%Y%m%d')
+
+def class_attendance(class_id, date_from=None, date_to=None, period=None):
+    """Per-student present/total for a class in one grouped outer join (students with no records included)."""
+    on = [Attendance.student_id == Student.id]
+    if date_from: on.append(Attendance.date >= parse_date(date_from))
+    if date_to: on.append(Attendance.date <= parse_date(date_to))
+    if period: on.append(Attendance.period == period)
+    rows = db.session.execute(
+        db.select(Student.id, Student.name, Student.roll,
+                  func.coalesce(func.sum(case((Attendance.status == 'P', 1), else_=0)), 0), func.count(Attendance.id))
+        .outerjoin(Attendance, and_(*on))
+        .where(Student.class_id == class_id)
+        .group_by(Student.id, Student.name, Student.roll).order_by(Student.roll)
+    ).all()
+    return [{'studentId': sid, 'name': name, 'roll': roll, 'present': present, 'total': total,
+             'percentage': round((present / total * 100), 1) if total > 0 else 0}
+            for sid, name, roll, present, total in rows]
+
+def exam_columns(*where):
+    """Every matching exam with its marks as one array('d') column, from one outer join.
+
+    [{'examId', 'title', 'total', 'studentIds', 'marks', 'absent', 'exempt'}] in exam id order;
+    absent/exempt scores are only counted. Scores of students that are not (or no longer)
+    in the exam's class are left out.
+    """
+    rows = db.session.execute(
+        db.select(Exam.id, Exam.title, Exam.total_marks, Student.id, Score.marks_obtained, Score.marker)
+        .outerjoin(Score, Score.exam_id == Exam.id)
+        .outerjoin(Student, and_(Student.id == Score.student_id, Student.class_id == Exam.class_id))
+        .where(*where)
+        .order_by(Exam.id)
+    ).all()
+    exams = {}
+    for exam_id, title, total, student_id, marks, marker in rows:
+        e = exams.get(exam_id)
+        if e is None:
+            e = exams[exam_id] = {'examId': exam_id, 'title': title, 'total': total, 'studentIds': [],
+                                  'marks': array('d'), 'absent': 0, 'exempt': 0}
+        if student_id is None: continue  # no scores, or only a deleted student's
+        if marker: e[marker] += 1
+        elif marks is not None:
+            e['studentIds'].append(student_id)
+            e['marks'].append(marks)
+    return list(exams.values())
+
+def _exam_stats(e, ranking):
+    return {'examId': e['examId'], 'title': e['title'], 'total': e['total'],
+            **exam_stats(e['studentIds'], e['marks'], e['total'], e['absent'], e['exempt'], ranking=ranking)}
+
+def class_exam_stats(class_id):
+    """Count, mean/std, percentiles and a percentage histogram for every exam of a class (gradestats.py)."""
+    return [_exam_stats(e, ranking=False) for e in exam_columns(Exam.class_id == class_id)]
+
+def exam_statistics(exam_id):
+    """class_exam_stats() for one exam plus its rank list; None if there is no such exam."""
+    exams = exam_columns(Exam.id == exam_id)
+    return _exam_stats(exams[0], ranking=True) if exams else None
+
+def class_ranking(class_id):
+    """Students of a class ranked by their mean percentage over its exams, with the same statistics."""
+    return {'classId': class_id, **class_rankings(exam_columns(Exam.class_id == class_id))}
+
+def submission_matrix(class_id, today=None):
+    """Student x assignment hand-in status for a class from one grouped outer join.
+
+    A student's first submission decides the status: 'submitted' on or before the
+    due date, 'late' after it; with none it is 'missing' once the due date has
+    passed and 'pending' before.
+    """
+    today = today or datetime.now().strftime('%Y%m%d')
+    first = func.min(date_key(Submission.submission_date))
+    due = date_key(Assignment.date)
+    status = case((first.is_(None), case((due < today, 'missing'), else_='pending')),
+                  (first > due, 'late'), else_='submitted')
+    rows = db.session.execute(
+        db.select(Student.id, Student.name, Student.roll, Assignment.id, Assignment.title, Assignment.date,
+                  Assignment.category, status)
+        .outerjoin(Assignment, Assignment.class_id == Student.class_id)
+        .outerjoin(Submission, and_(Submission.assignment_id == Assignment.id, Submission.student_id == Student.id))
+        .where(Student.class_id == class_id)
+        .group_by(Student.id, Student.name, Student.roll, Assignment.id, Assignment.title, Assignment.date, Assignment.category)
+        .order_by(Student.roll, due, Assignment.id)
+    ).all()
+    students, assignments = {}, {}
+    for sid, name, roll, aid, title, due_on, category, state in rows:
+        s = students.setdefault(sid, {'studentId': sid, 'name': name, 'roll': roll, 'statuses': {}})
+        if aid is None: continue
+        s['statuses'][aid] = state
+        a = assignments.setdefault(aid, {'id': aid, 'title': title, 'date': due_on, 'category': category,
+                                         'counts': {'submitted': 0, 'late': 0, 'missing': 0, 'pending': 0}})
+        a['counts'][state] += 1
+    return {'classId': class_id, 'assignments': list(assignments.values()), 'students': list(students.values())}
@@ -0,0 +1,61 @@
+"""Assignments, uploads and submissions."""
+from flask import Blueprint, current_app, g, jsonify, request
+from database import Class, Assignment, Submission
+from listing import DEFAULT_LIMIT, list_response
+from filestore import upload_response, download_response
+from services import cache, files, storage
+from analytics import parse_date_key, submission_matrix
+
+bp = Blueprint('assignments', __name__)
+
+# --- ASSIGNMENTS ---
+@bp.route('/api/assignments', methods=['GET', 'POST'])
+@cache.cached('assignments')
+def handle_assignments():
+    if request.method == 'GET':
+        q = Assignment.query
+        if request.args.get('classId'): q = q.filter_by(class_id=request.args['classId'])
+        return list_response(q, Assignment.id, Assignment.to_dict, request.args)
+    data = request.json
+    if not data.get('title') or not data.get('date'): return jsonify({'error': 'Missing assignment details'}), 400
+    if not data.get('classId') or not Class.query.get(data['classId']): return jsonify({'error': 'Class not found'}), 404
+    try: parse_date_key(data['date'])
+    except ValueError: return jsonify({'error': 'Dates must be MM/DD/YYYY'}), 400
+    return jsonify(storage.add_assignment(data)), 201
+
+@bp.route('/api/assignments/<assignment_id>', methods=['DELETE'])
+@cache.invalidates('assignments')
+def delete_assignment(assignment_id):
+    if storage.delete_assignment(assignment_id): return jsonify({'msg': 'Deleted'})
+    return jsonify({'error': 'Not found'}), 404
+
+@bp.route('/api/classes/<class_id>/submissions/matrix', methods=['GET'])
+def get_submission_matrix(class_id):
+    if not Class.query.get(class_id): return jsonify({'error': 'Not found'}), 404
+    return jsonify(submission_matrix(class_id))
+
+# --- UPLOADS & SUBMISSIONS ---
+@bp.route('/api/upload', methods=['POST'])
+def file_upload():
+    config = current_app.config
+    owner = g.teacher['id'] if g.teacher else None
+    return upload_response(files, storage, config['UPLOAD_MAX_BYTES'], config['UPLOAD_QUOTA_BYTES'], owner, 'assignments.download_file')
+
+@bp.route('/api/files/<upload_id>', methods=['GET'])
+def download_file(upload_id):
+    return download_response(files, storage, upload_id)
+
+@bp.route('/api/submissions', methods=['GET', 'POST'])
+def handle_submissions():
+    if request.method == 'POST':
+        data = request.json
+        if not all(data.get(k) for k in ('assignmentId', 'studentId', 'fileUrl')):
+            return jsonify({'error': 'assignmentId, studentId and fileUrl are required'}), 400
+        submission = storage.add_submission(data)
+        if not submission: return jsonify({'error': 'Assignment not found'}), 404
+        return jsonify(submission), 201
+    q = Submission.query
+    if request.args.get('assignmentId'): q = q.filter_by(assignment_id=request.args['assignmentId'])
+    if request.args.get('studentId'): q = q.filter_by(student_id=request.args['studentId'])
+    # History is always paged (new endpoint, no plain-list clients to keep)
+    return list_response(q, Submission.id, Submission.to_dict, {'limit': DEFAULT_LIMIT, **request.args})
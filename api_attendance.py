@@ -0,0 +1,40 @@
+"""Attendance: roll call, per-student monthly bitmaps and the class heatmap."""
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from database import Class
+from services import DATE_ERROR, storage
+from analytics import attendance_months, bits_summary, class_heatmap, parse_month
+
+bp = Blueprint('attendance', __name__)
+
+@bp.route('/api/attendance', methods=['GET', 'POST'])
+def handle_attendance():
+    if request.method == 'POST':
+        if not isinstance(request.json, list): return jsonify({'error': 'Expected a list of attendance records'}), 400
+        try: return jsonify({'msg':'Saved', **storage.save_attendance(request.json)}), 201
+        except ValueError: return jsonify({'error': DATE_ERROR}), 400
+    # ?date=, or ?classId= with an optional from/to range
+    args = request.args
+    if not args.get('date') and not args.get('classId'): return jsonify([])
+    try: return jsonify(storage.list_attendance(args.get('date'), args.get('classId'), args.get('from'), args.get('to')))
+    except ValueError: return jsonify({'error': DATE_ERROR}), 400
+
+@bp.route('/api/students/<student_id>/attendance/months', methods=['GET'])
+def get_student_attendance_months(student_id):
+    # ?from=YYYY-MM&to=YYYY-MM: day bitmasks per month and period, and the percentage over the range
+    args = request.args
+    try:
+        for key in ('from', 'to'):
+            if args.get(key): parse_month(args[key])
+    except ValueError:
+        return jsonify({'error': 'from/to must be YYYY-MM'}), 400
+    months = attendance_months([student_id], month_from=args.get('from'), month_to=args.get('to'))
+    return jsonify({'studentId': student_id, 'months': months, 'summary': bits_summary(months)})
+
+@bp.route('/api/classes/<class_id>/attendance/heatmap', methods=['GET'])
+def get_class_heatmap(class_id):
+    # ?month=YYYY-MM (default: this month): per-day totals plus each student's day bitmasks
+    if not Class.query.get(class_id): return jsonify({'error': 'Not found'}), 404
+    month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+    try: return jsonify(class_heatmap(class_id, month))
+    except ValueError: return jsonify({'error': 'month must be YYYY-MM'}), 400
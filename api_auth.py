@@ -0,0 +1,49 @@
+"""Signup, login and the token check in front of every /api/ request."""
+from flask import Blueprint, current_app, g, jsonify, request
+from database import db, Teacher
+from auth import request_token
+from services import sessions, storage
+import tenancy
+
+bp = Blueprint('auth', __name__)
+
+PUBLIC_ENDPOINTS = {'auth.signup', 'auth.login'}
+
+@bp.before_app_request
+def authenticate_request():
+    if not request.path.startswith('/api/') or request.endpoint in PUBLIC_ENDPOINTS: return None
+    g.teacher = sessions.verify(request_token(request) or '')
+    if g.teacher is None and current_app.config['AUTH_REQUIRED']:
+        return jsonify({'error': 'Authentication required'}), 401
+    if g.teacher is not None: tenancy.enter(tenancy.scope_for(g.teacher))  # every query below sees only this teacher's rows
+    return None
+
+@bp.route('/api/signup', methods=['POST'])
+def signup():
+    # An invite (`flask --app server invite <schoolId>`) joins its school; without one the teacher gets a school of their own
+    data = request.json
+    school_id = None
+    if data.get('invite'):
+        school_id = sessions.invited_school(data['invite'])
+        if school_id is None: return jsonify({'error': 'Invalid or expired invite'}), 400
+    try: teacher = storage.add_user(data, school_id)
+    except ValueError as exc: return jsonify({'error': str(exc)}), 400
+    if not teacher: return jsonify({'error': 'Email already registered'}), 400
+    return jsonify(teacher), 201
+
+@bp.route('/api/login', methods=['POST'])
+def login():
+    data = request.json
+    teacher = storage.authenticate(data['email'], data['password'])
+    if teacher: return jsonify({**teacher, 'token': sessions.issue(teacher)})
+    return jsonify({'error': 'Invalid credentials'}), 401
+
+@bp.route('/api/teacher/<id>/notepad', methods=['PUT'])
+def update_notepad(id):
+    if g.teacher and g.teacher['id'] != id: return jsonify({'error': 'Not your notepad'}), 403
+    teacher = Teacher.query.get(id)
+    if teacher:
+        teacher.notepad = request.json.get('notepad', '')
+        db.session.commit()
+        return jsonify({'msg': 'Saved'})
+    return jsonify({'error': 'Not found'}), 404
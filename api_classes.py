@@ -0,0 +1,92 @@
+"""Classes and their students: CRUD, analytics, rankings, reports and roster import."""
+from flask import Blueprint, jsonify, request
+from database import Class
+from listing import list_response, requested_fields, eager
+from services import DATE_ERROR, cache, jobs, storage
+from analytics import class_attendance, class_exam_stats, class_ranking, parse_date
+import roster
+import tasks
+
+bp = Blueprint('classes', __name__)
+
+# --- CLASS MANAGEMENT (Fixed) ---
+@bp.route('/api/classes', methods=['GET'])
+@cache.cached('classes')
+def get_classes():
+    fields = requested_fields(request.args)
+    embed = fields is None or 'students' in fields
+    q = eager(Class.query, Class.students) if embed else Class.query
+    return list_response(q, Class.id, lambda c: c.to_dict(students=embed), request.args)
+
+@bp.route('/api/classes', methods=['POST'])
+@cache.invalidates('classes')
+def create_class():
+    return jsonify(storage.add_class(request.json)), 201
+
+@bp.route('/api/classes/<class_id>', methods=['DELETE'])
+def delete_class(class_id):
+    if not Class.query.get(class_id): return jsonify({'error': 'Not found'}), 404
+    job = jobs.submit('class-delete', tasks.delete_class, storage, class_id, lambda: cache.invalidate('classes', 'exams', 'assignments'))
+    return jsonify({'msg': 'Deleting', 'job': job}), 202
+
+@bp.route('/api/classes/<class_id>/analytics', methods=['GET'])
+def get_class_analytics(class_id):
+    if not Class.query.get(class_id): return jsonify({'error': 'Not found'}), 404
+    args = request.args
+    try:
+        attendance = class_attendance(class_id, args.get('from'), args.get('to'), args.get('period'))
+    except ValueError:
+        return jsonify({'error': DATE_ERROR}), 400
+    return jsonify({'classId': class_id, 'attendance': attendance, 'exams': class_exam_stats(class_id)})
+
+@bp.route('/api/classes/<class_id>/rankings', methods=['GET'])
+def get_class_rankings(class_id):
+    # Students ranked by mean percentage over the class's exams
+    if not Class.query.get(class_id): return jsonify({'error': 'Not found'}), 404
+    return jsonify(class_ranking(class_id))
+
+@bp.route('/api/classes/<class_id>/reports', methods=['POST'])
+def create_class_report(class_id):
+    if not Class.query.get(class_id): return jsonify({'error': 'Not found'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        for key in ('from', 'to'):
+            if data.get(key): parse_date(data[key])
+    except ValueError:
+        return jsonify({'error': DATE_ERROR}), 400
+    return jsonify(jobs.submit('class-report', tasks.class_report, class_id, data.get('from'), data.get('to'), data.get('period'))), 202
+
+# --- STUDENT MANAGEMENT ---
+@bp.route('/api/classes/<class_id>/students', methods=['POST'])
+@cache.invalidates('classes')
+def add_student(class_id):
+    data = request.json
+    if not data.get('name') or not data.get('roll'): return jsonify({'error': 'Missing student details'}), 400
+    student = storage.add_student(class_id, data)
+    if not student: return jsonify({'error': 'Class not found'}), 404
+    return jsonify(student), 201
+
+@bp.route('/api/students/<student_id>', methods=['PUT', 'DELETE'])
+@cache.invalidates('classes')
+def handle_student(student_id):
+    if request.method == 'DELETE':
+        if storage.delete_student(student_id): return jsonify({'msg': 'Deleted'})
+        return jsonify({'error': 'Not found'}), 404
+    student = storage.update_student(student_id, request.json)
+    if not student: return jsonify({'error': 'Not found'}), 404
+    return jsonify(student)
+
+@bp.route('/api/students/<student_id>/analytics', methods=['GET'])
+def get_student_analytics(student_id):
+    return jsonify(storage.student_analytics(student_id))
+
+@bp.route('/api/classes/<class_id>/students/import', methods=['POST'])
+def import_students(class_id):
+    if not Class.query.get(class_id): return jsonify({'error': 'Class not found'}), 404
+    upload = request.files.get('file')
+    filename = (upload.filename or '') if upload else ''
+    fmt = request.args.get('format') or ('xlsx' if filename.lower().endswith('.xlsx') else 'csv')
+    if fmt not in roster.READERS: return jsonify({'error': 'format must be csv or xlsx'}), 400
+    if fmt == 'xlsx' and not roster.XLSX: return jsonify({'error': 'XLSX import needs openpyxl installed'}), 415
+    path = roster.spool(upload.stream if upload else request.stream, fmt)
+    return jsonify(jobs.submit('roster-import', roster.import_roster, storage, class_id, path, fmt, lambda: cache.invalidate('classes'))), 202
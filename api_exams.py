@@ -0,0 +1,66 @@
+"""Exams, marks sheets and grade statistics."""
+from flask import Blueprint, jsonify, request
+from database import db, Class, Exam
+from listing import list_response
+from storage import StaleVersion
+from services import cache, storage
+from analytics import exam_statistics
+
+bp = Blueprint('exams', __name__)
+
+@bp.route('/api/exams', methods=['GET', 'POST'])
+@cache.cached('exams')
+def handle_exams():
+    if request.method == 'GET':
+        q = Exam.query
+        if request.args.get('classId'): q = q.filter_by(class_id=request.args['classId'])
+        return list_response(q, Exam.id, Exam.to_dict, request.args)
+    if not db.session.get(Class, (request.json or {}).get('classId')): return jsonify({'error': 'Class not found'}), 404
+    storage.add_exam(request.json)
+    return jsonify({'msg': 'Created'}), 201
+
+@bp.route('/api/exams/<exam_id>', methods=['DELETE'])
+@cache.invalidates('exams')
+def delete_exam(exam_id):
+    if storage.delete_exam(exam_id): return jsonify({'msg': 'Deleted'})
+    return jsonify({'error': 'Not found'}), 404
+
+@bp.route('/api/exams/<exam_id>/stats', methods=['GET'])
+def get_exam_stats(exam_id):
+    # Percentiles, mean/std, histogram and the rank list (gradestats.py)
+    stats = exam_statistics(exam_id)
+    if stats is None: return jsonify({'error': 'Not found'}), 404
+    return jsonify(stats)
+
+@bp.route('/api/scores', methods=['POST', 'GET'])
+def handle_scores():
+    if request.method == 'POST':
+        # marks: a number, or AB / EX for absent / exempt. A list of records is upserted as is;
+        # {examId, version, changes: [{studentId, marks}]} writes only the changed cells of one exam sheet
+        data = request.json
+        if isinstance(data, dict): return save_score_changes(data)
+        try: return jsonify({'msg': 'Saved', 'saved': storage.save_scores(data)}), 201
+        except ValueError as exc: return jsonify({'error': str(exc)}), 400
+    eid = request.args.get('examId')
+    return jsonify(storage.list_scores(eid)) if eid else jsonify([])
+
+@bp.route('/api/exams/<exam_id>/scores', methods=['GET'])
+def get_score_sheet(exam_id):
+    # The marks sheet with the version to send changes against; ?since=<version> gives only the cells written after it
+    since = request.args.get('since')
+    if since is not None and not since.isdigit(): return jsonify({'error': 'since must be an exam version'}), 400
+    sheet = storage.score_sheet(exam_id, int(since) if since is not None else None)
+    if sheet is None: return jsonify({'error': 'Not found'}), 404
+    return jsonify(sheet)
+
+def save_score_changes(data):
+    changes = data.get('changes')
+    if not data.get('examId') or not isinstance(data.get('version'), int) or not isinstance(changes, list) \
+            or not all(isinstance(c, dict) and c.get('studentId') and 'marks' in c for c in changes):
+        return jsonify({'error': 'Expected {examId, version, changes: [{studentId, marks}]}'}), 400
+    try: version = storage.save_score_changes(data['examId'], data['version'], changes)
+    except ValueError as exc: return jsonify({'error': str(exc)}), 400
+    except StaleVersion as exc:
+        return jsonify({'error': 'Exam sheet changed', 'version': exc.version, 'changes': exc.changes}), 409
+    if version is None: return jsonify({'error': 'Exam not found'}), 404
+    return jsonify({'msg': 'Saved', 'examId': data['examId'], 'version': version, 'saved': len(changes)}), 201
@@ -0,0 +1,40 @@
+"""Background job status and cancellation, and the CSV/JSON exports."""
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from database import Job
+from jobs import ACTIVE
+from listing import list_response
+from services import jobs
+import roster
+import tenancy
+
+bp = Blueprint('jobs', __name__)
+
+@bp.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    q = Job.query
+    for arg in ('status', 'kind'):
+        if request.args.get(arg): q = q.filter(getattr(Job, arg) == request.args[arg])
+    return list_response(q, Job.id, Job.to_dict, request.args)
+
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if not job: return jsonify({'error': 'Not found'}), 404
+    return jsonify(job.to_dict())
+
+@bp.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = jobs.cancel(job_id)
+    if not job: return jsonify({'error': 'Not found'}), 404
+    if job.status not in ACTIVE: return jsonify({'error': f'Job already {job.status}'}), 409
+    return jsonify(job.to_dict())
+
+@bp.route('/api/export/<kind>', methods=['GET'])
+def export(kind):
+    if kind not in roster.EXPORTS: return jsonify({'error': 'Unknown export'}), 404
+    class_id = request.args.get('classId')
+    if request.args.get('format', 'csv') != 'csv':
+        query, key = roster.export_query(kind, class_id)
+        return list_response(query, key, roster.serializer(kind), request.args)
+    return Response(stream_with_context(tenancy.carry_iter(roster.export_csv(kind, class_id))), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={kind}.csv'})
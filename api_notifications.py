@@ -0,0 +1,74 @@
+"""Notifications, their monthly summaries and compaction, and the server-sent event feed."""
+from datetime import datetime, timedelta
+from flask import Blueprint, current_app, jsonify, request
+from database import db, Class, Notification, NotificationSummary
+from listing import list_response, since_page
+from storage import parse_timestamp
+from services import cache, events, jobs, storage
+from events import sse_response
+import tasks
+import tenancy
+
+bp = Blueprint('notifications', __name__)
+
+@bp.route('/api/notifications', methods=['GET', 'POST'])
+@cache.cached('notifications')
+def handle_notifications():
+    if request.method == 'GET':
+        args = request.args
+        q = Notification.query
+        if args.get('className'): q = q.filter_by(class_name=args['className'])
+        if args.get('classId'): q = q.filter_by(class_id=args['classId'])
+        try:
+            if args.get('from'): q = q.filter(Notification.created_at >= datetime.strptime(args['from'], '%m/%d/%Y'))
+            if args.get('to'): q = q.filter(Notification.created_at < datetime.strptime(args['to'], '%m/%d/%Y') + timedelta(days=1))
+        except ValueError:
+            return jsonify({'error': 'Dates must be MM/DD/YYYY'}), 400
+        if args.get('since'): return since_page(q, Notification.created_at, Notification.id, Notification.to_dict, args['since'], args)
+        return list_response(q, Notification.id, Notification.to_dict, args)
+    data = request.json
+    if data.get('timestamp'):
+        try: parse_timestamp(data['timestamp'])
+        except ValueError: return jsonify({'error': 'timestamp must be MM/DD/YYYY, HH:MM:SS or ISO 8601'}), 400
+    if isinstance(data.get('classNames'), list):
+        known = {name for (name,) in db.session.query(Class.name).filter(Class.name.in_(data['classNames']))}
+        unknown = [name for name in data['classNames'] if name not in known]
+        if unknown: return jsonify({'error': 'Class not found', 'classNames': unknown}), 404
+    if data.get('className') == 'All' or isinstance(data.get('classNames'), list):
+        job = jobs.submit('notification-fanout', tasks.notify_classes, storage, data, lambda: cache.invalidate('notifications'))
+        return jsonify({'msg': 'Sending', 'job': job}), 202
+    if not storage.add_notification(data): return jsonify({'error': 'Class not found'}), 404
+    return jsonify({'msg':'Added'}), 201
+
+@bp.route('/api/notifications/summary', methods=['GET'])
+def get_notification_summary():
+    q = NotificationSummary.query
+    if request.args.get('className'): q = q.filter_by(class_name=request.args['className'])
+    if request.args.get('classId'): q = q.filter_by(class_id=request.args['classId'])
+    return jsonify([s.to_dict() for s in q.order_by(NotificationSummary.month, NotificationSummary.class_name)])
+
+def retention_cutoff(days=None):
+    return datetime.now() - timedelta(days=current_app.config['NOTIFICATION_RETENTION_DAYS'] if days is None else days)
+
+@bp.route('/api/notifications/compact', methods=['POST'])
+def compact_notifications():
+    days = (request.get_json(silent=True) or {}).get('days')
+    if days is not None and (not isinstance(days, int) or days < 0): return jsonify({'error': 'days must be a non-negative integer'}), 400
+    job = jobs.submit('notification-compact', tasks.compact_notifications, storage, retention_cutoff(days),
+                      lambda: cache.invalidate('notifications'))
+    return jsonify(job), 202
+
+@bp.route('/api/events', methods=['GET'])
+def stream_events():
+    # Push feed of new notifications, attendance and scores (see events.py)
+    since = request.args.get('since') or request.headers.get('Last-Event-ID')
+    if since is not None and not since.isdigit(): return jsonify({'error': 'since must be an event id'}), 400
+    types = [t for t in request.args.get('types', '').split(',') if t] or None
+    visible = None
+    if tenancy.current() is not None:
+        app = current_app._get_current_object()
+        def class_ids():  # the stream outlives the request: read under its own app context, with the request's scope
+            with app.app_context(): return {class_id for (class_id,) in db.session.query(Class.id)}
+        visible = tenancy.carry(class_ids)
+    return sse_response(events._get_current_object(), int(since) if since else None, request.args.get('className'), types,
+                        visible)
@@ -0,0 +1,51 @@
+"""The weekly timetable: entries, bulk import and what is on now."""
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from database import Timetable
+from listing import list_response
+from services import cache, storage
+from schedule import RESOURCES, ScheduleConflict, SlotError, parse_day
+
+bp = Blueprint('timetable', __name__)
+
+@bp.route('/api/timetable', methods=['GET', 'POST'])
+@cache.cached('timetable')
+def handle_timetable():
+    if request.method == 'GET':
+        q = Timetable.query
+        if request.args.get('day'):
+            try: q = q.filter(Timetable.weekday == parse_day(request.args['day']))
+            except SlotError as exc: return jsonify({'error': str(exc)}), 400
+        for arg in ('teacher', 'location'):
+            if request.args.get(arg): q = q.filter(getattr(Timetable, arg) == request.args[arg])
+        return list_response(q, Timetable.id, Timetable.to_dict, request.args)
+    try: entry = storage.add_timetable_entry(request.json)
+    except SlotError as exc: return jsonify({'error': str(exc)}), 400
+    except ScheduleConflict as exc: return jsonify({'error': 'Double-booked', 'conflicts': exc.conflicts}), 409
+    return jsonify({'msg': 'Added', **entry}), 201
+
+@bp.route('/api/timetable/import', methods=['POST'])
+@cache.invalidates('timetable')
+def import_timetable():
+    # A list of entries, or {'entries': [...], 'replace': true} to swap in a whole new week; all or nothing
+    data = request.json
+    entries, replace = (data, False) if isinstance(data, list) else (data.get('entries') or [], bool(data.get('replace')))
+    try: added = storage.import_timetable(entries, replace)
+    except SlotError as exc: return jsonify({'error': str(exc)}), 400
+    except ScheduleConflict as exc: return jsonify({'error': 'Double-booked', 'conflicts': exc.conflicts}), 409
+    return jsonify({'msg': 'Imported', 'added': added, 'replaced': replace}), 201
+
+@bp.route('/api/timetable/now', methods=['GET'])
+def timetable_now():
+    # ?teacher= or ?location=, and optionally ?at=<ISO datetime> (default: now); not cached, it depends on the clock
+    resource = next((r for r in RESOURCES if request.args.get(r)), None)
+    if resource is None: return jsonify({'error': 'teacher or location is required'}), 400
+    try: at = datetime.fromisoformat(request.args['at']) if request.args.get('at') else datetime.now()
+    except ValueError: return jsonify({'error': 'at must be an ISO datetime'}), 400
+    return jsonify(storage.timetable_at(resource, request.args[resource], at))
+
+@bp.route('/api/timetable/<id>', methods=['DELETE'])
+@cache.invalidates('timetable')
+def delete_timetable(id):
+    if storage.delete_timetable_entry(id): return jsonify({'msg':'Deleted'})
+    return jsonify({'error':'Not found'}), 404
@@ -1,13 +1,14 @@
-from flask import Flask, request, jsonify, make_response
-from functools import wraps
-from datetime import datetime
-import uuid
-import json
+import os
+from flask import Flask, request, jsonify
+from storage import MemoryStorage, StaleVersion
+from auth import Sessions, request_token
+from filestore import FileStore, upload_response, download_response
+from schedule import ScheduleConflict, SlotError
 
 app = Flask(__name__)
 
 # --- Mock Database ---
-# Mimics a simple in-memory database structure
+# Seed data, loaded into a MemoryStorage (storage.py) so the mock shares the SQL server's semantics
 MOCK_DB = {
     'users': [
         {'id': 'u1', 'name': 'Prof. Alice', 'email': 'alice@edu.com', 'password': 'pass'}
@@ -41,39 +42,12 @@ MOCK_DB = {
     ]
 }
 
-# --- Utility Functions ---
-
-def find_student_by_id(student_id):
-    """Searches the entire DB for a student by ID."""
-    for cls in MOCK_DB['classes']:
-        for student in cls['students']:
-            if student['id'] == student_id:
-                return student, cls
-    return None, None
-
-def calculate_attendance(student_id):
-    """Calculates attendance for a given student ID."""
-    records = [r for r in MOCK_DB['attendance'] if r['studentId'] == student_id]
-    total = len(records)
-    present = len([r for r in records if r['status'] == 'P'])
-    
-    percentage = round((present / total) * 100) if total > 0 else 0
-    return {'present': present, 'total': total, 'percentage': percentage}
-
-def get_student_scores(student_id):
-    """Compiles exam scores for a given student."""
-    student_scores = [s for s in MOCK_DB['scores'] if s['studentId'] == student_id]
-    exam_results = []
-    
-    for score in student_scores:
-        exam = next((e for e in MOCK_DB['exams'] if e['id'] == score['examId']), None)
-        if exam:
-            exam_results.append({
-                'title': exam['title'],
-                'obtained': score['marks'],
-                'total': exam['totalMarks']
-            })
-    return exam_results
+store = MemoryStorage.from_dump(MOCK_DB)
+files = FileStore(os.environ.get('EDUMATE_UPLOAD_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')))
+UPLOAD_MAX_BYTES = 25 * 1024 * 1024
+UPLOAD_QUOTA_BYTES = 200 * 1024 * 1024
+# Tokens are issued so clients can be built against them, but the mock does not require one
+sessions = Sessions('edumate-mock', 12 * 3600)
 
 # --- API Endpoints ---
 
@@ -81,85 +55,65 @@ def get_student_scores(student_id):
 @app.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
-    email = data.get('email')
-    password = data.get('password')
-    
-    user = next((u for u in MOCK_DB['users'] if u['email'] == email and u['password'] == password), None)
+    user = store.authenticate(data.get('email'), data.get('password'))
     
     if user:
-        # Return user data (excluding password for security)
-        return jsonify({'id': user['id'], 'name': user['name'], 'email': user['email']})
+        return jsonify({**user, 'token': sessions.issue(user)})
     else:
         return jsonify({'error': 'Invalid credentials'}), 401
 
 @app.route('/api/signup', methods=['POST'])
 def signup():
     data = request.get_json()
-    name = data.get('name')
-    email = data.get('email')
-    password = data.get('password')
     
-    if not name or not email or not password:
+    if not data.get('name') or not data.get('email') or not data.get('password'):
         return jsonify({'error': 'Missing fields'}), 400
         
-    if next((u for u in MOCK_DB['users'] if u['email'] == email), None):
+    user = store.add_user(data)
+    if not user:
         return jsonify({'error': 'User already exists'}), 409
-        
-    new_user = {'id': str(uuid.uuid4())[:8], 'name': name, 'email': email, 'password': password}
-    MOCK_DB['users'].append(new_user)
     
-    return jsonify({'id': new_user['id'], 'name': new_user['name'], 'email': new_user['email']}), 201
+    return jsonify(user), 201
 
 ## Data Fetch Endpoints (Used by loadAllData)
 @app.route('/api/classes', methods=['GET'])
 def get_classes():
     # In a real app, you would filter based on the logged-in user.
-    return jsonify(MOCK_DB['classes'])
+    return jsonify(store.list_classes())
 
 @app.route('/api/timetable', methods=['GET'])
 def get_timetable():
-    return jsonify(MOCK_DB['timetable'])
+    return jsonify(store.list_timetable())
 
 @app.route('/api/notifications', methods=['GET'])
 def get_notifications():
-    return jsonify(MOCK_DB['notifications'])
+    return jsonify(store.list_notifications())
 
 @app.route('/api/attendance', methods=['GET'])
 def get_attendance():
-    return jsonify(MOCK_DB['attendance'])
+    args = request.args
+    try:
+        return jsonify(store.list_attendance(args.get('date'), args.get('classId'), args.get('from'), args.get('to')))
+    except ValueError:
+        return jsonify({'error': 'Dates must be MM/DD/YYYY or YYYY-MM-DD'}), 400
 
 @app.route('/api/exams', methods=['GET'])
 def get_exams():
-    return jsonify(MOCK_DB['exams'])
+    return jsonify(store.list_exams())
 
 @app.route('/api/assignments', methods=['GET'])
 def get_assignments():
-    return jsonify(MOCK_DB['assignments'])
+    return jsonify(store.list_assignments())
 
 ## Class List Management
 @app.route('/api/classes', methods=['POST'])
 def add_class():
-    data = request.get_json()
-    new_class = {
-        'id': str(uuid.uuid4())[:8],
-        'name': data.get('name'),
-        'coordinatorName': data.get('coordinatorName'),
-        'coordinatorPhone': data.get('coordinatorPhone'),
-        'students': []
-    }
-    MOCK_DB['classes'].append(new_class)
-    return jsonify(new_class), 201
+    return jsonify(store.add_class(request.get_json())), 201
 
 @app.route('/api/classes/<class_id>', methods=['DELETE'])
 def delete_class(class_id):
-    global MOCK_DB
-    
-    # Remove all related exam scores, attendance, etc. in a real app.
-    
-    original_len = len(MOCK_DB['classes'])
-    MOCK_DB['classes'] = [c for c in MOCK_DB['classes'] if c['id'] != class_id]
-    
-    if len(MOCK_DB['classes']) < original_len:
+    # Removes the class's students, their attendance and scores, and its exams
+    if store.delete_class(class_id):
         return jsonify({'message': 'Class deleted'}), 200
     return jsonify({'error': 'Class not found'}), 404
 
@@ -167,95 +121,51 @@ def delete_class(class_id):
 @app.route('/api/classes/<class_id>/students', methods=['POST'])
 def add_student(class_id):
     data = request.get_json()
-    cls = next((c for c in MOCK_DB['classes'] if c['id'] == class_id), None)
-    
-    if not cls:
-        return jsonify({'error': 'Class not found'}), 404
     
     # Simple check for required fields
-    if not all(k in data for k in ('name', 'roll', 'email', 'status')):
+    if not data.get('name') or not data.get('roll'):
         return jsonify({'error': 'Missing student details'}), 400
 
-    new_student = {
-        'id': str(uuid.uuid4())[:8],
-        'roll': data['roll'],
-        'name': data['name'],
-        'email': data['email'],
-        'status': data['status'],
-        'phone': data.get('phone', ''),
-        'parentPhone': data.get('parentPhone', ''),
-        'address': '',
-        'previousMarks': ''
-    }
-    cls['students'].append(new_student)
+    new_student = store.add_student(class_id, data)
+    if not new_student:
+        return jsonify({'error': 'Class not found'}), 404
     return jsonify(new_student), 201
 
 @app.route('/api/students/<student_id>', methods=['PUT'])
 def update_student_profile(student_id):
-    data = request.get_json()
-    student, cls = find_student_by_id(student_id)
-    
-    if not student:
+    if not store.update_student(student_id, request.get_json()):
         return jsonify({'error': 'Student not found'}), 404
-    
-    # Update fields used in openProfile and updateProfile
-    if 'address' in data:
-        student['address'] = data['address']
-    if 'previousMarks' in data:
-        student['previousMarks'] = data['previousMarks']
-        
     return jsonify({'message': 'Profile updated'}), 200
 
 @app.route('/api/students/<student_id>', methods=['DELETE'])
 def delete_student(student_id):
-    student_to_delete, cls = find_student_by_id(student_id)
-    
-    if not student_to_delete:
+    # Also removes the student's attendance and scores
+    if not store.delete_student(student_id):
         return jsonify({'error': 'Student not found'}), 404
-
-    # Remove student from the class list
-    cls['students'] = [s for s in cls['students'] if s['id'] != student_id]
-    
-    # In a real app, delete all associated attendance, scores, etc.
-    
     return jsonify({'message': 'Student deleted'}), 200
 
 ## Timetable Management
 @app.route('/api/timetable', methods=['POST'])
 def add_timetable_entry():
-    data = request.get_json()
-    new_entry = {
-        'id': str(uuid.uuid4())[:8],
-        'day': data.get('day'),
-        'time': data.get('time'),
-        'subject': data.get('subject'),
-        'location': data.get('location')
-    }
-    MOCK_DB['timetable'].append(new_entry)
-    return jsonify(new_entry), 201
+    try:
+        return jsonify(store.add_timetable_entry(request.get_json())), 201
+    except SlotError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except ScheduleConflict as exc:
+        return jsonify({'error': 'Double-booked', 'conflicts': exc.conflicts}), 409
 
 @app.route('/api/timetable/<entry_id>', methods=['DELETE'])
 def delete_timetable_entry(entry_id):
-    global MOCK_DB
-    original_len = len(MOCK_DB['timetable'])
-    MOCK_DB['timetable'] = [t for t in MOCK_DB['timetable'] if t['id'] != entry_id]
-    
-    if len(MOCK_DB['timetable']) < original_len:
+    if store.delete_timetable_entry(entry_id):
         return jsonify({'message': 'Timetable entry deleted'}), 200
     return jsonify({'error': 'Entry not found'}), 404
 
 ## Notifications
 @app.route('/api/notifications', methods=['POST'])
 def post_notification():
-    data = request.get_json()
-    new_notification = {
-        'id': str(uuid.uuid4())[:8],
-        'message': data.get('message'),
-        'className': data.get('className'),
-        'timestamp': data.get('timestamp') or datetime.now().strftime('%m/%d/%Y, %H:%M:%S')
-    }
-    MOCK_DB['notifications'].append(new_notification)
-    return jsonify(new_notification), 201
+    notification = store.add_notification(request.get_json())
+    if notification is None: return jsonify({'error': 'Class not found'}), 404
+    return jsonify(notification), 201
 
 ## Attendance
 @app.route('/api/attendance', methods=['POST'])
@@ -265,33 +175,21 @@ def save_attendance():
     if not isinstance(data, list):
         return jsonify({'error': 'Expected a list of attendance records'}), 400
 
-    # Add new records to the mock DB. In a real app, you would upsert/check for duplicates.
-    MOCK_DB['attendance'].extend(data)
-    
-    # The frontend expects a JSON response, but doesn't seem to use it.
-    return jsonify({'message': f'Saved {len(data)} attendance records'}), 201
+    # Upserted per (date, studentId, period), same as the SQL server
+    try:
+        counts = store.save_attendance(data)
+    except ValueError:
+        return jsonify({'error': 'Dates must be MM/DD/YYYY or YYYY-MM-DD'}), 400
+    return jsonify({'message': f'Saved {len(data)} attendance records', **counts}), 201
 
 ## Exams and Scores
 @app.route('/api/exams', methods=['POST'])
 def create_exam():
-    data = request.get_json()
-    new_exam = {
-        'id': str(uuid.uuid4())[:8],
-        'title': data.get('title'),
-        'totalMarks': int(data.get('totalMarks', 0)),
-        'classId': data.get('classId')
-    }
-    MOCK_DB['exams'].append(new_exam)
-    return jsonify(new_exam), 201
+    return jsonify(store.add_exam(request.get_json())), 201
 
 @app.route('/api/exams/<exam_id>', methods=['DELETE'])
 def remove_exam(exam_id):
-    global MOCK_DB
-    original_len = len(MOCK_DB['exams'])
-    MOCK_DB['exams'] = [e for e in MOCK_DB['exams'] if e['id'] != exam_id]
-    
-    if len(MOCK_DB['exams']) < original_len:
-        # In a real app, also delete all associated scores
+    if store.delete_exam(exam_id):
         return jsonify({'message': 'Exam deleted'}), 200
     return jsonify({'error': 'Exam not found'}), 404
 
@@ -300,82 +198,69 @@ def get_exam_scores():
     exam_id = request.args.get('examId')
     if not exam_id:
         return jsonify({'error': 'Missing examId'}), 400
-        
-    scores = [s for s in MOCK_DB['scores'] if s['examId'] == exam_id]
-    return jsonify(scores)
+    return jsonify(store.list_scores(exam_id))
+
+@app.route('/api/exams/<exam_id>/scores', methods=['GET'])
+def get_score_sheet(exam_id):
+    since = request.args.get('since')
+    if since is not None and not since.isdigit():
+        return jsonify({'error': 'since must be an exam version'}), 400
+    sheet = store.score_sheet(exam_id, int(since) if since is not None else None)
+    if sheet is None:
+        return jsonify({'error': 'Exam not found'}), 404
+    return jsonify(sheet)
 
 @app.route('/api/scores', methods=['POST'])
 def save_marks():
-    data = request.get_json() # Expected list of {examId, studentId, marks}
-    
-    # In a real app, you would replace existing scores for the given examId/studentId pair.
-    # For this mock, we'll implement simple upsert logic:
-
-    exam_id = data[0]['examId'] if data else None
-    
-    if not exam_id:
+    data = request.get_json() # Expected list of {examId, studentId, marks}, or {examId, version, changes}
+
+    if isinstance(data, dict):
+        # Only the changed cells of one exam sheet, against the version it was loaded at
+        changes = data.get('changes')
+        if not data.get('examId') or not isinstance(data.get('version'), int) or not isinstance(changes, list) \
+                or not all(isinstance(c, dict) and c.get('studentId') and 'marks' in c for c in changes):
+            return jsonify({'error': 'Expected {examId, version, changes: [{studentId, marks}]}'}), 400
+        try:
+            version = store.save_score_changes(data['examId'], data['version'], changes)
+        except ValueError as exc:
+            return jsonify({'error': str(exc)}), 400
+        except StaleVersion as exc:
+            return jsonify({'error': 'Exam sheet changed', 'version': exc.version, 'changes': exc.changes}), 409
+        if version is None:
+            return jsonify({'error': 'Exam not found'}), 404
+        return jsonify({'message': 'Marks saved', 'version': version}), 200
+
+    if not data or not data[0].get('examId'):
          return jsonify({'error': 'Invalid data format'}), 400
          
-    # 1. Remove all old scores for this exam
-    global MOCK_DB
-    MOCK_DB['scores'] = [s for s in MOCK_DB['scores'] if s['examId'] != exam_id]
-    
-    # 2. Add new scores
-    for item in data:
-        try:
-            # Ensure marks is an integer
-            item['marks'] = int(item['marks'])
-        except (ValueError, TypeError):
-             item['marks'] = 0 # Default to 0 if invalid
-             
-        MOCK_DB['scores'].append(item)
-        
+    # Upserted per (examId, studentId); scores missing from the payload are kept. marks: a number, or AB / EX
+    try:
+        store.save_scores(data)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
     return jsonify({'message': 'Marks saved'}), 200
 
 ## Material/Assignment Upload
 @app.route('/api/upload', methods=['POST'])
 def file_upload():
-    # In a real application, this would upload the file to a cloud service (e.g., S3, Google Cloud Storage)
-    # and return the public URL.
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
-        
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-        
-    # Mock URL
-    mock_url = f"http://127.0.0.1:5000/static/uploads/{file.filename.replace(' ', '_')}"
-    return jsonify({'url': mock_url}), 200
+    # Streams the file into the local content-addressed store (filestore.py), charged to the token's teacher
+    identity = sessions.verify(request_token(request) or '')
+    return upload_response(files, store, UPLOAD_MAX_BYTES, UPLOAD_QUOTA_BYTES, identity['id'] if identity else None)
+
+@app.route('/api/files/<upload_id>', methods=['GET'])
+def download_file(upload_id):
+    return download_response(files, store, upload_id)
 
 @app.route('/api/assignments', methods=['POST'])
 def save_assignment():
-    data = request.get_json()
-    new_assignment = {
-        'id': str(uuid.uuid4())[:8],
-        'title': data.get('title'),
-        'className': data.get('className'),
-        'date': data.get('date'),
-        'category': data.get('category')
-    }
-    MOCK_DB['assignments'].append(new_assignment)
-    return jsonify(new_assignment), 201
+    return jsonify(store.add_assignment(request.get_json())), 201
 
 ## Reports / Analytics
 @app.route('/api/students/<student_id>/analytics', methods=['GET'])
 def get_student_analytics(student_id):
-    student, cls = find_student_by_id(student_id)
-    
-    if not student:
+    if not store.get_student(student_id):
         return jsonify({'error': 'Student not found'}), 404
-
-    attendance_data = calculate_attendance(student_id)
-    exam_data = get_student_scores(student_id)
-
-    return jsonify({
-        'attendance': attendance_data,
-        'exams': exam_data
-    })
+    return jsonify(store.student_analytics(student_id))
 
 # --- CORS and Run Configuration ---
 
@@ -0,0 +1,94 @@
+"""Password hashing and stateless session tokens.
+
+Passwords are stored as Werkzeug hashes: salted scrypt by default, with
+pbkdf2:sha256 as the lighter option. Both are deliberately slow, so the work
+runs on a small PasswordHasher thread pool. hashlib releases the GIL while it
+hashes, so a burst of logins at the start of the day queues there, bounded to
+HASH_WORKERS cores and their scrypt memory. Request threads only wait for their
+own result.
+
+Login returns a token signed with SECRET_KEY (itsdangerous, which ships with
+Flask). The token carries the teacher's id, name, email and school (which
+tenancy.py scopes every query by). Checking it needs
+no database, and the last CACHE_SIZE tokens seen are kept in an LRU, so repeat
+requests skip the signature check too. There is no server-side session state:
+a token is valid until SESSION_TTL runs out.
+
+Invites are tokens of the same kind, with their own salt, that carry a school
+id: `flask --app server invite <schoolId>` issues one, and signing up with it
+joins that school. They are valid for INVITE_TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+METHODS = ('scrypt', 'pbkdf2')  # prefixes of the hashes Werkzeug writes
+CACHE_SIZE = 1024
+
+def is_hashed(stored):
+    return bool(stored) and stored.split(':', 1)[0] in METHODS and '$' in stored
+
+def normalise_email(email):
+    return (email or '').strip().lower()
+
+class PasswordHasher:
+    def __init__(self, workers=2, method='scrypt'):
+        self.method = method
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='edumate-hash')
+
+    @cached_property
+    def dummy(self):
+        return generate_password_hash('not a password', self.method)
+
+    def hash(self, password):
+        return self.pool.submit(generate_password_hash, password, self.method).result()
+
+    def verify(self, stored, password):
+        """Whether `password` matches `stored`. With stored None (no such user) a dummy hash is checked,
+        so an unknown email takes as long as a wrong password."""
+        return self.pool.submit(check_password_hash, stored or self.dummy, password or '').result() and stored is not None
+
+class Sessions:
+    def __init__(self, secret, ttl, cache_size=CACHE_SIZE, invite_ttl=7 * 24 * 3600):
+        self.serializer = URLSafeTimedSerializer(secret, salt='edumate-session')
+        self.invites = URLSafeTimedSerializer(secret, salt='edumate-invite')
+        self.ttl, self.cache_size, self.invite_ttl = ttl, cache_size, invite_ttl
+        self.verified = OrderedDict()  # token -> (identity, expires at), least recently used first
+        self.lock = threading.Lock()
+
+    def issue(self, teacher):
+        return self.serializer.dumps({'id': teacher['id'], 'name': teacher.get('name'), 'email': teacher.get('email'),
+                                      'schoolId': teacher.get('schoolId')})
+
+    def verify(self, token):
+        """The identity in a valid, unexpired token, or None."""
+        now = time.time()
+        with self.lock:
+            hit = self.verified.get(token)
+            if hit and hit[1] > now:
+                self.verified.move_to_end(token)
+                return hit[0]
+        try: identity, issued = self.serializer.loads(token, max_age=self.ttl, return_timestamp=True)
+        except BadSignature: return None  # includes SignatureExpired
+        with self.lock:
+            self.verified[token] = (identity, issued.timestamp() + self.ttl)
+            if len(self.verified) > self.cache_size: self.verified.popitem(last=False)
+        return identity
+
+    def invite(self, school_id):
+        return self.invites.dumps({'schoolId': school_id})
+
+    def invited_school(self, token):
+        """The school id in a valid, unexpired invite, or None."""
+        try: return self.invites.loads(token, max_age=self.invite_ttl)['schoolId']
+        except (BadSignature, KeyError, TypeError): return None
+
+def request_token(request):
+    """The bearer token of a request; ?token= is accepted for EventSource and plain download links."""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '): return header[7:].strip()
+    return request.args.get('token')
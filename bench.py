@@ -0,0 +1,278 @@
+"""Reproducible load benchmark for the EduMate API.
+
+Generates a synthetic school (N classes x M students x D days x P periods, with
+exams and scores), loads it into a fresh SQLite file (server.py) or into
+MemoryStorage (app.py), then replays scripted workloads through the Flask test
+client in-process:
+
+  attendance   morning roll call: one POST /api/attendance per class and period
+  marks        marks entry: one POST /api/scores per exam
+  profiles     GET /api/students/<id>/analytics for random students
+  dashboard    the loadAllData GETs plus class analytics
+
+With --startup N it also times N cold starts of the SQL server: a fresh
+interpreter importing server.py and building the app on the benchmark database,
+as a newly started worker does, per create_app() phase and for the whole process.
+
+For every endpoint it reports p50/p95/p99/max latency and the SQL statements per
+request; for every workload the throughput. Results are written as JSON so runs
+from different commits can be compared with --compare.
+
+Usage:
+  python bench.py --classes 20 --students 60 --days 30 --periods 8
+  python bench.py --target mock --threads 4
+  python bench.py --compare bench-results/<earlier run>.json
+  python bench.py --startup 10 --workloads dashboard
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+WORKLOADS = ('attendance', 'marks', 'profiles', 'dashboard')
+START = date(2025, 9, 1)
+
+def day(n):
+    return (START + timedelta(days=n)).strftime('%m/%d/%Y')
+
+def period(p):
+    return f'Period {p + 1}'
+
+# --- Synthetic data ---
+def generate(classes, students, days, periods, exams, seed=1):
+    """Returns a dataset in the nested MOCK_DB layout with deterministic ids (c0, c0s0, c0e0, ...)."""
+    rng = random.Random(seed)
+    dump = {'users': [{'id': 't0', 'name': 'Bench Teacher', 'email': 'bench@edu.com', 'password': 'bench'}],
+            'classes': [], 'timetable': [], 'notifications': [], 'attendance': [], 'exams': [], 'scores': [], 'assignments': []}
+    for i in range(classes):
+        cid, cname = f'c{i}', f'Class {i}'
+        roster = [{'id': f'{cid}s{j}', 'roll': f'{i:03}{j:03}', 'name': f'Student {i}-{j}', 'email': '', 'status': 'Day Scholar',
+                   'phone': '', 'parentPhone': '', 'address': '', 'previousMarks': ''} for j in range(students)]
+        dump['classes'].append({'id': cid, 'name': cname, 'coordinatorName': f'Coordinator {i}', 'coordinatorPhone': '', 'students': roster})
+        for p in range(periods):
+            dump['timetable'].append({'id': f'{cid}t{p}', 'day': 'Monday', 'time': f'{8 + p:02}:00', 'subject': f'Subject {p}',
+                                      'teacher': f'Teacher {(i + p) % classes}', 'location': f'Room {i}'})
+        dump['notifications'].append({'id': f'{cid}n0', 'message': 'Welcome back', 'className': cname, 'timestamp': f'{day(0)}, 08:00:00'})
+        for d in range(days):
+            for p in range(periods):
+                for s in roster:
+                    dump['attendance'].append({'date': day(d), 'period': period(p), 'studentId': s['id'], 'studentName': s['name'],
+                                               'className': cname, 'status': 'P' if rng.random() < 0.9 else 'A'})
+        for k in range(exams):
+            eid = f'{cid}e{k}'
+            dump['exams'].append({'id': eid, 'title': f'Exam {k}', 'totalMarks': 100, 'classId': cid})
+            for s in roster:
+                dump['scores'].append({'examId': eid, 'studentId': s['id'], 'marks': str(rng.randint(20, 100))})
+    return dump
+
+def load_sql(db, dump, chunk=5000):
+    """Bulk-inserts a generated dataset into the SQLAlchemy models."""
+    from sqlalchemy import insert
+    from database import Teacher, Class, Student, Timetable, Notification, Attendance, Exam, Score
+    from storage import parse_timestamp
+    from analytics import parse_date
+    from schedule import parse_slot
+    from werkzeug.security import generate_password_hash
+    def rows(model, items):
+        for i in range(0, len(items), chunk):
+            db.session.execute(insert(model), items[i:i + chunk])
+    rows(Teacher, [{'id': u['id'], 'name': u['name'], 'email': u['email'], 'password': generate_password_hash(u['password'])}
+                   for u in dump['users']])
+    rows(Class, [{'id': c['id'], 'name': c['name'], 'coordinator_name': c['coordinatorName'], 'coordinator_phone': c['coordinatorPhone']}
+                 for c in dump['classes']])
+    rows(Student, [{'id': s['id'], 'name': s['name'], 'roll': s['roll'], 'class_id': c['id']} for c in dump['classes'] for s in c['students']])
+    rows(Timetable, [{'id': t['id'], **dict(zip(('weekday', 'start_minute', 'end_minute'), parse_slot(t))), 'subject': t['subject'],
+                      'teacher': t['teacher'], 'location': t['location']} for t in dump['timetable']])
+    class_ids = {c['name']: c['id'] for c in dump['classes']}
+    rows(Notification, [{'id': n['id'], 'message': n['message'], 'class_name': n['className'], 'class_id': class_ids.get(n['className']),
+                         'created_at': parse_timestamp(n['timestamp'])} for n in dump['notifications']])
+    student_classes = {s['id']: c['id'] for c in dump['classes'] for s in c['students']}
+    rows(Attendance, [{'date': parse_date(r['date']), 'period': r['period'], 'student_id': r['studentId'],
+                       'class_id': student_classes[r['studentId']], 'status': r['status']} for r in dump['attendance']])
+    rows(Exam, [{'id': e['id'], 'title': e['title'], 'total_marks': e['totalMarks'], 'class_id': e['classId']} for e in dump['exams']])
+    rows(Score, [{'exam_id': s['examId'], 'student_id': s['studentId'], 'marks_obtained': float(s['marks'])} for s in dump['scores']])
+    db.session.commit()
+
+# --- Workloads: lists of (endpoint label, method, path, json body) ---
+def attendance_workload(args, rng):
+    today = day(args.days)
+    return [('POST /api/attendance', 'POST', '/api/attendance',
+             [{'date': today, 'period': period(p), 'studentId': f'c{i}s{j}', 'studentName': f'Student {i}-{j}',
+               'className': f'Class {i}', 'status': 'P' if rng.random() < 0.9 else 'A'} for j in range(args.students)])
+            for i in range(args.classes) for p in range(args.periods)]
+
+def marks_workload(args, rng):
+    return [('POST /api/scores', 'POST', '/api/scores',
+             [{'examId': f'c{i}e{k}', 'studentId': f'c{i}s{j}', 'marks': str(rng.randint(20, 100))} for j in range(args.students)])
+            for i in range(args.classes) for k in range(args.exams)]
+
+def profiles_workload(args, rng):
+    return [('GET /api/students/<id>/analytics', 'GET',
+             f'/api/students/c{rng.randrange(args.classes)}s{rng.randrange(args.students)}/analytics', None)
+            for _ in range(args.requests)]
+
+def dashboard_workload(args, rng):
+    requests = []
+    for _ in range(max(args.requests // 5, 1)):
+        requests += [(f'GET {path}', 'GET', path, None) for path in ('/api/classes', '/api/timetable', '/api/notifications', '/api/exams')]
+        if args.target == 'sql':
+            requests.append(('GET /api/classes/<id>/analytics', 'GET', f'/api/classes/c{rng.randrange(args.classes)}/analytics', None))
+    return requests
+
+BUILDERS = {'attendance': attendance_workload, 'marks': marks_workload, 'profiles': profiles_workload, 'dashboard': dashboard_workload}
+
+# --- Measurement ---
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+def summarise(samples):
+    ms = [s * 1000 for s in samples]
+    return {'count': len(ms), 'mean_ms': round(sum(ms) / len(ms), 3), 'p50_ms': round(percentile(ms, 50), 3),
+            'p95_ms': round(percentile(ms, 95), 3), 'p99_ms': round(percentile(ms, 99), 3), 'max_ms': round(max(ms), 3)}
+
+def run_workload(app, requests, threads, sql_counter, headers=None):
+    """Replays `requests`; returns (per-endpoint latencies, per-endpoint SQL counts, errors, elapsed seconds)."""
+    latencies, statements, errors = {}, {}, []
+    lock = threading.Lock()
+    local = threading.local()
+    def send(item):
+        label, method, path, body = item
+        if not hasattr(local, 'client'): local.client = app.test_client()
+        sql_counter.reset()
+        started = time.perf_counter()
+        response = local.client.open(path, method=method, json=body, headers=headers)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.setdefault(label, []).append(elapsed)
+            statements.setdefault(label, []).append(sql_counter.value())
+            if response.status_code >= 400: errors.append((label, response.status_code))
+    started = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as pool: list(pool.map(send, requests))
+    else:
+        for item in requests: send(item)
+    return latencies, statements, errors, time.perf_counter() - started
+
+class SqlCounter:
+    """Counts statements per thread through the engine's before_cursor_execute event."""
+    def __init__(self, engine=None):
+        self.local = threading.local()
+        if engine is not None:
+            from sqlalchemy import event
+            event.listen(engine, 'before_cursor_execute', self._record)
+    def _record(self, *args):
+        self.local.count = getattr(self.local, 'count', 0) + 1
+    def reset(self): self.local.count = 0
+    def value(self): return getattr(self.local, 'count', 0)
+
+def build_app(args, dump):
+    if args.target == 'mock':
+        import app as mock
+        from storage import MemoryStorage
+        mock.store = MemoryStorage.from_dump(dump)
+        return mock.app, SqlCounter(), None
+    path = os.path.join(tempfile.mkdtemp(prefix='edumate-bench-'), 'bench.db')
+    os.environ['EDUMATE_DATABASE_URL'] = 'sqlite:///' + path
+    from server import create_app
+    from database import db
+    app = create_app(SCHEMA_CHECK='create')
+    with app.app_context():
+        load_sql(db, dump)
+        engine = db.engine
+    user = dump['users'][0]
+    token = app.test_client().post('/api/login', json={'email': user['email'], 'password': user['password']}).json['token']
+    return app, SqlCounter(engine), {'Authorization': f'Bearer {token}'}
+
+STARTUP_SCRIPT = 'import json, server; print(json.dumps(server.create_app().extensions["edumate"]["startup"]))'
+
+def measure_startup(runs):
+    """Per-phase timings of `runs` cold starts against EDUMATE_DATABASE_URL; 'process' includes the interpreter."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, '-W', 'ignore', '-c', STARTUP_SCRIPT], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        samples.append({**json.loads(out.splitlines()[-1]), 'process': time.perf_counter() - started})
+    return {phase: summarise([sample[phase] for sample in samples]) for phase in samples[0]}
+
+def git_commit():
+    try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f: baseline = json.load(f)
+    print(f"\nvs {baseline_path} ({baseline['meta'].get('commit')})")
+    for label, now in current['endpoints'].items():
+        before = baseline['endpoints'].get(label)
+        if not before: continue
+        change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+        print(f"  {label:40} p95 {before['p95_ms']:9.2f} -> {now['p95_ms']:9.2f} ms ({change:+6.1f}%)"
+              f"  sql {before['sql_mean']:6.1f} -> {now['sql_mean']:6.1f}")
+    for phase, now in current.get('startup', {}).items():
+        before = baseline.get('startup', {}).get(phase)
+        if before: print(f"  startup {phase:32} p50 {before['p50_ms']:9.2f} -> {now['p50_ms']:9.2f} ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--target', choices=('sql', 'mock'), default='sql')
+    parser.add_argument('--classes', type=int, default=10)
+    parser.add_argument('--students', type=int, default=40)
+    parser.add_argument('--days', type=int, default=20)
+    parser.add_argument('--periods', type=int, default=8)
+    parser.add_argument('--exams', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=200, help='requests per read workload')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--workloads', default=','.join(WORKLOADS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='result file (default bench-results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier result file to diff against')
+    parser.add_argument('--startup', type=int, default=0, help='cold starts of the SQL server to time')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    dump = generate(args.classes, args.students, args.days, args.periods, args.exams, args.seed)
+    app, sql_counter, headers = build_app(args, dump)
+
+    result = {'meta': {'commit': git_commit(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'target': args.target,
+                       'threads': args.threads, 'python': platform.python_version(),
+                       'dataset': {k: getattr(args, k) for k in ('classes', 'students', 'days', 'periods', 'exams', 'seed')},
+                       'attendance_rows': len(dump['attendance'])},
+              'workloads': {}, 'endpoints': {}}
+    for name in args.workloads.split(','):
+        requests = BUILDERS[name](args, rng)
+        latencies, statements, errors, elapsed = run_workload(app, requests, args.threads, sql_counter, headers)
+        result['workloads'][name] = {'requests': len(requests), 'seconds': round(elapsed, 3),
+                                     'throughput_rps': round(len(requests) / elapsed, 1) if elapsed else None, 'errors': len(errors)}
+        for label, samples in latencies.items():
+            counts = statements[label]
+            result['endpoints'][label] = dict(summarise(samples), sql_mean=round(sum(counts) / len(counts), 2), sql_max=max(counts))
+        print(f"{name:10} {len(requests):6} req  {elapsed:8.2f}s  {result['workloads'][name]['throughput_rps']:8} req/s  errors {len(errors)}")
+
+    print()
+    for label, e in result['endpoints'].items():
+        print(f"  {label:40} p50 {e['p50_ms']:8.2f}  p95 {e['p95_ms']:8.2f}  p99 {e['p99_ms']:8.2f} ms  sql {e['sql_mean']:6.1f}")
+
+    if args.startup and args.target == 'sql':
+        result['startup'] = measure_startup(args.startup)
+        print()
+        for phase, e in result['startup'].items():
+            print(f"  startup {phase:32} p50 {e['p50_ms']:8.2f}  p95 {e['p95_ms']:8.2f}  max {e['max_ms']:8.2f} ms")
+
+    out = args.out or os.path.join('bench-results', f"{time.strftime('%Y%m%d-%H%M%S')}-{result['meta']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as f: json.dump(result, f, indent=2)
+    print(f'\nwrote {out}')
+    if args.compare: compare(result, args.compare)
+
+if __name__ == '__main__':
+    sys.exit(main())
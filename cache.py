@@ -0,0 +1,199 @@
+"""Response cache for the read-mostly GET endpoints.
+
+Entries are keyed by namespace, the namespace's generation, the caller's
+variant (vary(), e.g. the tenant, so teachers never share a cached body) and the
+request path with its query string. A write bumps the generation, which orphans every entry of
+that namespace at once; orphans then age out through TTL/LRU eviction.
+
+Backends:
+  MemoryBackend   per-process LRU with TTL (the default)
+  SqliteBackend   a small SQLite file shared by every gunicorn worker on the host; entries are
+                  stored as JSON (the body base64-encoded) in a file only the app's user can read
+Cached responses carry ETag and Last-Modified, and conditional requests are
+answered with 304.
+
+A ResponseCache made before any app exists (the blueprints' decorators) is
+bound to each app with init_app(), which gives that app its own backend.
+"""
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from functools import wraps
+from flask import Response, current_app, make_response, request
+
+class MemoryBackend:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None: return None
+            value, expires = item
+            if expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def generation(self, namespace):
+        return self.generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self.lock:
+            self.generations[namespace] = self.generations.get(namespace, 0) + 1
+
+class SqliteBackend:
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        # Cached bodies are other tenants' data: create the file private before SQLite opens it (its -wal/-shm copy the mode)
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(path, 0o600)
+        # A throwaway connection: this may run before gunicorn --preload forks, and connections must not cross a fork
+        with closing(sqlite3.connect(self.path, timeout=5)) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL, used REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_used ON entries (used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS generations (namespace TEXT PRIMARY KEY, value INTEGER)")
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None: return None
+        now = time.time()
+        with conn:
+            if row[1] < now:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+        value = json.loads(row[0])
+        return dict(value, body=base64.b64decode(value['body']))
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._conn() as conn:
+            stored = json.dumps(dict(value, body=base64.b64encode(value['body']).decode()))
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, stored, now + ttl, now))
+            conn.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def generation(self, namespace):
+        row = self._conn().execute("SELECT value FROM generations WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, namespace):
+        with self._conn() as conn:
+            conn.execute("INSERT INTO generations VALUES (?, 1) ON CONFLICT(namespace) DO UPDATE SET value = value + 1", (namespace,))
+
+BACKENDS = {'memory': MemoryBackend, 'sqlite': SqliteBackend}
+
+class ResponseCache:
+    def __init__(self, backend=None, ttl=60, vary=None):
+        self._backend = backend
+        self._ttl = ttl
+        self.vary = vary or (lambda: '')
+        self.per_app = False
+
+    @staticmethod
+    def _settings(config, instance_path=None):
+        """(backend, ttl) for RESPONSE_CACHE 'memory', 'sqlite' or 'off', tuned by RESPONSE_CACHE_TTL and RESPONSE_CACHE_SIZE.
+
+        The sqlite file is RESPONSE_CACHE_PATH, else cache.db in the app's instance folder.
+        """
+        name = config.get('RESPONSE_CACHE', 'memory')
+        if name == 'off': return None, 0
+        kwargs = {'max_entries': config.get('RESPONSE_CACHE_SIZE', 256)}
+        if name == 'sqlite':
+            path = config.get('RESPONSE_CACHE_PATH')
+            if not path:
+                if not instance_path: raise RuntimeError('RESPONSE_CACHE=sqlite needs RESPONSE_CACHE_PATH')
+                os.makedirs(instance_path, mode=0o700, exist_ok=True)
+                path = os.path.join(instance_path, 'cache.db')
+            kwargs['path'] = path
+        return BACKENDS[name](**kwargs), config.get('RESPONSE_CACHE_TTL', 60)
+
+    @classmethod
+    def from_config(cls, config, vary=None):
+        backend, ttl = cls._settings(config)
+        return cls(backend, ttl, vary)
+
+    def init_app(self, app):
+        app.extensions['response_cache'] = self._settings(app.config, app.instance_path)
+        self.per_app = True
+
+    @property
+    def backend(self):
+        return current_app.extensions['response_cache'][0] if self.per_app else self._backend
+
+    @property
+    def ttl(self):
+        return current_app.extensions['response_cache'][1] if self.per_app else self._ttl
+
+    def invalidate(self, *namespaces):
+        backend = self.backend
+        if backend is None: return
+        for namespace in namespaces: backend.bump(namespace)
+
+    def invalidates(self, *namespaces):
+        """Decorator for write handlers: bumps `namespaces` after every successful response."""
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                response = make_response(f(*args, **kwargs))
+                if response.status_code < 400: self.invalidate(*namespaces)
+                return response
+            return wrapper
+        return decorator
+
+    def cached(self, namespace, invalidates=()):
+        """Decorator for list handlers: caches successful GETs under `namespace`.
+
+        Other methods routed to the same handler are treated as writes and
+        invalidate `namespace` plus any extra `invalidates` namespaces.
+        """
+        def decorator(f):
+            write = self.invalidates(namespace, *invalidates)(f)
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if request.method != 'GET': return write(*args, **kwargs)
+                backend = self.backend
+                if backend is None: return f(*args, **kwargs)
+                key = f'{namespace}:{backend.generation(namespace)}:{self.vary()}:{request.full_path}'
+                entry = backend.get(key)
+                if entry is None:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed: return response
+                    body = response.get_data()
+                    entry = {'body': body, 'mimetype': response.mimetype, 'etag': hashlib.sha1(body).hexdigest(),
+                             'modified': int(time.time())}
+                    backend.set(key, entry, self.ttl)
+                response = Response(entry['body'], mimetype=entry['mimetype'])
+                response.set_etag(entry['etag'])
+                response.last_modified = entry['modified']
+                response.cache_control.no_cache = True  # always revalidate; the ETag makes that cheap
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
@@ -0,0 +1,79 @@
+"""`flask --app server ...` maintenance commands, registered by create_app().
+
+bootstrap creates and migrates the schema (migrate.py). Run it once per deploy,
+before starting or restarting the workers: they only check the schema version.
+"""
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from database import db, Class, School, Teacher
+from storage import new_id
+from auth import normalise_email
+from analytics import rebuild_attendance_months, rebuild_rollups
+from services import cache, sessions, storage
+from api_notifications import retention_cutoff
+import migrate
+
+@click.command('bootstrap')
+@with_appcontext
+def bootstrap_command():
+    before, after = migrate.upgrade()
+    click.echo(f"Schema version {before} -> {after}")
+    migrate.report(before, after)
+
+@click.command('startup')
+@with_appcontext
+def startup_command():
+    # How long this process took to import the code and build the app, per phase (what a fresh worker pays)
+    for phase, seconds in current_app.extensions['edumate']['startup'].items(): click.echo(f'{phase:12} {seconds * 1000:8.1f} ms')
+
+@click.command('add-school')
+@click.argument('name')
+@with_appcontext
+def add_school_command(name):
+    school = School(id=new_id('sch'), name=name)
+    db.session.add(school)
+    db.session.commit()
+    click.echo(f'School {name!r} created as {school.id}; invite its teachers with `flask --app server invite {school.id}`')
+
+@click.command('invite')
+@click.argument('school_id')
+@with_appcontext
+def invite_command(school_id):
+    # Signing up with the printed invite joins the school, where the teacher sees its shared (unowned) classes
+    if not db.session.get(School, school_id): raise click.ClickException('No such school')
+    click.echo(sessions.invite(school_id))
+
+@click.command('set-class-owner')
+@click.argument('class_id')
+@click.argument('email')
+@with_appcontext
+def set_class_owner_command(class_id, email):
+    # Moves a class into the teacher's school and makes it theirs (classes start out shared within their school)
+    cls, teacher = db.session.get(Class, class_id), Teacher.query.filter_by(email=normalise_email(email)).first()
+    if not cls or not teacher: raise click.ClickException('No such class or teacher')
+    cls.school_id, cls.teacher_id = teacher.school_id, teacher.id
+    db.session.commit()
+    cache.invalidate('classes', 'exams', 'assignments', 'notifications')
+    click.echo(f'{cls.name} now belongs to {teacher.name}')
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    rebuild_rollups()
+    rebuild_attendance_months()
+    db.session.commit()
+    click.echo('Attendance rollups and monthly bitmaps rebuilt')
+
+@click.command('compact-notifications')
+@with_appcontext
+def compact_notifications_command():
+    before, archived = retention_cutoff(), 0
+    while True:
+        n = storage.archive_notifications(before)
+        if not n: break
+        archived += n
+    cache.invalidate('notifications')
+    click.echo(f'Archived {archived} notifications older than {before:%m/%d/%Y}')
+
+COMMANDS = (bootstrap_command, startup_command, add_school_command, invite_command, set_class_owner_command, rebuild_rollups_command, compact_notifications_command)
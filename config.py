@@ -0,0 +1,91 @@
+"""Settings for server.create_app(), per environment.
+
+EDUMATE_ENV (or create_app's env argument) picks one of ENVIRONMENTS, which only
+changes defaults: every setting can still be set through its EDUMATE_* variable,
+and keyword overrides passed to create_app() win over both.
+  development  what a checkout runs: edumate.db next to the code, per-process cache
+  production   gunicorn workers on one host: the 'production' SQLite profile and
+               write queue, a response cache shared by the workers, a required
+               SECRET_KEY, and workers that refuse to start on an out-of-date schema
+  testing      an in-memory database created with the app, no response cache
+"""
+import os
+import secrets
+import dbprofile
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+ENVIRONMENTS = {
+    'development': {},
+    'production': {'DATABASE_PROFILE': 'production', 'RESPONSE_CACHE': 'sqlite', 'SCHEMA_CHECK': 'fail'},
+    'testing': {'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'RESPONSE_CACHE': 'off', 'SCHEMA_CHECK': 'create',
+                'JOB_WORKERS': 1, 'HASH_WORKERS': 1},
+}
+
+def _flag(value):
+    return value == '1'
+
+def load(config, env, overrides):
+    """Fills the app's `config` for environment `env`; `overrides` are config keys set by the caller."""
+    if env not in ENVIRONMENTS: raise RuntimeError(f'EDUMATE_ENV must be one of {", ".join(ENVIRONMENTS)}, got {env!r}')
+    defaults = ENVIRONMENTS[env]
+
+    def setting(key, variable, default, cast=str):
+        if key in overrides: return overrides[key]
+        value = os.environ.get(variable)
+        return cast(value) if value is not None else defaults.get(key, default)
+
+    config['ENV_NAME'] = env
+    config['TESTING'] = defaults.get('TESTING', False)
+    config['SQLALCHEMY_DATABASE_URI'] = setting('SQLALCHEMY_DATABASE_URI', 'EDUMATE_DATABASE_URL', 'sqlite:///' + os.path.join(BASE_DIR, 'edumate.db'))
+    config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 'production' turns on WAL, busy timeout, a sized pool and the single-writer queue (see dbprofile.py)
+    config['DATABASE_PROFILE'] = setting('DATABASE_PROFILE', 'EDUMATE_DB_PROFILE', 'default')
+    config['SQLITE_POOL_SIZE'] = setting('SQLITE_POOL_SIZE', 'EDUMATE_SQLITE_POOL_SIZE', 10, int)
+    config['SQLITE_BUSY_TIMEOUT_MS'] = setting('SQLITE_BUSY_TIMEOUT_MS', 'EDUMATE_SQLITE_BUSY_TIMEOUT_MS', 5000, int)
+    config['WRITE_QUEUE'] = (config['DATABASE_PROFILE'] == 'production' and dbprofile.is_sqlite_file(config['SQLALCHEMY_DATABASE_URI'])
+                             and setting('WRITE_QUEUE', 'EDUMATE_WRITE_QUEUE', True, _flag))
+    config['WRITE_QUEUE_BATCH'] = setting('WRITE_QUEUE_BATCH', 'EDUMATE_WRITE_QUEUE_BATCH', 64, int)
+    config['WRITE_QUEUE_LINGER_MS'] = setting('WRITE_QUEUE_LINGER_MS', 'EDUMATE_WRITE_QUEUE_LINGER_MS', 2, float)
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = dbprofile.engine_options(config)
+    # At worker start: 'fail' if `flask --app server bootstrap` has not migrated the schema, 'warn', 'create' it, or 'off'
+    config['SCHEMA_CHECK'] = setting('SCHEMA_CHECK', 'EDUMATE_SCHEMA_CHECK', 'warn')
+    # Serve profile attendance from the AttendanceRollup table (run `flask --app server rebuild-rollups` after enabling)
+    config['ANALYTICS_ROLLUPS'] = setting('ANALYTICS_ROLLUPS', 'EDUMATE_ANALYTICS_ROLLUPS', False, _flag)
+    # Keep bit-packed monthly attendance per student (AttendanceMonth) for term percentages and heatmaps; same rebuild command
+    config['ATTENDANCE_BITMAPS'] = setting('ATTENDANCE_BITMAPS', 'EDUMATE_ATTENDANCE_BITMAPS', False, _flag)
+    # How nested relationships (Class.students) are fetched when serialised: selectin, joined or lazy
+    config['RELATIONSHIP_LOADING'] = setting('RELATIONSHIP_LOADING', 'EDUMATE_RELATIONSHIP_LOADING', 'selectin')
+    # GET cache for classes/exams/timetable/notifications: memory (per worker), sqlite (shared by workers on a host) or off
+    config['RESPONSE_CACHE'] = setting('RESPONSE_CACHE', 'EDUMATE_RESPONSE_CACHE', 'memory')
+    config['RESPONSE_CACHE_TTL'] = setting('RESPONSE_CACHE_TTL', 'EDUMATE_RESPONSE_CACHE_TTL', 60, int)
+    # The sqlite cache's file; unset puts it in the instance folder (instance/cache.db), readable only by the app's user
+    config['RESPONSE_CACHE_PATH'] = setting('RESPONSE_CACHE_PATH', 'EDUMATE_RESPONSE_CACHE_PATH', None)
+    # Per-request timing, SQL counts, Server-Timing headers and /metrics; optionally cProfile a sample of slow requests
+    config['METRICS'] = setting('METRICS', 'EDUMATE_METRICS', False, _flag)
+    config['METRICS_PROFILE_SAMPLE'] = setting('METRICS_PROFILE_SAMPLE', 'EDUMATE_METRICS_PROFILE_SAMPLE', 0, float)
+    config['METRICS_PROFILE_SLOW_MS'] = setting('METRICS_PROFILE_SLOW_MS', 'EDUMATE_METRICS_PROFILE_SLOW_MS', 500, int)
+    # Notifications older than this are folded into monthly per-class counts by `flask --app server compact-notifications`
+    config['NOTIFICATION_RETENTION_DAYS'] = setting('NOTIFICATION_RETENTION_DAYS', 'EDUMATE_NOTIFICATION_RETENTION_DAYS', 180, int)
+    # Threads running background jobs (imports, class deletes, reports, notification fan-out)
+    config['JOB_WORKERS'] = setting('JOB_WORKERS', 'EDUMATE_JOB_WORKERS', 2, int)
+    # Uploaded files (content-addressed, see filestore.py); per-file limit and per-owner quota in bytes
+    config['UPLOAD_DIR'] = setting('UPLOAD_DIR', 'EDUMATE_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads'))
+    config['UPLOAD_MAX_BYTES'] = setting('UPLOAD_MAX_BYTES', 'EDUMATE_UPLOAD_MAX_BYTES', 25 * 1024 * 1024, int)
+    config['UPLOAD_QUOTA_BYTES'] = setting('UPLOAD_QUOTA_BYTES', 'EDUMATE_UPLOAD_QUOTA_BYTES', 200 * 1024 * 1024, int)
+    # Let a fronting Apache/lighttpd send downloads instead of the worker
+    config['USE_X_SENDFILE'] = setting('USE_X_SENDFILE', 'EDUMATE_X_SENDFILE', False, _flag)
+    # Signs session tokens; every worker must share it, so production refuses to start without one
+    config['SECRET_KEY'] = setting('SECRET_KEY', 'EDUMATE_SECRET_KEY', None)
+    if not config['SECRET_KEY']:
+        if env == 'production': raise RuntimeError('Set EDUMATE_SECRET_KEY: every worker has to sign session tokens with the same key')
+        config['SECRET_KEY'] = secrets.token_hex(32)
+    # Seconds a login token stays valid
+    config['SESSION_TTL'] = setting('SESSION_TTL', 'EDUMATE_SESSION_TTL', 12 * 3600, int)
+    # Seconds an invite from `flask --app server invite` can be used to sign up into its school
+    config['INVITE_TTL'] = setting('INVITE_TTL', 'EDUMATE_INVITE_TTL', 7 * 24 * 3600, int)
+    # Reject /api/ requests without a valid token (0 only while clients are moved over to sending one)
+    config['AUTH_REQUIRED'] = setting('AUTH_REQUIRED', 'EDUMATE_AUTH_REQUIRED', True, _flag)
+    # Threads hashing passwords at signup/login; each scrypt hash holds ~16 MB while it runs
+    config['HASH_WORKERS'] = setting('HASH_WORKERS', 'EDUMATE_HASH_WORKERS', 2, int)
+    config.update(overrides)  # including settings without a variable (RESPONSE_CACHE_SIZE, TESTING, ...)
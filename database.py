@@ -1,25 +1,46 @@
+import json
 from flask_sqlalchemy import SQLAlchemy
+from schedule import slot_fields
+from gradestats import mark_value
 
 db = SQLAlchemy()
 
+DEFAULT_PERIOD = "Period 1"
+DEFAULT_SCHOOL = "default"  # tenant of the teachers and data from before schools; others join it by invite
+
 # --- AUTH ---
+# Schools are the tenants: a teacher belongs to one, and only sees that school's rows (tenancy.py)
+class School(db.Model):
+    id = db.Column(db.String(80), primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    def to_dict(self): return {'id': self.id, 'name': self.name}
+
 class Teacher(db.Model):
     id = db.Column(db.String(80), primary_key=True)
     name = db.Column(db.String(120), nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)  # stored lower-cased; the unique index serves login
+    password = db.Column(db.String(255), nullable=False)  # Werkzeug scrypt/pbkdf2 hash (auth.py)
     notepad = db.Column(db.Text, default="") 
-    def to_dict(self): return {'id': self.id, 'name': self.name, 'email': self.email, 'notepad': self.notepad}
+    school_id = db.Column(db.String(80), db.ForeignKey('school.id'), nullable=False, default=DEFAULT_SCHOOL)
+    def to_dict(self): return {'id': self.id, 'name': self.name, 'email': self.email, 'notepad': self.notepad, 'schoolId': self.school_id}
 
 # --- CLASS & STUDENTS ---
 class Class(db.Model):
+    # Serves the per-teacher scope: school_id = ? AND (teacher_id = ? OR teacher_id IS NULL)
+    __table_args__ = (db.Index('ix_class_school_teacher', 'school_id', 'teacher_id'),)
     id = db.Column(db.String(80), primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     coordinator_name = db.Column(db.String(120), nullable=False)
     coordinator_phone = db.Column(db.String(20))
+    school_id = db.Column(db.String(80), db.ForeignKey('school.id'), nullable=False, default=DEFAULT_SCHOOL)
+    teacher_id = db.Column(db.String(80), db.ForeignKey('teacher.id'))  # owner; None = shared by the school's teachers
     students = db.relationship('Student', backref='class', lazy=True, cascade="all, delete-orphan")
     exams = db.relationship('Exam', backref='class', lazy=True, cascade="all, delete-orphan")
-    def to_dict(self): return {'id': self.id, 'name': self.name, 'coordinatorName': self.coordinator_name, 'coordinatorPhone': self.coordinator_phone, 'students': [s.to_dict() for s in self.students]}
+    assignments = db.relationship('Assignment', backref='class', lazy=True, cascade="all, delete-orphan")
+    def to_dict(self, students=True):
+        d = {'id': self.id, 'name': self.name, 'coordinatorName': self.coordinator_name, 'coordinatorPhone': self.coordinator_phone}
+        if students: d['students'] = [s.to_dict() for s in self.students]
+        return d
 
 class Student(db.Model):
     id = db.Column(db.String(80), primary_key=True)
@@ -31,9 +52,12 @@ class Student(db.Model):
     parent_phone = db.Column(db.String(20), default='')
     address = db.Column(db.Text, default='') 
     previous_marks = db.Column(db.Text, default='') 
-    class_id = db.Column(db.String(80), db.ForeignKey('class.id'), nullable=False)
+    class_id = db.Column(db.String(80), db.ForeignKey('class.id'), nullable=False, index=True)
     scores = db.relationship('Score', backref='student', lazy=True, cascade="all, delete-orphan")
-    attendance_records = db.relationship('Attendance', backref='student', lazy=True, cascade="all, delete-orphan")
+    attendance_records = db.relationship('Attendance', backref=db.backref('student', lazy='joined', innerjoin=True),
+                                         lazy=True, cascade="all, delete-orphan")
+    attendance_rollups = db.relationship('AttendanceRollup', lazy=True, cascade="all, delete-orphan")
+    attendance_months = db.relationship('AttendanceMonth', lazy=True, cascade="all, delete-orphan")
 
     def to_dict(self):
         return {
@@ -43,72 +67,143 @@ class Student(db.Model):
         }
 
 # --- TIMETABLE ---
+# Slots are a weekday (0 = Monday) and [start_minute, end_minute) after midnight; see schedule.py.
+# Each school has its own week, so teacher and room names only clash within a school.
 class Timetable(db.Model):
+    __table_args__ = (
+        db.Index('ix_timetable_teacher_slot', 'school_id', 'teacher', 'weekday', 'start_minute'),
+        db.Index('ix_timetable_location_slot', 'school_id', 'location', 'weekday', 'start_minute'),
+    )
     id = db.Column(db.String(80), primary_key=True)
-    day = db.Column(db.String(20), nullable=False)
-    time = db.Column(db.String(20), nullable=False)
+    school_id = db.Column(db.String(80), db.ForeignKey('school.id'), nullable=False, default=DEFAULT_SCHOOL)
+    weekday = db.Column(db.SmallInteger, nullable=False)
+    start_minute = db.Column(db.SmallInteger, nullable=False)
+    end_minute = db.Column(db.SmallInteger, nullable=False)
     subject = db.Column(db.String(100), nullable=False)
     teacher = db.Column(db.String(100))
     location = db.Column(db.String(100))
-    def to_dict(self): return {'id': self.id, 'day': self.day, 'time': self.time, 'subject': self.subject, 'teacher': self.teacher, 'location': self.location}
+    def to_dict(self):
+        return {'id': self.id, **slot_fields(self.weekday, self.start_minute, self.end_minute),
+                'subject': self.subject, 'teacher': self.teacher, 'location': self.location}
 
 # --- NOTIFICATIONS ---
+TIMESTAMP_FORMAT = '%m/%d/%Y, %H:%M:%S'
+
 class Notification(db.Model):
+    # (class_id, created_at) serves per-class feeds, created_at the incremental fetch and retention
+    __table_args__ = (
+        db.Index('ix_notification_class_created', 'class_id', 'created_at'),
+        db.Index('ix_notification_created_at', 'created_at'),
+    )
     id = db.Column(db.String(80), primary_key=True)
     message = db.Column(db.String(500), nullable=False)
     class_name = db.Column(db.String(100), nullable=False)
-    timestamp = db.Column(db.String(50), nullable=False)
-    def to_dict(self): return {'id': self.id, 'message': self.message, 'className': self.class_name, 'timestamp': self.timestamp}
+    class_id = db.Column(db.String(80), db.ForeignKey('class.id'))  # None when className matches no class
+    created_at = db.Column(db.DateTime, nullable=False)
+    def to_dict(self):
+        return {'id': self.id, 'message': self.message, 'className': self.class_name, 'classId': self.class_id,
+                'timestamp': self.created_at.strftime(TIMESTAMP_FORMAT), 'createdAt': self.created_at.isoformat()}
+
+# Counts of notifications removed by the retention job, per class and month
+class NotificationSummary(db.Model):
+    class_name = db.Column(db.String(100), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    class_id = db.Column(db.String(80))
+    count = db.Column(db.Integer, nullable=False, default=0)
+    first_at = db.Column(db.DateTime)
+    last_at = db.Column(db.DateTime)
+    def to_dict(self):
+        return {'className': self.class_name, 'classId': self.class_id, 'month': self.month, 'count': self.count,
+                'firstAt': self.first_at.isoformat() if self.first_at else None,
+                'lastAt': self.last_at.isoformat() if self.last_at else None}
 
-# --- ATTENDANCE (UPDATED FOR MULTI-PERIOD) ---
 # --- ATTENDANCE ---
+DATE_FORMAT = '%m/%d/%Y'  # how dates are shown in the API; stored as DATE
+
 class Attendance(db.Model):
+    # One row per (date, student, period); the unique index also serves date-only lookups,
+    # the other two date ranges for one student or one class
+    __table_args__ = (
+        db.Index('uq_attendance_date_student_period', 'date', 'student_id', 'period', unique=True),
+        db.Index('ix_attendance_student_date', 'student_id', 'date'),
+        db.Index('ix_attendance_class_date', 'class_id', 'date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.String(20), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    period = db.Column(db.String(50), nullable=False, default=DEFAULT_PERIOD)
     student_id = db.Column(db.String(80), db.ForeignKey('student.id'), nullable=False)
-    student_name = db.Column(db.String(120), nullable=False)
-    class_name = db.Column(db.String(120), nullable=False)
+    class_id = db.Column(db.String(80), db.ForeignKey('class.id'), nullable=False)  # the student's class when marked
     status = db.Column(db.String(10), nullable=False)
-    
-    # Ensure this column exists
-    period = db.Column(db.String(50), default="Period 1") 
+    class_ = db.relationship('Class', lazy='joined', innerjoin=True, viewonly=True)
+
+    def to_dict(self):
+        return {'id': self.id, 'date': self.date.strftime(DATE_FORMAT), 'isoDate': self.date.isoformat(),
+                'studentId': self.student_id, 'studentName': self.student.name, 'classId': self.class_id,
+                'className': self.class_.name, 'status': self.status, 'period': self.period}
+
+# Optional bit-packed attendance (ATTENDANCE_BITMAPS): per student, month ('YYYY-MM') and period,
+# bit d-1 of `marked` is set when day d was recorded and the same bit of `present` when the student
+# was there. A term is a handful of integers per student; see analytics.attendance_months.
+class AttendanceMonth(db.Model):
+    __table_args__ = (db.Index('ix_attendance_month_class', 'class_id', 'month'),)
+    student_id = db.Column(db.String(80), db.ForeignKey('student.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    period = db.Column(db.String(50), primary_key=True)
+    class_id = db.Column(db.String(80), db.ForeignKey('class.id'), nullable=False)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    marked = db.Column(db.Integer, nullable=False, default=0)
+
+# --- ANALYTICS ROLLUP ---
+# Materialised present/total counts per student and period, maintained by the
+# attendance upsert when ANALYTICS_ROLLUPS is enabled.
+class AttendanceRollup(db.Model):
+    student_id = db.Column(db.String(80), db.ForeignKey('student.id'), primary_key=True)
+    period = db.Column(db.String(50), primary_key=True)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    def to_dict(self): return {'period': self.period, 'present': self.present, 'total': self.total}
 
-    def to_dict(self): 
-        return {
-            'id': self.id, 
-            'date': self.date, 
-            'studentId': self.student_id, 
-            'studentName': self.student_name, 
-            'className': self.class_name,
-            'status': self.status,
-            'period': self.period  # <--- THIS IS THE MISSING KEY!
-        }
 # --- EXAMS & SCORES ---
 class Exam(db.Model):
     id = db.Column(db.String(80), primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     total_marks = db.Column(db.Integer, nullable=False)
-    class_id = db.Column(db.String(80), db.ForeignKey('class.id'), nullable=False)
+    class_id = db.Column(db.String(80), db.ForeignKey('class.id'), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False, default=0)  # bumped by every marks write (optimistic concurrency)
     def to_dict(self): return {'id': self.id, 'title': self.title, 'totalMarks': self.total_marks, 'classId': self.class_id}
 
 class Score(db.Model):
+    __table_args__ = (
+        db.Index('uq_score_exam_student', 'exam_id', 'student_id', unique=True),
+        db.Index('ix_score_student_id', 'student_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     exam_id = db.Column(db.String(80), db.ForeignKey('exam.id'), nullable=False)
     student_id = db.Column(db.String(80), db.ForeignKey('student.id'), nullable=False)
-    marks_obtained = db.Column(db.String(20), default="0")
-    def to_dict(self): return {'examId': self.exam_id, 'studentId': self.student_id, 'marks': self.marks_obtained}
+    marks_obtained = db.Column(db.Float)  # NULL when marker is set
+    marker = db.Column(db.String(10))  # 'absent' or 'exempt' (gradestats.MARKERS); NULL for a mark
+    version = db.Column(db.Integer, nullable=False, default=0)  # the exam version that last wrote this cell
+    def to_dict(self):
+        return {'examId': self.exam_id, 'studentId': self.student_id, 'marks': mark_value(self.marks_obtained),
+                'marker': self.marker, 'version': self.version}
 
 # --- ASSIGNMENTS ---
-# Assuming your database.py file has this:
 class Assignment(db.Model):
-    # ... (existing columns)
-    
-    # ADD this relationship so one Assignment can have multiple Submissions
-    submissions = db.relationship('Submission', backref='assignment', lazy='dynamic')
-    # ... (other code)
+    id = db.Column(db.String(80), primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    class_id = db.Column(db.String(80), db.ForeignKey('class.id'), nullable=False, index=True)
+    date = db.Column(db.String(20), nullable=False)  # due date, MM/DD/YYYY
+    category = db.Column(db.String(50), default='Assignment')
+    submissions = db.relationship('Submission', backref='assignment', lazy=True, cascade="all, delete-orphan")
+
+    def to_dict(self): return {'id': self.id, 'title': self.title, 'classId': self.class_id, 'date': self.date, 'category': self.category}
 
-# ADD THIS NEW MODEL to track history
+# Submission history: one row per hand-in, so resubmissions are kept
 class Submission(db.Model):
+    __table_args__ = (
+        db.Index('ix_submission_assignment_student', 'assignment_id', 'student_id'),
+        db.Index('ix_submission_student_id', 'student_id'),
+    )
     id = db.Column(db.String, primary_key=True)
     assignment_id = db.Column(db.String, db.ForeignKey('assignment.id')) # Links to the main Assignment
     file_url = db.Column(db.String) # Stores the actual uploaded file path
@@ -123,3 +218,40 @@ class Submission(db.Model):
             'submissionDate': self.submission_date,
             'studentId': self.student_id,
         }
+
+# --- UPLOADS ---
+# One row per upload; the bytes live in filestore.FileStore under their SHA-256, shared by identical uploads
+class Upload(db.Model):
+    id = db.Column(db.String(80), primary_key=True)
+    digest = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(120), nullable=False)
+    owner_id = db.Column(db.String(80), index=True)  # teacher who uploaded it and is charged for it; None: anonymous
+    created_at = db.Column(db.String(50))
+
+    def to_dict(self):
+        return {'id': self.id, 'digest': self.digest, 'size': self.size, 'filename': self.filename,
+                'contentType': self.content_type, 'ownerId': self.owner_id, 'createdAt': self.created_at}
+
+# --- BACKGROUND JOBS ---
+# State of work run off the request path by jobs.JobRunner; times are epoch seconds
+class Job(db.Model):
+    __table_args__ = (db.Index('ix_job_status', 'status'), db.Index('ix_job_teacher_status', 'teacher_id', 'status'))
+    id = db.Column(db.String(80), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    teacher_id = db.Column(db.String(80))  # who submitted it; None for jobs started outside a teacher's request
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed, cancelled
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    worker = db.Column(db.Integer)  # pid of the process running it
+    created_at = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        return {'id': self.id, 'kind': self.kind, 'status': self.status, 'processed': self.processed, 'total': self.total,
+                'result': json.loads(self.result) if self.result else {}, 'error': self.error,
+                'cancelRequested': self.cancel_requested, 'createdAt': self.created_at, 'updatedAt': self.updated_at}
@@ -0,0 +1,60 @@
+"""SQLite connection profiles.
+
+On any SQLite file, connections carrying the 'sqlite_immediate' execution
+option start with BEGIN IMMEDIATE, which takes the write lock up front: a
+read-then-write (SqlStorage._write) sees no concurrent change between its read
+and its write, and cannot fail on a read-to-write upgrade.
+'default' otherwise leaves SQLAlchemy's SQLite settings alone (what a dev checkout
+uses): pysqlite begins a deferred transaction at the first write, so plain reads
+hold no lock, which the rollback journal needs to let a writer commit.
+'production' is meant for gunicorn with several workers on one edumate.db:
+  - a sized connection pool (SQLITE_POOL_SIZE / SQLITE_MAX_OVERFLOW)
+  - on every new connection: journal_mode=WAL so readers never block the writer,
+    busy_timeout so a writer waits for the lock instead of failing with
+    "database is locked", synchronous=NORMAL (safe under WAL) and mmap_size
+  - every transaction is begun explicitly, reads included
+Call engine_options() before db.init_app() and init_app() after it.
+"""
+from sqlalchemy import event
+
+def is_sqlite_file(uri):
+    return uri.startswith('sqlite:') and uri not in ('sqlite://', 'sqlite:///:memory:')
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured DATABASE_PROFILE."""
+    if config.get('DATABASE_PROFILE') != 'production' or not is_sqlite_file(config['SQLALCHEMY_DATABASE_URI']): return {}
+    return {
+        'pool_size': config.get('SQLITE_POOL_SIZE', 10),
+        'max_overflow': config.get('SQLITE_MAX_OVERFLOW', 10),
+        'pool_timeout': 30,
+        'connect_args': {'timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000, 'check_same_thread': False},
+    }
+
+def init_app(app, db):
+    """Installs BEGIN IMMEDIATE for 'sqlite_immediate' connections, plus the production PRAGMAs and explicit BEGIN."""
+    config = app.config
+    if not is_sqlite_file(config['SQLALCHEMY_DATABASE_URI']): return
+    production = config.get('DATABASE_PROFILE') == 'production'
+    pragmas = {
+        'journal_mode': 'WAL',
+        'busy_timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'synchronous': 'NORMAL',
+        'mmap_size': config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    }
+    with app.app_context():
+        engine = db.engine
+
+    if production:
+        @event.listens_for(engine, 'connect')
+        def on_connect(dbapi_connection, connection_record):
+            # Let SQLAlchemy emit BEGIN itself (see on_begin); pysqlite's implicit BEGIN can't be IMMEDIATE
+            dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items(): cursor.execute(f'PRAGMA {name}={value}')
+            cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def on_begin(conn):
+        # Outside production pysqlite sees the open transaction and issues no BEGIN of its own
+        if conn.get_execution_options().get('sqlite_immediate'): conn.exec_driver_sql('BEGIN IMMEDIATE')
+        elif production: conn.exec_driver_sql('BEGIN')
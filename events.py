@@ -0,0 +1,88 @@
+"""In-process pub/sub for pushing changes to dashboards over Server-Sent Events.
+
+SqlStorage publishes to an EventBus after each committed notification,
+attendance or score write. The bus keeps the last BUFFER events in a ring
+buffer with consecutive ids and wakes every waiting stream through one
+Condition, so publishing costs the same however many clients are connected
+and no thread is spawned per client or per event.
+
+GET /api/events streams them (sse_response). Each event carries its id, so a
+browser's EventSource resumes with Last-Event-ID after a reconnect; ?since=
+does the same explicitly. A cursor that is no longer in the buffer (or comes
+from an earlier process) gets a 'reset' event, telling the client to reload
+through the REST endpoints. Events carry the id of their class, and a teacher's
+stream only gets events of the classes their scope sees (tenancy.py). The stream
+reads that set of ids when it opens and again every HEARTBEAT seconds, so
+classes created or handed over meanwhile are picked up.
+
+The bus is per process: run the stream on a single worker, and use an async
+worker class (gunicorn -k gevent) so hundreds of open streams are cheap
+greenlets rather than blocked threads.
+"""
+import itertools
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from flask import Response
+
+BUFFER = 1000
+HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+
+Event = namedtuple('Event', 'id type class_name data class_id')
+
+class EventBus:
+    def __init__(self, size=BUFFER):
+        self.events = deque(maxlen=size)
+        self.cond = threading.Condition()
+        # Start from the clock so cursors handed out by an earlier process never look current
+        self.last_id = int(time.time() * 1000) * 1000
+
+    def publish(self, type, class_name, data, class_id=None):
+        with self.cond:
+            self.last_id += 1
+            self.events.append(Event(self.last_id, type, class_name, data, class_id))
+            self.cond.notify_all()
+
+    def covers(self, cursor):
+        """Whether every event after `cursor` is still in the buffer."""
+        with self.cond:
+            first = self.events[0].id if self.events else self.last_id + 1
+            return first - 1 <= cursor <= self.last_id
+
+    def wait(self, cursor, timeout):
+        """Events after `cursor`, waiting up to `timeout` seconds for one if there are none yet."""
+        with self.cond:
+            if cursor >= self.last_id: self.cond.wait(timeout)
+            if not self.events or cursor >= self.last_id: return []
+            start = max(cursor - self.events[0].id + 1, 0)  # ids are consecutive
+            return list(itertools.islice(self.events, start, None))
+
+def _format(event):
+    return f'id: {event.id}\nevent: {event.type}\ndata: {json.dumps({"className": event.class_name, **event.data})}\n\n'
+
+def sse_response(bus, since=None, class_name=None, types=None, visible=None):
+    """text/event-stream of the events after `since` (or from now), filtered by class name and event types,
+    and to the class ids returned by `visible()` when it is given."""
+    def generate():
+        class_ids, read_at = None, 0
+        cursor = bus.last_id if since is None else since
+        yield 'retry: 3000\n\n'
+        if not bus.covers(cursor):
+            cursor = bus.last_id
+            yield f'id: {cursor}\nevent: reset\ndata: {{}}\n\n'
+        while True:
+            events = bus.wait(cursor, HEARTBEAT)
+            if not events:
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                cursor = event.id
+                if class_name and event.class_name != class_name: continue
+                if types and event.type not in types: continue
+                if visible is not None:
+                    if time.monotonic() - read_at >= HEARTBEAT: class_ids, read_at = visible(), time.monotonic()
+                    if event.class_id not in class_ids: continue
+                yield _format(event)
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
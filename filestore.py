@@ -0,0 +1,91 @@
+"""Content-addressed local storage for uploaded files.
+
+Uploads are streamed to a temp file BLOCK bytes at a time while their SHA-256
+is computed, then renamed to <root>/objects/<first two hex digits>/<digest>.
+Identical files (the same handout uploaded by a whole class) are kept once;
+the rename is atomic, so concurrent uploads of the same content are safe.
+Per-upload metadata (name, type, owner, size) lives in Storage, which is what
+the per-owner quota is counted from. The owner is the teacher whose token the
+upload came with; anonymous uploads (AUTH_REQUIRED off) share one quota. In
+SqlStorage an upload is only found by teachers of its owner's school (tenancy.py),
+so a download of another school's file is a 404.
+
+upload_response() and download_response() implement the /api/upload and
+/api/files/<id> endpoints for both servers. Downloads go through send_file
+with conditional=True, so Range requests, ETags and the WSGI server's
+sendfile() (or X-Sendfile with USE_X_SENDFILE) come for free.
+"""
+import hashlib
+import os
+import tempfile
+from flask import jsonify, request, send_file, url_for
+
+BLOCK = 64 * 1024
+MULTIPART_OVERHEAD = 16 * 1024
+IMMUTABLE = 365 * 24 * 3600
+
+class FileTooLarge(Exception):
+    pass
+
+class FileStore:
+    def __init__(self, root):
+        self.root = root
+        self.tmp = os.path.join(root, 'tmp')
+        os.makedirs(self.tmp, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def put(self, stream, limit):
+        """Writes `stream` to the store and returns (digest, size); raises FileTooLarge past `limit` bytes."""
+        sha, size = hashlib.sha256(), 0
+        fd, tmp = tempfile.mkstemp(dir=self.tmp)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    block = stream.read(BLOCK)
+                    if not block: break
+                    size += len(block)
+                    if size > limit: raise FileTooLarge(limit)
+                    sha.update(block)
+                    out.write(block)
+            digest = sha.hexdigest()
+            target = self.path(digest)
+            if os.path.exists(target):
+                os.remove(tmp)  # already stored
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp, target)
+            return digest, size
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+
+def upload_response(files, storage, max_bytes, quota, owner, endpoint='download_file'):
+    """Stores the request's file: a multipart 'file' field, or a raw body with ?filename=, and
+    counts it against `owner`'s quota. `endpoint` serves the file back (its URL is returned)."""
+    limit = min(max_bytes, quota - storage.upload_usage(owner))
+    if limit <= 0: return jsonify({'error': 'Upload quota exceeded'}), 413
+    if request.content_length and request.content_length > limit + MULTIPART_OVERHEAD:
+        return jsonify({'error': f'File is larger than {limit} bytes'}), 413
+
+    upload = request.files.get('file')
+    if upload is not None:
+        if upload.filename == '': return jsonify({'error': 'No selected file'}), 400
+        stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+    elif request.args.get('filename'):
+        stream, filename, content_type = request.stream, request.args['filename'], request.mimetype
+    else:
+        return jsonify({'error': 'No file part'}), 400
+
+    try: digest, size = files.put(stream, limit)
+    except FileTooLarge: return jsonify({'error': f'File is larger than {limit} bytes'}), 413
+    u = storage.add_upload({'digest': digest, 'size': size, 'filename': filename,
+                            'contentType': content_type or 'application/octet-stream', 'ownerId': owner})
+    return jsonify({'url': url_for(endpoint, upload_id=u['id'], _external=True), **u}), 200
+
+def download_response(files, storage, upload_id):
+    u = storage.get_upload(upload_id)
+    if not u: return jsonify({'error': 'Not found'}), 404
+    return send_file(files.path(u['digest']), mimetype=u['contentType'], download_name=u['filename'],
+                     conditional=True, etag=u['digest'], max_age=IMMUTABLE)
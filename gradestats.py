@@ -0,0 +1,132 @@
+"""Grade statistics computed over whole columns of marks at once.
+
+Marks are numeric (Score.marks_obtained). Absent and exempt students carry a
+marker instead of a mark: they are counted, but they are left out of every
+statistic. exam_stats() takes one exam's marks as a flat array and derives
+everything from a single sort:
+  - percentiles, mean and standard deviation
+  - a percentage histogram against the exam's total
+  - competition ranks ("1224": tied marks share a rank)
+class_rankings() does the same over each student's mean percentage across a
+class's exams.
+
+With NumPy installed the arithmetic runs in NumPy. Without it the same
+formulas run over array('d'), with one sort and bisect for the ranks. Both
+paths give the same numbers (linear-interpolated percentiles, population
+standard deviation). NumPy is imported on the first statistics call rather than
+with the module, which every worker loads at startup.
+"""
+import bisect
+import importlib.util
+import math
+from array import array
+from collections import defaultdict
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None  # optional: the array fallback computes the same results
+_np = None
+
+MARKERS = {'ab': 'absent', 'absent': 'absent', 'ex': 'exempt', 'exempt': 'exempt'}
+PERCENTILES = (10, 25, 50, 75, 90)
+BUCKETS = 10
+
+def parse_marks(value):
+    """(marks, marker) for an API value: a number or numeric string, or AB/absent, EX/exempt.
+
+    Raises ValueError for anything else, negative marks included.
+    """
+    if isinstance(value, str):
+        marker = MARKERS.get(value.strip().lower())
+        if marker: return None, marker
+    try:
+        if isinstance(value, bool): raise ValueError
+        marks = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Marks must be a number, AB or EX, got {value!r}') from None
+    if not math.isfinite(marks) or marks < 0: raise ValueError(f'Marks must be zero or more, got {value!r}')
+    return marks, None
+
+def record_marks(record):
+    """parse_marks() of a score record's marks, or of its marker when it has one (as exported, marks empty)."""
+    return parse_marks(record.get('marker') or record.get('marks'))
+
+def mark_value(marks):
+    """The JSON value of stored marks: whole numbers as ints."""
+    if marks is None: return None
+    return int(marks) if float(marks).is_integer() else marks
+
+def _numpy():
+    global _np
+    if _np is None and HAS_NUMPY:
+        import numpy
+        _np = numpy
+    return _np
+
+def _round(value, places=2):
+    return None if value is None else round(float(value), places)
+
+def exam_stats(student_ids, marks, total, absent=0, exempt=0, buckets=BUCKETS, ranking=True):
+    """Statistics for one exam: `marks` is an array('d') (or any sequence) of the marks of the
+    students in `student_ids`, in the same order; `total` is Exam.total_marks."""
+    n = len(marks)
+    stats = {'count': n, 'absent': absent, 'exempt': exempt, 'mean': None, 'std': None, 'median': None,
+             'min': None, 'max': None, 'percentiles': {f'p{q}': None for q in PERCENTILES},
+             'distribution': [0] * buckets}
+    if ranking: stats['ranking'] = []
+    if not n: return stats
+    np = _numpy()
+    if np is not None:
+        values = np.asarray(marks, dtype=float)
+        ordered = np.sort(values)
+        mean, std = values.mean(), values.std()
+        cuts = np.percentile(ordered, PERCENTILES)
+        ranks = n - np.searchsorted(ordered, values, side='right') + 1
+        percentages = values / total * 100 if total else np.zeros(n)
+        if total:
+            cells = np.clip((values / total * buckets).astype(int), 0, buckets - 1)
+            stats['distribution'] = np.bincount(cells, minlength=buckets).tolist()
+        ranks, percentages = ranks.tolist(), percentages.tolist()
+    else:
+        values = marks if isinstance(marks, array) else array('d', marks)
+        ordered = sorted(values)
+        mean = math.fsum(values) / n
+        std = math.sqrt(math.fsum((v - mean) ** 2 for v in values) / n)
+        cuts = [_percentile(ordered, q) for q in PERCENTILES]
+        ranks = [n - bisect.bisect_right(ordered, v) + 1 for v in values]
+        percentages = [v / total * 100 for v in values] if total else [0.0] * n
+        if total:
+            for v in values: stats['distribution'][min(max(int(v / total * buckets), 0), buckets - 1)] += 1
+    stats.update({'mean': _round(mean), 'std': _round(std), 'median': _round(cuts[PERCENTILES.index(50)]),
+                  'min': mark_value(float(ordered[0])), 'max': mark_value(float(ordered[-1])),
+                  'percentiles': {f'p{q}': _round(c) for q, c in zip(PERCENTILES, cuts)}})
+    if ranking:
+        stats['ranking'] = sorted(({'studentId': sid, 'marks': mark_value(float(v)), 'percentage': _round(p, 1), 'rank': r}
+                                   for sid, v, p, r in zip(student_ids, values, percentages, ranks)),
+                                  key=lambda row: (row['rank'], row['studentId']))
+    return stats
+
+def _percentile(ordered, q):
+    """Linear interpolation between the closest ranks, as numpy.percentile does by default."""
+    position = (len(ordered) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def class_rankings(exams, buckets=BUCKETS):
+    """exam_stats() over each student's mean percentage across `exams`, a list of
+    {'total', 'studentIds', 'marks'} columns (only exams with a total count)."""
+    exams = [e for e in exams if e['total']]
+    np = _numpy()
+    if np is not None and exams:
+        ids = np.concatenate([np.asarray(e['studentIds'], dtype=object) for e in exams])
+        percentages = np.concatenate([np.asarray(e['marks'], dtype=float) / e['total'] * 100 for e in exams])
+        students, index = np.unique(ids.astype(str), return_inverse=True)
+        means = np.bincount(index, weights=percentages, minlength=len(students)) / np.bincount(index, minlength=len(students))
+        students, means = students.tolist(), means
+    else:
+        sums, counts = defaultdict(float), defaultdict(int)
+        for e in exams:
+            for sid, v in zip(e['studentIds'], e['marks']):
+                sums[sid] += v / e['total'] * 100
+                counts[sid] += 1
+        students = sorted(sums)
+        means = array('d', (sums[s] / counts[s] for s in students))
+    return {'exams': len(exams), **exam_stats(students, means, 100, buckets=buckets)}
@@ -0,0 +1,172 @@
+"""Opt-in per-request instrumentation (enable with METRICS / EDUMATE_METRICS=1).
+
+For every request it records wall time per route, the number and time of SQL
+statements (SQLAlchemy engine events), ORM rows loaded and the time spent in the
+models' to_dict. Each response gets a Server-Timing header, /metrics serves the
+aggregates in Prometheus text format, and a sampled fraction of requests runs
+under cProfile, with the stats dumped when the request is slower than
+METRICS_PROFILE_SLOW_MS.
+
+Aggregates are per process; under gunicorn scrape every worker or run one.
+edumate_startup_seconds carries create_app()'s startup phases (server.py).
+"""
+import cProfile
+import os
+import random
+import threading
+import time
+from functools import wraps
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+def _labels(labels):
+    return ','.join(f'{k}="{v}"' for k, v in labels)
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name, self.help, self.buckets = name, help, buckets
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            s = self.series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for labels, s in sorted(self.series.items()):
+                base = _labels(labels)
+                sep = ',' if base else ''
+                for bound, count in zip(self.buckets, s):
+                    lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {s[-1]}')
+                lines.append(f'{self.name}_sum{{{base}}} {s[-2]}')
+                lines.append(f'{self.name}_count{{{base}}} {s[-1]}')
+        return lines
+
+class Counter:
+    def __init__(self, name, help):
+        self.name, self.help = name, help
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels, value=1):
+        with self.lock: self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for labels, value in sorted(self.series.items()):
+                lines.append(f'{self.name}{{{_labels(labels)}}} {value}')
+        return lines
+
+class Metrics:
+    def __init__(self):
+        self.requests = Counter('edumate_requests_total', 'Requests by route, method and status')
+        self.duration = Histogram('edumate_request_duration_seconds', 'Wall time per request', DURATION_BUCKETS)
+        self.sql_statements = Histogram('edumate_sql_statements', 'SQL statements per request', COUNT_BUCKETS)
+        self.sql_duration = Histogram('edumate_sql_duration_seconds', 'SQL time per request', DURATION_BUCKETS)
+        self.rows = Histogram('edumate_orm_rows_loaded', 'ORM rows loaded per request', COUNT_BUCKETS)
+        self.serialize = Histogram('edumate_serialize_duration_seconds', 'Time in to_dict per request', DURATION_BUCKETS)
+        self.all = (self.requests, self.duration, self.sql_statements, self.sql_duration, self.rows, self.serialize)
+        self.startup = {}  # phase -> seconds, filled in by create_app()
+
+    def render(self):
+        lines = [line for metric in self.all for line in metric.render()]
+        lines += ['# HELP edumate_startup_seconds Time this process took to import and build the app, per phase',
+                  '# TYPE edumate_startup_seconds gauge']
+        lines += [f'edumate_startup_seconds{{phase="{phase}"}} {seconds}' for phase, seconds in self.startup.items()]
+        return '\n'.join(lines) + '\n'
+
+def _stats():
+    return g.get('_metrics') if has_request_context() else None
+
+def _timed_to_dict(to_dict):
+    @wraps(to_dict)
+    def wrapper(self, *args, **kwargs):
+        stats = _stats()
+        if stats is None or stats['serialize_depth']: return to_dict(self, *args, **kwargs)
+        stats['serialize_depth'] += 1
+        started = time.perf_counter()
+        try: return to_dict(self, *args, **kwargs)
+        finally:
+            stats['serialize'] += time.perf_counter() - started
+            stats['serialize_depth'] -= 1
+    return wrapper
+
+def init_app(app, db):
+    """Installs the hooks when app.config['METRICS'] is set; returns the Metrics registry (or None)."""
+    if not app.config.get('METRICS'): return None
+    metrics = Metrics()
+    sample_rate = app.config.get('METRICS_PROFILE_SAMPLE', 0.0)
+    slow = app.config.get('METRICS_PROFILE_SLOW_MS', 500) / 1000
+    profile_dir = app.config.get('METRICS_PROFILE_DIR', 'profiles')
+
+    for mapper in db.Model.registry.mappers:
+        cls = mapper.class_
+        if 'to_dict' in cls.__dict__: cls.to_dict = _timed_to_dict(cls.to_dict)
+
+    @event.listens_for(db.Model, 'load', propagate=True)
+    def on_load(target, context):
+        stats = _stats()
+        if stats is not None: stats['rows'] += 1
+
+    def on_before_cursor(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+    def on_after_cursor(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_query_started'].pop()
+        stats = _stats()
+        if stats is not None:
+            stats['sql'] += 1
+            stats['sql_time'] += time.perf_counter() - started
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', on_before_cursor)
+        event.listen(db.engine, 'after_cursor_execute', on_after_cursor)
+
+    @app.before_request
+    def start_request():
+        g._metrics = {'start': time.perf_counter(), 'sql': 0, 'sql_time': 0.0, 'rows': 0, 'serialize': 0.0, 'serialize_depth': 0}
+        if sample_rate and random.random() < sample_rate:
+            g._profiler = cProfile.Profile()
+            g._profiler.enable()
+
+    @app.after_request
+    def finish_request(response):
+        stats = g.pop('_metrics', None)
+        if stats is None: return response
+        elapsed = time.perf_counter() - stats['start']
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            if elapsed >= slow:
+                os.makedirs(profile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(profile_dir, f"{request.endpoint}-{int(time.time() * 1000)}-{int(elapsed * 1000)}ms.prof"))
+
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (('route', route), ('method', request.method))
+        metrics.requests.inc(labels + (('status', response.status_code),))
+        metrics.duration.observe(labels, elapsed)
+        metrics.sql_statements.observe(labels, stats['sql'])
+        metrics.sql_duration.observe(labels, stats['sql_time'])
+        metrics.rows.observe(labels, stats['rows'])
+        metrics.serialize.observe(labels, stats['serialize'])
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.2f}, db;dur={stats["sql_time"] * 1000:.2f};desc="{stats["sql"]} queries", '
+            f'serialize;dur={stats["serialize"] * 1000:.2f}, rows;desc="{stats["rows"]} rows"')
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    return metrics
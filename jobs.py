@@ -0,0 +1,126 @@
+"""Background jobs for work that should not run on the request thread.
+
+JobRunner.submit() records a Job row (database.py) and queues fn(job, *args)
+on a thread pool inside an application context; the request returns the job
+at once and clients poll GET /api/jobs/<id>. The state lives in the job table
+of the app's own database, so any worker process can answer for any job and
+no broker is involved.
+
+Job bodies report through job.progress(); the row is updated at most every
+FLUSH_INTERVAL seconds. Cancellation is cooperative: cancel() sets a flag that
+progress() picks up on its next flush and raises as JobCancelled, so the job
+stops at a chunk boundary and keeps what it already committed. Jobs whose
+process went away (restart, crash) are reported as failed. A job body keeps
+the query scope of the request that submitted it (tenancy.py), and the job is
+listed only to that teacher.
+
+Threads rather than processes: job bodies need the app, its engine and the
+write queue, and SQLite only has one writer at a time anyway.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from database import db, Job
+from storage import new_id
+import tenancy
+
+FLUSH_INTERVAL = 0.5
+ACTIVE = ('queued', 'running')
+
+class JobCancelled(Exception):
+    pass
+
+def _alive(pid):
+    try: os.kill(pid, 0)
+    except ProcessLookupError: return False
+    except PermissionError: pass
+    return True
+
+class RunningJob:
+    """Handle passed to a job body."""
+    def __init__(self, runner, job_id):
+        self.runner, self.id = runner, job_id
+        self.processed, self.total, self.result = 0, None, {}
+        self.cancelled = False
+        self.flushed = time.monotonic()
+
+    def progress(self, processed, total=None, **result):
+        self.processed = processed
+        if total is not None: self.total = total
+        self.result.update(result)
+        if time.monotonic() - self.flushed >= FLUSH_INTERVAL: self.flush()
+        if self.cancelled: raise JobCancelled()
+
+    def flush(self, **values):
+        self.flushed = time.monotonic()
+        cancel = self.runner.save(self.id, processed=self.processed, total=self.total,
+                                  result=json.dumps(self.result), **values)
+        self.cancelled = self.cancelled or bool(cancel)
+
+class JobRunner:
+    def __init__(self, app, workers=2):
+        self.app = app
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='edumate-job')
+        self.active = set()  # ids of jobs queued or running in this process
+        self.lock = threading.Lock()
+
+    def submit(self, kind, fn, *args):
+        """Records a queued job, schedules fn(job, *args) and returns the job dict."""
+        now = time.time()
+        job = Job(id=new_id('j'), kind=kind, teacher_id=tenancy.teacher_id(), status='queued', worker=os.getpid(),
+                  created_at=now, updated_at=now)
+        db.session.add(job)
+        db.session.commit()
+        with self.lock: self.active.add(job.id)
+        self.pool.submit(self._run, job.id, tenancy.carry(fn), args)
+        return job.to_dict()
+
+    def save(self, job_id, **values):
+        """Updates the job row in its own short transaction; returns whether cancellation was requested."""
+        with db.engine.connect() as conn:
+            conn.execution_options(sqlite_immediate=True)
+            with conn.begin():
+                conn.execute(db.update(Job).where(Job.id == job_id).values(updated_at=time.time(), **values))
+                return conn.execute(db.select(Job.cancel_requested).where(Job.id == job_id)).scalar()
+
+    def get(self, job_id):
+        job = db.session.get(Job, job_id)
+        if job and job.status in ACTIVE and not self._owned(job):
+            job.status, job.error = 'failed', 'worker exited before the job finished'
+            db.session.commit()
+        return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job and job.status in ACTIVE:
+            job.cancel_requested = True
+            db.session.commit()
+        return job
+
+    def _owned(self, job):
+        if job.worker == os.getpid():
+            with self.lock: return job.id in self.active
+        return job.worker is not None and _alive(job.worker)
+
+    def _run(self, job_id, fn, args):
+        try:
+            with self.app.app_context():
+                job = RunningJob(self, job_id)
+                if self.save(job_id, status='running'):
+                    self.save(job_id, status='cancelled')
+                    return
+                try:
+                    fn(job, *args)
+                except JobCancelled:
+                    db.session.rollback()
+                    job.flush(status='cancelled')
+                except Exception as exc:
+                    self.app.logger.exception('Job %s failed', job_id)
+                    db.session.rollback()
+                    job.flush(status='failed', error=str(exc))
+                else:
+                    job.flush(status='done')
+        finally:
+            with self.lock: self.active.discard(job_id)
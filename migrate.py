@@ -0,0 +1,257 @@
+"""Brings an existing edumate.db up to the current models without losing data.
+
+db.create_all() only creates missing tables, it never alters existing ones, so
+every schema change to an existing table gets a numbered step here. The number
+of applied steps is stored in SQLite's PRAGMA user_version.
+
+Usage: flask --app server bootstrap (or python migrate.py). Workers never
+migrate: at startup they compare the stored version with LATEST (SCHEMA_CHECK).
+"""
+from datetime import datetime
+import click
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from auth import is_hashed, normalise_email
+from database import db, DEFAULT_PERIOD, DEFAULT_SCHOOL, Attendance, Score, Teacher
+from analytics import parse_date
+from gradestats import parse_marks
+from storage import parse_timestamp
+from schedule import SlotError, parse_slot
+
+def _v1_lookup_indexes(conn):
+    # Unique indexes cannot be created over duplicate keys: backfill the period
+    # column and keep only the newest row for each key before adding them.
+    conn.exec_driver_sql("UPDATE attendance SET period = ? WHERE period IS NULL", (DEFAULT_PERIOD,))
+    conn.exec_driver_sql("DELETE FROM attendance WHERE id NOT IN (SELECT MAX(id) FROM attendance GROUP BY date, student_id, period)")
+    conn.exec_driver_sql("DELETE FROM score WHERE id NOT IN (SELECT MAX(id) FROM score GROUP BY exam_id, student_id)")
+    for statement in (
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_date_student_period ON attendance (date, student_id, period)",
+        "CREATE INDEX IF NOT EXISTS ix_attendance_student_id ON attendance (student_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_score_exam_student ON score (exam_id, student_id)",
+        "CREATE INDEX IF NOT EXISTS ix_score_student_id ON score (student_id)",
+        "CREATE INDEX IF NOT EXISTS ix_student_class_id ON student (class_id)",
+        "CREATE INDEX IF NOT EXISTS ix_exam_class_id ON exam (class_id)",
+        "CREATE INDEX IF NOT EXISTS ix_submission_assignment_student ON submission (assignment_id, student_id)",
+    ):
+        conn.exec_driver_sql(statement)
+
+def _v2_submission_student_index(conn):
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_submission_student_id ON submission (student_id)")
+
+def _v3_typed_notifications(conn):
+    # created_at (DATETIME) replaces the free-form timestamp string; unparseable values fall back to
+    # now so they are kept until the next retention window. class_id links rows to their class by name.
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(notification)")}
+    if 'class_id' not in columns:
+        conn.exec_driver_sql("ALTER TABLE notification ADD COLUMN class_id VARCHAR(80) REFERENCES class (id)")
+    if 'created_at' not in columns:
+        conn.exec_driver_sql("ALTER TABLE notification ADD COLUMN created_at DATETIME")
+    if 'timestamp' in columns:
+        now = datetime.now()
+        for nid, timestamp in conn.exec_driver_sql("SELECT id, timestamp FROM notification WHERE created_at IS NULL").all():
+            try: created_at = parse_timestamp(timestamp or '')
+            except ValueError: created_at = now
+            # same text layout SQLAlchemy's SQLite DateTime writes, so comparisons stay consistent
+            conn.exec_driver_sql("UPDATE notification SET created_at = ? WHERE id = ?",
+                                 (created_at.strftime('%Y-%m-%d %H:%M:%S.%f'), nid))
+        conn.exec_driver_sql("ALTER TABLE notification DROP COLUMN timestamp")
+    conn.exec_driver_sql("UPDATE notification SET class_id = (SELECT MIN(id) FROM class WHERE class.name = notification.class_name) "
+                         "WHERE class_id IS NULL")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_notification_class_created ON notification (class_id, created_at)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_notification_created_at ON notification (created_at)")
+
+def _v4_typed_timetable(conn):
+    # day/time strings become weekday and start/end minutes (end = start + DEFAULT_MINUTES). Rows whose
+    # day or time cannot be read could never be placed on the week: they are moved, as they were, to
+    # timetable_unparsed, for someone to fix and enter again (report() lists them).
+    columns = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(timetable)")]
+    for column in ('weekday', 'start_minute', 'end_minute'):
+        if column not in columns: conn.exec_driver_sql(f"ALTER TABLE timetable ADD COLUMN {column} SMALLINT")
+    if 'day' in columns:
+        copied = ', '.join(f'"{column}"' for column in columns)
+        for tid, day, time in conn.exec_driver_sql("SELECT id, day, time FROM timetable WHERE weekday IS NULL").all():
+            try:
+                weekday, start, end = parse_slot({'day': day, 'time': time})
+                conn.exec_driver_sql("UPDATE timetable SET weekday = ?, start_minute = ?, end_minute = ? WHERE id = ?",
+                                     (weekday, start, end, tid))
+            except SlotError:
+                conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS timetable_unparsed AS SELECT {copied} FROM timetable WHERE 0")
+                conn.exec_driver_sql(f"INSERT INTO timetable_unparsed SELECT {copied} FROM timetable WHERE id = ?", (tid,))
+                conn.exec_driver_sql("DELETE FROM timetable WHERE id = ?", (tid,))
+        conn.exec_driver_sql("ALTER TABLE timetable DROP COLUMN day")
+        conn.exec_driver_sql("ALTER TABLE timetable DROP COLUMN time")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_timetable_teacher_slot ON timetable (teacher, weekday, start_minute)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_timetable_location_slot ON timetable (location, weekday, start_minute)")
+
+def _rebuild(conn, model, select, convert, chunk=5000):
+    # SQLite cannot change a column's type: move the table aside, create it again from the model and
+    # copy the rows of `select` across through convert(row) -> column dict, or None to drop the row.
+    # Rows are copied in id order with INSERT OR REPLACE, so of rows that now share a key the newest wins.
+    table = model.__table__.name
+    for (name,) in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+                                        "AND sql IS NOT NULL", (table,)).all():
+        conn.exec_driver_sql(f'DROP INDEX "{name}"')
+    conn.exec_driver_sql(f"ALTER TABLE {table} RENAME TO {table}_old")
+    model.__table__.create(conn)
+    rows = conn.exec_driver_sql(select)
+    while batch := rows.fetchmany(chunk):
+        values = [v for v in map(convert, batch) if v is not None]
+        if values: conn.execute(insert(model).prefix_with('OR REPLACE'), values)
+    conn.exec_driver_sql(f"DROP TABLE {table}_old")
+
+def _v5_normalised_attendance(conn):
+    # date becomes a DATE and class_id replaces the student/class names copied onto every row. Rows
+    # whose date cannot be read or whose student is gone cannot be placed in a class's register: they
+    # are moved, as they were, to attendance_unparsed (report() counts them).
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_attendance_student_id")  # superseded by ix_attendance_student_date
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(attendance)")}
+    if 'student_name' not in columns: return
+    unplaced = []
+    for aid, date, student in conn.exec_driver_sql("SELECT a.id, a.date, s.id FROM attendance a "
+                                                   "LEFT JOIN student s ON s.id = a.student_id").all():
+        try: parse_date(date)
+        except ValueError: student = None
+        if student is None: unplaced.append((aid,))
+    if unplaced:
+        conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS attendance_unparsed AS SELECT * FROM attendance WHERE 0")
+        conn.exec_driver_sql("INSERT INTO attendance_unparsed SELECT * FROM attendance WHERE id = ?", unplaced)
+        conn.exec_driver_sql("DELETE FROM attendance WHERE id = ?", unplaced)
+    def convert(row):
+        aid, date, period, student_id, class_id, status = row
+        return {'id': aid, 'date': parse_date(date), 'period': period or DEFAULT_PERIOD, 'student_id': student_id,
+                'class_id': class_id, 'status': status}
+    _rebuild(conn, Attendance, "SELECT a.id, a.date, a.period, a.student_id, s.class_id, a.status FROM attendance_old a "
+                               "JOIN student s ON s.id = a.student_id ORDER BY a.id", convert)
+
+def _v6_numeric_scores(conn):
+    # marks_obtained becomes REAL, with marker 'absent'/'exempt' in place of a mark. Text that is
+    # neither a number nor a marker (blank, '-', typos) is kept as absent rather than dropped.
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(score)")}
+    if 'marker' in columns: return
+    def convert(row):
+        sid, exam_id, student_id, text = row
+        try: marks, marker = parse_marks(text)
+        except ValueError: marks, marker = None, 'absent'
+        return {'id': sid, 'exam_id': exam_id, 'student_id': student_id, 'marks_obtained': marks, 'marker': marker}
+    _rebuild(conn, Score, "SELECT id, exam_id, student_id, marks_obtained FROM score_old ORDER BY id", convert)
+
+def _v7_score_versions(conn):
+    # Existing sheets start at version 0, like the cells already in them
+    for table in ('exam', 'score'):
+        columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if 'version' not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+def _v8_hashed_passwords(conn):
+    # Plain-text passwords are replaced by their hash (SQLite does not enforce the wider VARCHAR, so
+    # no rebuild). Emails are lower-cased so login is an equality lookup, except where that would
+    # collide with another account; those are left as they are and reported.
+    taken = {email for (email,) in conn.exec_driver_sql("SELECT email FROM teacher")}
+    for tid, email, password in conn.exec_driver_sql("SELECT id, email, password FROM teacher").all():
+        if not is_hashed(password):
+            conn.exec_driver_sql("UPDATE teacher SET password = ? WHERE id = ?", (generate_password_hash(password or ''), tid))
+        lowered = normalise_email(email)
+        if lowered != email and lowered not in taken:
+            conn.exec_driver_sql("UPDATE teacher SET email = ? WHERE id = ?", (lowered, tid))
+            taken.add(lowered)
+
+def unparsed_timetable():
+    with db.engine.connect() as conn:
+        if not conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'timetable_unparsed'").first(): return []
+        return conn.exec_driver_sql("SELECT id, day, time, subject FROM timetable_unparsed ORDER BY id").all()
+
+def unparsed_attendance():
+    with db.engine.connect() as conn:
+        if not conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'attendance_unparsed'").first(): return 0
+        return conn.exec_driver_sql("SELECT COUNT(*) FROM attendance_unparsed").scalar()
+
+def mixed_case_emails():
+    return [email for (email,) in db.session.query(Teacher.email) if email != normalise_email(email)]
+
+def _v9_schools(conn):
+    # Everything that exists joins the default school. Existing classes stay unowned, i.e. shared by
+    # its teachers, until `flask --app server set-class-owner` gives them to one. SQLite only adds
+    # columns without REFERENCES here; the models carry the foreign keys for new databases.
+    conn.exec_driver_sql("INSERT OR IGNORE INTO school (id, name) VALUES (?, 'Default school')", (DEFAULT_SCHOOL,))
+    for table, column, definition in (('teacher', 'school_id', f"VARCHAR(80) NOT NULL DEFAULT '{DEFAULT_SCHOOL}'"),
+                                      ('class', 'school_id', f"VARCHAR(80) NOT NULL DEFAULT '{DEFAULT_SCHOOL}'"),
+                                      ('class', 'teacher_id', "VARCHAR(80)"),
+                                      ('timetable', 'school_id', f"VARCHAR(80) NOT NULL DEFAULT '{DEFAULT_SCHOOL}'"),
+                                      ('job', 'teacher_id', "VARCHAR(80)")):
+        columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if column not in columns: conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN {column} {definition}')
+    # The timetable slot indexes gain a school_id prefix: teacher and room names only clash within a school
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_timetable_teacher_slot")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_timetable_location_slot")
+    for statement in (
+        "CREATE INDEX ix_timetable_teacher_slot ON timetable (school_id, teacher, weekday, start_minute)",
+        "CREATE INDEX ix_timetable_location_slot ON timetable (school_id, location, weekday, start_minute)",
+        'CREATE INDEX IF NOT EXISTS ix_class_school_teacher ON "class" (school_id, teacher_id)',
+        "CREATE INDEX IF NOT EXISTS ix_job_teacher_status ON job (teacher_id, status)",
+    ):
+        conn.exec_driver_sql(statement)
+
+STEPS = [_v1_lookup_indexes, _v2_submission_student_index, _v3_typed_notifications, _v4_typed_timetable,
+         _v5_normalised_attendance, _v6_numeric_scores, _v7_score_versions, _v8_hashed_passwords, _v9_schools]
+
+LATEST = len(STEPS)
+
+def current_version():
+    with db.engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+def _drop_placeholder_assignments():
+    # Before Assignment had real columns its table held only an id, and no endpoint could write to it.
+    # Such a table is always empty: drop it so create_all() builds the real one.
+    with db.engine.begin() as conn:
+        columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(assignment)")}
+        if columns == {'id'}: conn.exec_driver_sql("DROP TABLE assignment")
+
+def upgrade():
+    """Creates missing tables, then runs every step newer than the stored version.
+
+    Returns (version_before, version_after). Each step runs in the same transaction
+    as its version bump, so a failed step leaves the database at the previous version.
+    """
+    _drop_placeholder_assignments()
+    db.create_all()
+    before = current_version()
+    for number, step in enumerate(STEPS[before:], start=before + 1):
+        with db.engine.begin() as conn:
+            step(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+    return before, max(before, LATEST)
+
+def report(before, after):
+    """Prints what the steps between `before` and `after` changed and what to do about it. Needs an app context."""
+    if before < 1 <= after:
+        click.echo("Duplicate attendance/score rows, if any, were collapsed; run `flask --app server rebuild-rollups` if ANALYTICS_ROLLUPS is on.")
+    if before < 4 <= after:
+        click.echo("Timetable day/time strings were converted to slots.")
+        unparsed = unparsed_timetable()
+        if unparsed:
+            click.echo(f"{len(unparsed)} entries whose day or time could not be read were moved to the timetable_unparsed table:")
+            for tid, day, time, subject in unparsed: click.echo(f"  {tid}: {day!r} {time!r} {subject}")
+    if before < 5 <= after:
+        click.echo("Attendance dates were converted to DATE. "
+              "Run `flask --app server rebuild-rollups` if ANALYTICS_ROLLUPS or ATTENDANCE_BITMAPS is on.")
+        unparsed = unparsed_attendance()
+        if unparsed:
+            click.echo(f"{unparsed} attendance rows whose date could not be read or whose student is gone were moved to the "
+                       "attendance_unparsed table.")
+    if before < 6 <= after:
+        click.echo("Scores are numeric now; marks that were neither a number nor AB/EX were kept as absent.")
+    if before < 8 <= after:
+        click.echo("Passwords are stored hashed now. Set EDUMATE_SECRET_KEY before running more than one worker.")
+        clashes = mixed_case_emails()
+        if clashes: click.echo(f"These emails differ only in case from another account and cannot log in until merged: {', '.join(clashes)}")
+    if before < 9 <= after:
+        click.echo("Existing teachers, classes and timetable belong to the default school; existing classes are shared by all "
+              "its teachers until `flask --app server set-class-owner CLASS_ID EMAIL` assigns them.")
+
+if __name__ == '__main__':
+    from server import create_app
+    with create_app(SCHEMA_CHECK='off').app_context():
+        before, after = upgrade()
+        click.echo(f"Schema version {before} -> {after}")
+        report(before, after)
@@ -0,0 +1,118 @@
+"""SQL statement-count regression harness for the server.py endpoints.
+
+Seeds the database at a small and a large size and checks that every
+endpoint in CHECKS issues exactly the expected number of statements at both
+sizes, so an N+1 (e.g. RELATIONSHIP_LOADING=lazy on /api/classes) fails here
+instead of showing up as a slow page. tests/test_querycount.py runs the checks
+under pytest; `python querycount.py` prints every count against an in-memory
+database.
+"""
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+from sqlalchemy import event
+
+@contextmanager
+def count_queries(engine):
+    """Collects the SQL text of every statement `engine` executes inside the block.
+
+    BEGIN is left out: pysqlite issues its own implicitly, unseen, unless dbprofile.py emits it.
+    """
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith('BEGIN'): statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', record)
+    try: yield statements
+    finally: event.remove(engine, 'before_cursor_execute', record)
+
+def seed(db, classes, students):
+    """Creates teacher qc@edu.com, classes c0..cN, students c<i>s<j>, exam c<i>e0 per class with scores (and c<i>e1 without),
+    and a day of attendance."""
+    from database import Class, Student, Exam, Score, Attendance, Timetable, Notification, Teacher
+    from werkzeug.security import generate_password_hash
+    db.session.add(Teacher(id='t0', name='QC', email='qc@edu.com', password=generate_password_hash(LOGIN['password'])))
+    for i in range(classes):
+        cid = f'c{i}'
+        db.session.add(Class(id=cid, name=f'Class {i}', coordinator_name='Coordinator', coordinator_phone=''))
+        db.session.add(Exam(id=f'{cid}e0', title='Mid-Term', total_marks=100, class_id=cid))
+        db.session.add(Exam(id=f'{cid}e1', title='Finals', total_marks=100, class_id=cid))
+        db.session.add(Timetable(id=f'{cid}t0', weekday=0, start_minute=540, end_minute=585, subject='Physics', location=f'Room {i}'))
+        db.session.add(Notification(id=f'{cid}n0', message='Welcome', class_name=f'Class {i}', class_id=cid, created_at=datetime(2025, 12, 1, 9)))
+        for j in range(students):
+            sid = f'{cid}s{j}'
+            db.session.add(Student(id=sid, name=f'Student {j}', roll=str(j), class_id=cid))
+            db.session.add(Score(exam_id=f'{cid}e0', student_id=sid, marks_obtained=j % 100))
+            db.session.add(Attendance(date=date(2025, 12, 1), student_id=sid, class_id=cid, status='P'))
+    db.session.commit()
+
+LOGIN = {'email': 'QC@edu.com', 'password': 'querycount'}
+
+def _attendance(students):
+    return [{'date': '12/02/2025', 'studentId': f'c0s{j}', 'studentName': f'Student {j}', 'className': 'Class 0', 'status': 'P'} for j in range(students)]
+
+def _scores(students):
+    return [{'examId': 'c0e0', 'studentId': f'c0s{j}', 'marks': '50'} for j in range(students)]
+
+def _score_changes(students):
+    return {'examId': 'c0e1', 'version': 0, 'changes': [{'studentId': f'c0s{j}', 'marks': 60} for j in range(min(students, 3))]}
+
+# Statements for a class list with embedded students, per RELATIONSHIP_LOADING ('lazy' is N+1 and has no fixed count)
+EMBEDDED = {'selectin': 2, 'joined': 1}
+
+# (method, path, body factory taking the student count, expected statement count)
+CHECKS = [
+    ('POST', '/api/login', lambda students: LOGIN, 1),  # one lookup on the unique email index; the token needs no query
+    ('GET', '/api/classes', None, EMBEDDED),
+    ('GET', '/api/classes?fields=id,name', None, 1),
+    ('GET', '/api/classes?limit=10', None, EMBEDDED),
+    ('GET', '/api/exams', None, 1),
+    ('GET', '/api/timetable', None, 1),
+    ('GET', '/api/notifications', None, 1),
+    ('GET', '/api/notifications?classId=c0&since=2025-11-30T00:00:00', None, 1),
+    ('GET', '/api/attendance?date=12/01/2025', None, 1),
+    ('GET', '/api/attendance?classId=c0&from=2025-11-01&to=2025-12-31', None, 1),
+    ('GET', '/api/students/c0s0/attendance/months?from=2025-09&to=2025-12', None, 1),
+    ('GET', '/api/classes/c0/attendance/heatmap?month=2025-12', None, 2),
+    ('GET', '/api/scores?examId=c0e0', None, 1),
+    ('GET', '/api/students/c0s0/analytics', None, 2),
+    ('GET', '/api/classes/c0/analytics', None, 3),
+    ('GET', '/api/classes/c0/rankings', None, 2),
+    ('GET', '/api/exams/c0e0/stats', None, 1),
+    ('POST', '/api/attendance', _attendance, 2),
+    ('POST', '/api/scores', _scores, 3),  # exam/student/class check (also feeds the event stream) + version bump + upsert
+    ('POST', '/api/scores', _score_changes, 3),  # exam/student/class check + conditional version bump + upsert
+    ('GET', '/api/exams/c0e0/scores?since=0', None, 2),
+]
+
+SIZES = [(3, 5), (30, 40)]
+
+def measure(app, db, classes, students):
+    """Seeds one size and runs CHECKS in order; yields (ok, report line) for each."""
+    client = app.test_client()
+    with app.app_context():
+        db.drop_all(); db.create_all()
+        seed(db, classes, students)
+        engine = db.engine
+    headers = {'Authorization': 'Bearer ' + client.post('/api/login', json=LOGIN).json['token']}
+    for method, path, body, expected in CHECKS:
+        if isinstance(expected, dict): expected = expected.get(app.config['RELATIONSHIP_LOADING'])
+        with count_queries(engine) as statements:
+            response = client.open(path, method=method, json=body(students) if body else None, headers=headers)
+        ok = len(statements) == expected and response.status_code < 400
+        yield ok, f"{'ok' if ok else 'FAIL':4} {classes}x{students:<4} {method:4} {path:40} {len(statements):3} (expected {expected}) -> {response.status_code}"
+
+def run(app, db):
+    """Prints every check at every size; returns the report lines of those that failed."""
+    failures = []
+    for classes, students in SIZES:
+        for ok, line in measure(app, db, classes, students):
+            print(line)
+            if not ok: failures.append(line)
+    return failures
+
+if __name__ == '__main__':
+    os.environ.setdefault('EDUMATE_RESPONSE_CACHE', 'off')  # measure the handlers, not cache hits
+    from server import create_app
+    from database import db
+    sys.exit(1 if run(create_app('testing'), db) else 0)
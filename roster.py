@@ -0,0 +1,152 @@
+"""Bulk roster import and streaming export.
+
+Import: the upload is spooled to a temp file by the request and then read by
+import_roster() on a background job (jobs.py). Rows are validated one by one
+against the Student column limits and the class's existing roll numbers, and
+valid rows are written CHUNK at a time, each chunk in one transaction. Job
+progress carries the inserted count and per-row errors keyed by the row
+number as it appears in the spreadsheet (the header is row 1).
+
+CSV is always available; .xlsx needs the optional openpyxl package, which is
+only imported when an .xlsx roster is read.
+
+Export: export_csv() streams any of EXPORTS as CSV using the same keyset
+chunks as the list endpoints, so memory stays flat however large the table.
+"""
+import csv
+import importlib.util
+import io
+import os
+import re
+import shutil
+import tempfile
+from database import db, Class, Student, Attendance, Exam, Score
+from listing import chunks, CHUNK
+from storage import STUDENT_FIELDS, new_id
+
+XLSX = importlib.util.find_spec('openpyxl') is not None  # optional, only needed for .xlsx rosters
+
+ROSTER_COLUMNS = tuple(STUDENT_FIELDS)
+MAX_REPORTED_ERRORS = 1000
+EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+def _normalise(header):
+    return re.sub(r'[\s_-]', '', str(header or '')).lower()
+
+HEADERS = {_normalise(key): key for key in ROSTER_COLUMNS}
+
+def _lengths():
+    columns = Student.__table__.c
+    return {key: getattr(columns[column].type, 'length', None) for key, column in STUDENT_FIELDS.items()}
+
+def _records(header, rows):
+    keys = [HEADERS.get(_normalise(h)) for h in header]
+    for row in rows:
+        yield {k: ('' if v is None else str(v).strip()) for k, v in zip(keys, row) if k}
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = csv.reader(f)
+        yield from _records(next(rows, []), rows)
+
+def read_xlsx(path):
+    if not XLSX: raise RuntimeError('XLSX import needs openpyxl (pip install openpyxl)')
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        yield from _records(next(rows, ()), rows)
+    finally:
+        wb.close()
+
+READERS = {'csv': read_csv, 'xlsx': read_xlsx}
+
+def validate(record, rolls, lengths):
+    """Returns (student column dict, []) for a good row or (None, [messages])."""
+    errors = []
+    for key in ('name', 'roll'):
+        if not record.get(key): errors.append(f'{key} is required')
+    for key, limit in lengths.items():
+        if limit and len(record.get(key, '')) > limit: errors.append(f'{key} is longer than {limit} characters')
+    if record.get('email') and not EMAIL.match(record['email']): errors.append('email is not valid')
+    if record.get('roll') in rolls: errors.append(f"roll {record['roll']} is already used in this class")
+    if errors: return None, errors
+    rolls.add(record['roll'])
+    student = {column: record.get(key, '') for key, column in STUDENT_FIELDS.items()}
+    student['status'] = student['status'] or 'Day Scholar'
+    student['id'] = new_id('s')
+    return student, []
+
+def spool(stream, fmt):
+    """Copies an upload to a temp file in fixed-size blocks and returns its path."""
+    fd, path = tempfile.mkstemp(prefix='edumate-roster-', suffix='.' + fmt)
+    with os.fdopen(fd, 'wb') as out: shutil.copyfileobj(stream, out, 64 * 1024)
+    return path
+
+def import_roster(job, storage, class_id, path, fmt, on_chunk=None):
+    """Job body: imports the spooled roster at `path` into class_id and removes the file."""
+    try:
+        read = READERS[fmt]
+        total = sum(1 for _ in read(path))
+        rolls = {roll for (roll,) in db.session.query(Student.roll).filter_by(class_id=class_id)}
+        lengths = _lengths()
+        inserted, errors, error_rows, batch = 0, [], 0, []
+        job.progress(0, total=total, inserted=0, errorRows=0, errors=errors)
+
+        def flush():
+            nonlocal inserted
+            inserted += storage.import_students(class_id, batch)
+            batch.clear()
+            if on_chunk: on_chunk()
+
+        for n, record in enumerate(read(path), start=1):
+            if any(record.values()):
+                student, problems = validate(record, rolls, lengths)
+                if student: batch.append(student)
+                else:
+                    error_rows += 1
+                    if len(errors) < MAX_REPORTED_ERRORS: errors.append({'row': n + 1, 'errors': problems})
+                if len(batch) >= CHUNK: flush()
+            job.progress(n, inserted=inserted, errorRows=error_rows)
+        if batch: flush()
+        job.progress(total, inserted=inserted, errorRows=error_rows)
+    finally:
+        os.remove(path)
+
+# --- EXPORT ---
+EXPORTS = {
+    # kind: (model, key column, CSV columns, class filter)
+    'classes': (Class, Class.id, ('id', 'name', 'coordinatorName', 'coordinatorPhone'),
+                lambda cid: Class.id == cid),
+    'students': (Student, Student.id, ('id',) + ROSTER_COLUMNS + ('classId',),
+                 lambda cid: Student.class_id == cid),
+    'attendance': (Attendance, Attendance.id, ('id', 'date', 'studentId', 'studentName', 'classId', 'className', 'period', 'status'),
+                   lambda cid: Attendance.class_id == cid),
+    'scores': (Score, Score.id, ('examId', 'studentId', 'marks', 'marker'),
+               lambda cid: Score.exam_id.in_(db.select(Exam.id).where(Exam.class_id == cid))),
+}
+
+def serializer(kind):
+    if kind == 'classes': return lambda c: c.to_dict(students=False)
+    if kind == 'students': return lambda s: {**s.to_dict(), 'classId': s.class_id}
+    return lambda row: row.to_dict()
+
+def export_query(kind, class_id=None):
+    model, key, _, class_filter = EXPORTS[kind]
+    query = model.query
+    if class_id: query = query.filter(class_filter(class_id))
+    return query, key
+
+def export_csv(kind, class_id=None):
+    """Yields the CSV text of an export one keyset chunk at a time."""
+    query, key = export_query(kind, class_id)
+    columns, serialize = EXPORTS[kind][2], serializer(kind)
+    buf = io.StringIO()
+    out = csv.DictWriter(buf, columns, extrasaction='ignore')
+    out.writeheader()
+    for rows in chunks(query, key, CHUNK):
+        for row in rows: out.writerow(serialize(row))
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell(): yield buf.getvalue()
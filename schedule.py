@@ -0,0 +1,144 @@
+"""Weekly timetable slots and double-booking detection.
+
+A slot is a weekday (0 = Monday) and a half-open [start, end) range in minutes
+after midnight. A teacher or a location is never booked twice at once, so per
+(resource, weekday) its entries are disjoint intervals sorted by start, and
+every question is one binary search:
+  - does [s, e) clash?  only the last entry starting before e can overlap it
+  - what is on at t?    the last entry starting at or before t, if not yet over
+  - what is next?       the first entry starting after t (wrapping the week)
+ScheduleIndex answers them in memory. MemoryStorage keeps one for the whole
+timetable; SqlStorage answers now/next with ORDER BY ... LIMIT 1 on the
+(teacher|location, weekday, start_minute) indexes and checks a write by loading
+only the affected teacher and room days through them. check_batch validates a
+whole import, against the stored timetable and against itself, in one pass.
+"""
+import bisect
+from collections import defaultdict
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+DEFAULT_MINUTES = 45  # length of a slot given only a start time
+RESOURCES = ('teacher', 'location')
+
+class SlotError(ValueError):
+    pass
+
+class ScheduleConflict(Exception):
+    def __init__(self, conflicts):
+        super().__init__(f'{len(conflicts)} double-booking(s)')
+        self.conflicts = conflicts  # [{'entry', 'resource', 'name', 'conflictsWith'}]
+
+def parse_day(value):
+    if isinstance(value, int) and 0 <= value < 7: return value
+    name = str(value or '').strip().lower()
+    for i, day in enumerate(DAYS):
+        if name and (name == day.lower() or name == day[:3].lower()): return i
+    raise SlotError(f'Unknown day {value!r}')
+
+def parse_clock(value):
+    """Minutes after midnight of 'HH:MM', or of a 12-hour 'H:MM AM' / 'H PM'."""
+    text = str(value).strip().lower()
+    half = text[-2:] if text.endswith(('am', 'pm')) else None
+    if half: text = text[:-2].strip()
+    try:
+        hours, minutes = text.split(':') if ':' in text or not half else (text, '0')
+        hours, minutes = int(hours), int(minutes)
+        if half:
+            if not 1 <= hours <= 12: raise ValueError
+            hours = hours % 12 + (12 if half == 'pm' else 0)
+        total = hours * 60 + minutes
+        if 0 <= minutes < 60 and 0 <= total <= 24 * 60: return total
+    except ValueError:
+        pass
+    raise SlotError(f'Times must be HH:MM or H:MM AM/PM, got {value!r}')
+
+def format_clock(minutes):
+    return f'{minutes // 60:02}:{minutes % 60:02}'
+
+def parse_slot(data):
+    """(weekday, start, end) from {'day', 'start', 'end'} or {'day', 'time': 'HH:MM' or 'HH:MM-HH:MM'}."""
+    start, _, end = str(data.get('start') or data.get('time') or '').partition('-')
+    start = parse_clock(start)
+    end = parse_clock(data.get('end') or end) if (data.get('end') or end) else start + DEFAULT_MINUTES
+    if end <= start or end > 24 * 60: raise SlotError('A slot must end after it starts, on the same day')
+    return parse_day(data.get('day')), start, end
+
+def slot_fields(weekday, start, end):
+    """The API's day/time/start/end keys for a slot ('time' is the start, as it always was)."""
+    return {'day': DAYS[weekday], 'time': format_clock(start), 'start': format_clock(start), 'end': format_clock(end)}
+
+def parse_entry(data, entry_id):
+    """The internal entry {'id', 'weekday', 'start', 'end', 'subject', 'teacher', 'location'} for an API payload."""
+    weekday, start, end = parse_slot(data)
+    if not data.get('subject'): raise SlotError('subject is required')
+    return {'id': entry_id, 'weekday': weekday, 'start': start, 'end': end, 'subject': data['subject'],
+            'teacher': data.get('teacher') or None, 'location': data.get('location') or None}
+
+def parse_entries(items, new_id):
+    entries = []
+    for n, data in enumerate(items):
+        try: entries.append(parse_entry(data, new_id()))
+        except SlotError as exc: raise SlotError(f'Entry {n}: {exc}') from None
+    return entries
+
+def entry_dict(entry):
+    return {'id': entry['id'], **slot_fields(entry['weekday'], entry['start'], entry['end']),
+            'subject': entry['subject'], 'teacher': entry['teacher'], 'location': entry['location']}
+
+class ScheduleIndex:
+    def __init__(self, entries=()):
+        self.slots = defaultdict(list)  # (resource, name, weekday) -> sorted [(start, end, entry id)]
+        for entry in entries: self.add(entry)
+
+    def copy(self):
+        index = ScheduleIndex()
+        index.slots.update((key, list(intervals)) for key, intervals in self.slots.items())
+        return index
+
+    def _keys(self, entry):
+        return [(r, entry[r], entry['weekday']) for r in RESOURCES if entry.get(r)]
+
+    def add(self, entry):
+        """entry: {'id', 'weekday', 'start', 'end', 'teacher', 'location'}; assumes clashes() was empty."""
+        for key in self._keys(entry): bisect.insort(self.slots[key], (entry['start'], entry['end'], entry['id']))
+
+    def remove(self, entry):
+        for key in self._keys(entry):
+            intervals = self.slots[key]
+            intervals.pop(bisect.bisect_left(intervals, (entry['start'], entry['end'], entry['id'])))
+
+    def clashes(self, entry):
+        """[(resource, other entry id)] that `entry` would overlap."""
+        found = []
+        for key in self._keys(entry):
+            intervals = self.slots[key]
+            i = bisect.bisect_left(intervals, (entry['end'],)) - 1
+            if i >= 0 and intervals[i][1] > entry['start']: found.append((key[0], intervals[i][2]))
+        return found
+
+    def on_at(self, resource, name, weekday, minute):
+        intervals = self.slots.get((resource, name, weekday), [])
+        i = bisect.bisect_right(intervals, (minute, float('inf'))) - 1
+        return intervals[i][2] if i >= 0 and intervals[i][1] > minute else None
+
+    def next_after(self, resource, name, weekday, minute):
+        for offset in range(8):
+            intervals = self.slots.get((resource, name, (weekday + offset) % 7), [])
+            i = bisect.bisect_right(intervals, (minute, float('inf'))) if offset == 0 else 0
+            if i < len(intervals): return intervals[i][2]
+        return None
+
+def check_batch(index, entries):
+    """Adds `entries` to `index` one by one, collecting every clash with what is already there or earlier in the batch.
+
+    Raises ScheduleConflict listing all of them (batch positions as 'entry') if there is any.
+    """
+    rows = {e['id']: n for n, e in enumerate(entries)}
+    conflicts = []
+    for n, entry in enumerate(entries):
+        clashes = index.clashes(entry)
+        for resource, other in clashes:
+            conflicts.append({'entry': n, 'resource': resource, 'name': entry[resource],
+                              'conflictsWith': {'entry': rows[other]} if other in rows else {'id': other}})
+        if not clashes: index.add(entry)
+    if conflicts: raise ScheduleConflict(conflicts)
@@ -1,199 +1,103 @@
+"""The EduMate API on SQLAlchemy. create_app() builds a configured app (config.py).
+
+  flask --app server bootstrap                  create/migrate the schema, once per deploy
+  flask --app server run                        development server
+  gunicorn --preload 'server:create_app()'      production, with EDUMATE_ENV=production
+
+Workers run no DDL: create_app() only compares the stored schema version with
+migrate.LATEST (SCHEMA_CHECK), so a restarted or newly scaled-out worker is
+ready as soon as the app is built. The routes live in blueprints (api_*.py,
+sharing their objects through services.py) that create_app() imports and
+registers; optional heavy dependencies (numpy, openpyxl) load on first use. With
+--preload the imports happen once in gunicorn's master and forked workers only
+build the app. How long each startup phase took is kept in
+app.extensions['edumate']['startup'], logged, printed by
+`flask --app server startup` and exported on /metrics.
+"""
+import time
+_STARTED = time.perf_counter()
+import importlib
 import os
-import uuid
-from flask import Flask, jsonify, request
+import click
+from flask import Flask
 from flask_cors import CORS
-from database import db, Class, Student, Teacher, Timetable, Notification, Attendance, Exam, Score
-
-app = Flask(__name__)
-CORS(app)
-
-# --- CONFIGURATION ---
-base_dir = os.path.abspath(os.path.dirname(__file__))
-db_path = os.path.join(base_dir, 'edumate.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db.init_app(app)
-
-# --- AUTHENTICATION ---
-@app.route('/api/signup', methods=['POST'])
-def signup():
-    data = request.json
-    if Teacher.query.filter_by(email=data['email']).first(): 
-        return jsonify({'error': 'Email already registered'}), 400
-    
-    new_teacher = Teacher(
-        id="t"+str(uuid.uuid4())[:8], 
-        name=data['name'], 
-        email=data['email'], 
-        password=data['password']
-    )
-    db.session.add(new_teacher)
-    db.session.commit()
-    return jsonify(new_teacher.to_dict()), 201
-
-@app.route('/api/login', methods=['POST'])
-def login():
-    data = request.json
-    teacher = Teacher.query.filter_by(email=data['email']).first()
-    if teacher and teacher.password == data['password']: 
-        return jsonify(teacher.to_dict())
-    return jsonify({'error': 'Invalid credentials'}), 401
-
-@app.route('/api/teacher/<id>/notepad', methods=['PUT'])
-def update_notepad(id):
-    teacher = Teacher.query.get(id)
-    if teacher:
-        teacher.notepad = request.json.get('notepad', '')
-        db.session.commit()
-        return jsonify({'msg': 'Saved'})
-    return jsonify({'error': 'Not found'}), 404
-
-# --- CLASS MANAGEMENT (Fixed) ---
-@app.route('/api/classes', methods=['GET'])
-def get_classes():
-    classes = Class.query.all()
-    return jsonify([c.to_dict() for c in classes])
-
-@app.route('/api/classes', methods=['POST'])
-def create_class():
-    data = request.json
-    new_class = Class(
-        id="c"+str(uuid.uuid4())[:8], 
-        name=data['name'], 
-        coordinator_name=data['coordinatorName'], 
-        coordinator_phone=data['coordinatorPhone']
-    )
-    db.session.add(new_class)
-    db.session.commit()
-    return jsonify(new_class.to_dict()), 201
-
-@app.route('/api/classes/<class_id>', methods=['DELETE'])
-def delete_class(class_id):
-    cls = Class.query.get(class_id)
-    if cls: 
-        db.session.delete(cls)
-        db.session.commit()
-        return jsonify({'msg': 'Deleted'})
-    return jsonify({'error': 'Not found'}), 404
-
-# --- STUDENT MANAGEMENT ---
-@app.route('/api/classes/<class_id>/students', methods=['POST'])
-def add_student(class_id):
-    data = request.json
-    new_student = Student(
-        id="s"+str(uuid.uuid4())[:8], 
-        name=data['name'], 
-        roll=data['roll'], 
-        class_id=class_id
-    )
-    db.session.add(new_student)
-    db.session.commit()
-    return jsonify(new_student.to_dict()), 201
-
-@app.route('/api/students/<student_id>', methods=['PUT', 'DELETE'])
-def handle_student(student_id):
-    s = Student.query.get(student_id)
-    if not s: return jsonify({'error': 'Not found'}), 404
-    
-    if request.method == 'DELETE': 
-        db.session.delete(s)
-        db.session.commit()
-        return jsonify({'msg': 'Deleted'})
-    
-    # UPDATE logic
-    data = request.json
-    if 'status' in data: s.status = data['status']
-    if 'phone' in data: s.phone = data['phone']
-    if 'email' in data: s.email = data['email']
-    if 'parentPhone' in data: s.parent_phone = data['parentPhone']
-    if 'parentEmail' in data: s.parent_email = data['parentEmail']
-    db.session.commit()
-    return jsonify(s.to_dict())
-
-@app.route('/api/students/<student_id>/analytics', methods=['GET'])
-def get_student_analytics(student_id):
-    attendance_records = Attendance.query.filter_by(student_id=student_id).all()
-    total = len(attendance_records)
-    present = len([r for r in attendance_records if r.status == 'P'])
-    percentage = round((present / total * 100), 1) if total > 0 else 0
-
-    scores = Score.query.filter_by(student_id=student_id).all()
-    score_data = []
-    for sc in scores:
-        exam = Exam.query.get(sc.exam_id)
-        if exam:
-            score_data.append({'exam': exam.title, 'total': exam.total_marks, 'obtained': sc.marks_obtained})
-
-    return jsonify({'attendance': {'percentage': percentage, 'present': present, 'total': total}, 'scores': score_data})
-
-# --- EXAMS & SCORES ---
-@app.route('/api/exams', methods=['GET', 'POST'])
-def handle_exams():
-    if request.method == 'GET': return jsonify([e.to_dict() for e in Exam.query.all()])
-    data = request.json
-    db.session.add(Exam(id="e"+str(uuid.uuid4())[:8], title=data['title'], total_marks=data['totalMarks']))
-    db.session.commit()
-    return jsonify({'msg': 'Created'}), 201
-
-@app.route('/api/exams/<exam_id>', methods=['DELETE'])
-def delete_exam(exam_id):
-    e = Exam.query.get(exam_id)
-    if e: 
-        Score.query.filter_by(exam_id=exam_id).delete()
-        db.session.delete(e)
-        db.session.commit()
-        return jsonify({'msg': 'Deleted'})
-    return jsonify({'error': 'Not found'}), 404
-
-@app.route('/api/scores', methods=['POST', 'GET'])
-def handle_scores():
-    if request.method == 'POST':
-        for rec in request.json:
-            existing = Score.query.filter_by(exam_id=rec['examId'], student_id=rec['studentId']).first()
-            if existing: existing.marks_obtained = rec['marks']
-            else: db.session.add(Score(exam_id=rec['examId'], student_id=rec['studentId'], marks_obtained=rec['marks']))
-        db.session.commit()
-        return jsonify({'msg': 'Saved'}), 201
-    
-    eid = request.args.get('examId')
-    if eid: return jsonify([s.to_dict() for s in Score.query.filter_by(exam_id=eid).all()])
-    return jsonify([])
-
-# --- TIMETABLE & NOTIFICATIONS & ATTENDANCE ---
-@app.route('/api/timetable', methods=['GET', 'POST'])
-def handle_timetable():
-    if request.method == 'GET': return jsonify([t.to_dict() for t in Timetable.query.all()])
-    db.session.add(Timetable(id="tt"+str(uuid.uuid4())[:8], **request.json))
-    db.session.commit()
-    return jsonify({'msg': 'Added'}), 201
-
-@app.route('/api/timetable/<id>', methods=['DELETE'])
-def delete_timetable(id):
-    t=Timetable.query.get(id)
-    if t: db.session.delete(t); db.session.commit(); return jsonify({'msg':'Deleted'})
-    return jsonify({'error':'Not found'}), 404
-
-@app.route('/api/notifications', methods=['GET', 'POST'])
-def handle_notifications():
-    if request.method == 'GET': return jsonify([n.to_dict() for n in Notification.query.all()])
-    data=request.json
-    db.session.add(Notification(id="n"+str(uuid.uuid4())[:8], message=data['message'], class_name=data['className'], timestamp=data['timestamp']))
-    db.session.commit()
-    return jsonify({'msg':'Added'}), 201
-
-@app.route('/api/attendance', methods=['GET', 'POST'])
-def handle_attendance():
-    if request.method == 'POST':
-        for r in request.json:
-            e = Attendance.query.filter_by(date=r['date'], student_id=r['studentId']).first()
-            if e: e.status = r['status']
-            else: db.session.add(Attendance(date=r['date'], student_id=r['studentId'], student_name=r['studentName'], class_name=r['className'], status=r['status']))
-        db.session.commit()
-        return jsonify({'msg':'Saved'}), 201
-    d=request.args.get('date')
-    return jsonify([r.to_dict() for r in Attendance.query.filter_by(date=d).all()]) if d else jsonify([])
+from database import db
+from storage import SqlStorage
+from auth import PasswordHasher, Sessions
+from writequeue import WriteQueue
+from jobs import JobRunner
+from filestore import FileStore
+from events import EventBus
+import config
+import dbprofile
+import instrumentation
+import migrate
+import services
+import tenancy
+_IMPORTED = time.perf_counter()
+
+BLUEPRINTS = ('api_auth', 'api_classes', 'api_attendance', 'api_exams', 'api_timetable', 'api_notifications',
+              'api_assignments', 'api_jobs')
+
+def create_app(env=None, **overrides):
+    """A configured app for `env` (default: EDUMATE_ENV, else 'development'); `overrides` set config keys directly."""
+    startup, mark = {'import': _IMPORTED - _STARTED}, time.perf_counter()
+    def phase(name):
+        nonlocal mark
+        now = time.perf_counter()
+        startup[name], mark = now - mark, now
+
+    app = Flask(__name__)
+    CORS(app)
+    config.load(app.config, env or os.environ.get('EDUMATE_ENV', 'development'), overrides)
+    phase('config')
+
+    db.init_app(app)
+    dbprofile.init_app(app, db)
+    check_schema(app)
+    phase('database')
+
+    write_queue = WriteQueue(app, db, app.config['WRITE_QUEUE_BATCH'], app.config['WRITE_QUEUE_LINGER_MS'] / 1000) if app.config['WRITE_QUEUE'] else None
+    events = EventBus()
+    app.extensions['edumate'] = {
+        'storage': SqlStorage(write_queue, events, PasswordHasher(app.config['HASH_WORKERS'])),
+        'jobs': JobRunner(app, app.config['JOB_WORKERS']),
+        'files': FileStore(app.config['UPLOAD_DIR']),
+        'events': events,
+        'sessions': Sessions(app.config['SECRET_KEY'], app.config['SESSION_TTL'], invite_ttl=app.config['INVITE_TTL']),
+        'write_queue': write_queue,
+        'startup': startup,
+    }
+    services.cache.init_app(app)
+    metrics = instrumentation.init_app(app, db)
+    tenancy.init_app(app)
+    phase('services')
+
+    for name in BLUEPRINTS: app.register_blueprint(importlib.import_module(name).bp)
+    for command in importlib.import_module('commands').COMMANDS: app.cli.add_command(command)
+    phase('blueprints')
+
+    startup['total'] = sum(startup.values())
+    if metrics: metrics.startup.update(startup)
+    app.logger.info('Worker %d ready in %.0f ms (%s)', os.getpid(), startup['total'] * 1000,
+                    ', '.join(f'{name} {seconds * 1000:.0f}' for name, seconds in startup.items() if name != 'total'))
+    return app
+
+def check_schema(app):
+    """Applies SCHEMA_CHECK: one PRAGMA read, except in 'create' mode (in-memory and throwaway databases)."""
+    mode = app.config['SCHEMA_CHECK']
+    if mode == 'off': return
+    with app.app_context():
+        if mode == 'create':
+            migrate.upgrade()
+            return
+        if click.get_current_context(silent=True) is not None: return  # CLI commands, bootstrap among them, take the schema as it is
+        version = migrate.current_version()
+        db.engine.dispose()  # workers open their own connections (with --preload this ran before the fork)
+    if version >= migrate.LATEST: return  # newer is fine: old workers keep serving while a rolling deploy replaces them
+    message = f'Schema version {version}, this code needs {migrate.LATEST}: run `flask --app server bootstrap`'
+    if mode == 'fail': raise RuntimeError(message)
+    app.logger.warning(message)
 
 if __name__ == '__main__':
-    with app.app_context(): db.create_all()
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    create_app(SCHEMA_CHECK='create').run(debug=True, port=5000)
@@ -0,0 +1,25 @@
+"""What the route blueprints share: the current app's storage, jobs, files, event bus and sessions.
+
+server.create_app() builds one set per app and keeps it in
+app.extensions['edumate']. The blueprint modules are imported once and reused by
+every app, so they reach that set through these proxies, which resolve to the
+current app's objects on each access (requests, CLI commands and background jobs
+all run inside an app context).
+"""
+from flask import current_app
+from werkzeug.local import LocalProxy
+import tenancy
+from cache import ResponseCache
+
+DATE_ERROR = 'Dates must be MM/DD/YYYY or YYYY-MM-DD'
+
+cache = ResponseCache(vary=tenancy.cache_key)  # bound to every app by init_app()
+
+def _service(name):
+    return LocalProxy(lambda: current_app.extensions['edumate'][name])
+
+storage = _service('storage')
+jobs = _service('jobs')
+files = _service('files')
+events = _service('events')
+sessions = _service('sessions')
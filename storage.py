@@ -0,0 +1,755 @@
+"""One storage interface for both route sets.
+
+server.py runs on SqlStorage (the SQLAlchemy models in database.py) and the mock
+API in app.py runs on MemoryStorage, so both servers share one set of semantics:
+  - payloads are the API's camelCase dicts
+  - attendance is upserted per (date, studentId, period), scores per (examId, studentId); dates
+    are read as MM/DD/YYYY or YYYY-MM-DD and returned as both ('date', 'isoDate')
+  - deleting a class, student or exam removes the rows that hang off it
+  - student analytics is {'attendance': {...}, 'scores': [{'exam', 'total', 'obtained', 'marker'}]}
+The SQL-only list features (keyset pages, projection, streaming) stay in listing.py.
+"""
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from functools import wraps
+from database import db, DATE_FORMAT, DEFAULT_PERIOD, TIMESTAMP_FORMAT, Class, School, Student, Teacher, Timetable, Notification, Attendance, Exam, Score, Assignment, Submission, Upload
+from analytics import attendance_summary, parse_date, student_attendance, student_scores
+from sqlalchemy.exc import IntegrityError
+from auth import PasswordHasher, is_hashed, normalise_email
+import tenancy
+from gradestats import mark_value, record_marks
+from schedule import ScheduleIndex, check_batch, entry_dict, parse_entries, parse_entry
+from upserts import StaleVersion, apply_score_changes, insert_timetable, upsert_attendance, upsert_scores, insert_students, insert_notifications, archive_notifications, delete_students, delete_class_rows
+
+STUDENT_FIELDS = {'name': 'name', 'roll': 'roll', 'email': 'email', 'status': 'status', 'phone': 'phone',
+                  'parentPhone': 'parent_phone', 'address': 'address', 'previousMarks': 'previous_marks'}
+EDITABLE_STUDENT_FIELDS = ('email', 'status', 'phone', 'parentPhone', 'address', 'previousMarks')
+PURGE_CHUNK = 500
+UPLOAD_FIELDS = ('digest', 'size', 'filename', 'contentType', 'ownerId')
+
+def score_dict(exam_id, student_id, marks, marker, version=0):
+    return {'examId': exam_id, 'studentId': student_id, 'marks': mark_value(marks), 'marker': marker, 'version': version}
+
+def new_id(prefix):
+    return prefix + str(uuid.uuid4())[:8]
+
+def now_timestamp():
+    return datetime.now().strftime(TIMESTAMP_FORMAT)
+
+def parse_timestamp(value):
+    """datetime for an API timestamp ('MM/DD/YYYY, HH:MM:SS' or ISO 8601); raises ValueError otherwise."""
+    try: return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except ValueError: pass
+    dt = datetime.fromisoformat(value)
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+
+class Storage:
+    """The operations both API servers need. Every write method commits its own unit of work."""
+    # users
+    def add_user(self, data, school_id=None): raise NotImplementedError  # -> user dict, or None if the email is taken; stores a hash
+    # (SqlStorage: joins school_id, ValueError if there is no such school; None creates a school for the teacher)
+    def authenticate(self, email, password): raise NotImplementedError  # -> user dict or None
+    # classes & students
+    def list_classes(self): raise NotImplementedError
+    def get_class(self, class_id): raise NotImplementedError
+    def add_class(self, data): raise NotImplementedError
+    def delete_class(self, class_id): raise NotImplementedError  # -> bool
+    def add_student(self, class_id, data): raise NotImplementedError  # -> student dict, or None if no such class
+    def get_student(self, student_id): raise NotImplementedError
+    def update_student(self, student_id, data): raise NotImplementedError  # -> student dict or None
+    def delete_student(self, student_id): raise NotImplementedError  # -> bool
+    # timetable & notifications
+    def list_timetable(self): raise NotImplementedError
+    def add_timetable_entry(self, data): raise NotImplementedError  # raises schedule.SlotError / ScheduleConflict
+    def import_timetable(self, items, replace=False): raise NotImplementedError  # all or nothing; -> number added
+    def timetable_at(self, resource, name, at): raise NotImplementedError  # -> {'now', 'next'} entries for a teacher/location
+    def delete_timetable_entry(self, entry_id): raise NotImplementedError  # -> bool
+    def list_notifications(self): raise NotImplementedError
+    def add_notification(self, data): raise NotImplementedError  # -> notification dict, or None if no class has that name
+    # attendance
+    def list_attendance(self, date=None, class_id=None, date_from=None, date_to=None): raise NotImplementedError
+    def save_attendance(self, records): raise NotImplementedError  # -> {'inserted', 'updated', 'unchanged', 'skipped'}; ValueError on a bad date
+    # exams & scores
+    def list_exams(self): raise NotImplementedError
+    def add_exam(self, data): raise NotImplementedError
+    def delete_exam(self, exam_id): raise NotImplementedError  # -> bool
+    def list_scores(self, exam_id, since=None): raise NotImplementedError  # since: only cells written after that exam version
+    def save_scores(self, records): raise NotImplementedError  # -> number of records written (unknown exams skipped)
+    # (both: ValueError for bad marks or a student outside the exam's class)
+    def score_sheet(self, exam_id, since=None): raise NotImplementedError  # -> {'examId', 'version', 'scores'} or None
+    def save_score_changes(self, exam_id, version, changes): raise NotImplementedError  # -> new version or None; raises StaleVersion
+    # analytics
+    def student_analytics(self, student_id): raise NotImplementedError
+    # uploads (file contents live in filestore.FileStore)
+    def add_upload(self, data): raise NotImplementedError  # -> upload dict with its new id
+    def get_upload(self, upload_id): raise NotImplementedError  # -> upload dict or None
+    def upload_usage(self, owner_id): raise NotImplementedError  # -> bytes uploaded by owner_id (None: anonymously)
+
+def _locked(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock: return method(self, *args, **kwargs)
+    return wrapper
+
+class MemoryStorage(Storage):
+    """Hash-indexed in-process engine for the mock API, demos and load rehearsals.
+
+    Every lookup and delete goes through a dict, including the secondary indexes
+    (attendance by student and by date, scores by exam and by student, exams by
+    class), so cost does not grow with the number of stored records. Public
+    methods hold a re-entrant lock, which makes the store safe under a threaded server.
+    """
+    def __init__(self, hasher=None):
+        self.lock = threading.RLock()
+        self.hasher = hasher or PasswordHasher(1)
+        self.users = {}                 # lower-cased email -> user (with the password hash)
+        self.classes = {}               # class id -> class (without students)
+        self.class_ids_by_name = defaultdict(set)       # class name -> class ids
+        self.class_students = {}        # class id -> {student id -> student}
+        self.students = {}              # student id -> student
+        self.student_class = {}         # student id -> class id
+        self.timetable = {}             # entry id -> schedule entry (schedule.parse_entry)
+        self.schedule = ScheduleIndex()  # teacher/location slots of self.timetable
+        self.notifications = {}
+        self.class_notifications = defaultdict(set)     # class id -> notification ids
+        self.attendance = {}            # (datetime.date, studentId, period) -> record
+        self.attendance_by_student = defaultdict(dict)  # student id -> {key -> record}
+        self.attendance_by_date = defaultdict(dict)     # date -> {key -> record}
+        self.exams = {}
+        self.class_exams = defaultdict(dict)            # class id -> {exam id -> exam}
+        self.scores_by_exam = defaultdict(dict)         # exam id -> {student id -> score}
+        self.scores_by_student = defaultdict(dict)      # student id -> {exam id -> score}
+        self.assignments = {}
+        self.class_assignments = defaultdict(set)       # class id -> assignment ids
+        self.uploads = {}
+        self.upload_usage_by_owner = defaultdict(int)   # owner id -> bytes
+
+    @classmethod
+    def from_dump(cls, dump, hasher=None):
+        """Builds a store from the nested MOCK_DB layout used by app.py (plain-text passwords are hashed)."""
+        store = cls(hasher)
+        for u in dump.get('users', []):
+            password = u['password'] if is_hashed(u['password']) else store.hasher.hash(u['password'])
+            store.users[normalise_email(u['email'])] = dict(u, email=normalise_email(u['email']), password=password)
+        for c in dump.get('classes', []):
+            store._put_class({k: v for k, v in c.items() if k != 'students'})
+            for s in c.get('students', []): store._put_student(c['id'], dict(s))
+        for t in dump.get('timetable', []):
+            entry = parse_entry(t, t['id'])
+            store.timetable[entry['id']] = entry
+            store.schedule.add(entry)
+        for n in dump.get('notifications', []): store._put_notification(dict(n, classId=n.get('classId') or store._class_named(n['className'])))
+        for r in dump.get('attendance', []):
+            if r['studentId'] in store.students:
+                store._put_attendance(store._attendance_record(parse_date(r['date']), r['studentId'], r.get('period') or DEFAULT_PERIOD, r['status']))
+        for e in dump.get('exams', []): store._put_exam(dict(e))
+        for s in dump.get('scores', []): store._put_score(score_dict(s['examId'], s['studentId'], *record_marks(s)))
+        for a in dump.get('assignments', []): store._put_assignment(dict(a, classId=a.get('classId') or store._class_named(a['className'])))
+        return store
+
+    # primitive writes, the only places the dicts and indexes are mutated
+    def _put_class(self, cls):
+        self.classes[cls['id']] = cls
+        self.class_students[cls['id']] = {}
+        self.class_ids_by_name[cls['name']].add(cls['id'])
+
+    def _drop_class(self, class_id):
+        for student_id in list(self.class_students[class_id]): self._drop_student(student_id)
+        for exam_id in list(self.class_exams.get(class_id, ())): self._drop_exam(exam_id)
+        for assignment_id in self.class_assignments.pop(class_id, ()): del self.assignments[assignment_id]
+        for notification_id in self.class_notifications.pop(class_id, ()): del self.notifications[notification_id]
+        cls = self.classes.pop(class_id)
+        del self.class_students[class_id]
+        self.class_ids_by_name[cls['name']].discard(class_id)
+        if not self.class_ids_by_name[cls['name']]: del self.class_ids_by_name[cls['name']]
+
+    def _put_notification(self, n):
+        self.notifications[n['id']] = n
+        if n.get('classId'): self.class_notifications[n['classId']].add(n['id'])
+
+    def _put_assignment(self, a):
+        self.assignments[a['id']] = a
+        if a.get('classId'): self.class_assignments[a['classId']].add(a['id'])
+
+    def _put_student(self, class_id, student):
+        self.class_students[class_id][student['id']] = student
+        self.students[student['id']] = student
+        self.student_class[student['id']] = class_id
+
+    def _drop_student(self, student_id):
+        class_id = self.student_class.pop(student_id)
+        del self.class_students[class_id][student_id]
+        del self.students[student_id]
+        for key in list(self.attendance_by_student.get(student_id, ())): self._drop_attendance(key)
+        for exam_id in list(self.scores_by_student.get(student_id, ())): self._drop_score(exam_id, student_id)
+
+    def _attendance_record(self, day, student_id, period, status):
+        class_id = self.student_class[student_id]
+        return {'date': day.strftime(DATE_FORMAT), 'isoDate': day.isoformat(), 'studentId': student_id,
+                'studentName': self.students[student_id].get('name'), 'classId': class_id,
+                'className': self.classes.get(class_id, {}).get('name'), 'status': status, 'period': period}
+
+    def _put_attendance(self, record):
+        key = (parse_date(record['isoDate']), record['studentId'], record['period'])
+        self.attendance[key] = record
+        self.attendance_by_student[key[1]][key] = record
+        self.attendance_by_date[key[0]][key] = record
+
+    def _drop_attendance(self, key):
+        del self.attendance[key]
+        self._unindex(self.attendance_by_student, key[1], key)
+        self._unindex(self.attendance_by_date, key[0], key)
+
+    def _put_exam(self, exam):
+        exam.setdefault('version', 0)
+        self.exams[exam['id']] = exam
+        self.class_exams[exam.get('classId')][exam['id']] = exam
+
+    def _drop_exam(self, exam_id):
+        exam = self.exams.pop(exam_id)
+        self._unindex(self.class_exams, exam.get('classId'), exam_id)
+        for student_id in list(self.scores_by_exam.get(exam_id, ())): self._drop_score(exam_id, student_id)
+
+    def _put_score(self, score):
+        self.scores_by_exam[score['examId']][score['studentId']] = score
+        self.scores_by_student[score['studentId']][score['examId']] = score
+
+    def _drop_score(self, exam_id, student_id):
+        self._unindex(self.scores_by_exam, exam_id, student_id)
+        self._unindex(self.scores_by_student, student_id, exam_id)
+
+    @staticmethod
+    def _unindex(index, bucket, key):
+        entries = index[bucket]
+        del entries[key]
+        if not entries: del index[bucket]
+
+    # users
+    def add_user(self, data, school_id=None):
+        email = normalise_email(data['email'])
+        if email in self.users: return None
+        user = {'id': new_id('t'), 'name': data['name'], 'email': email, 'password': self.hasher.hash(data['password'])}
+        with self.lock:
+            if email in self.users: return None
+            self.users[email] = user
+        return {k: v for k, v in user.items() if k != 'password'}
+
+    def authenticate(self, email, password):
+        # hashing runs outside the store lock
+        with self.lock: user = self.users.get(normalise_email(email))
+        if not self.hasher.verify(user['password'] if user else None, password): return None
+        return {k: v for k, v in user.items() if k != 'password'}
+
+    # classes & students
+    def _class_dict(self, class_id):
+        return dict(self.classes[class_id], students=list(self.class_students[class_id].values()))
+
+    @_locked
+    def list_classes(self):
+        return [self._class_dict(class_id) for class_id in self.classes]
+
+    @_locked
+    def get_class(self, class_id):
+        return self._class_dict(class_id) if class_id in self.classes else None
+
+    @_locked
+    def add_class(self, data):
+        cls = {'id': new_id('c'), 'name': data.get('name'), 'coordinatorName': data.get('coordinatorName'),
+               'coordinatorPhone': data.get('coordinatorPhone')}
+        self._put_class(cls)
+        return self._class_dict(cls['id'])
+
+    def _class_named(self, name):
+        # Like SqlStorage: a name shared by several classes means the one with the lowest id
+        return min(self.class_ids_by_name.get(name, ()), default=None)
+
+    @_locked
+    def delete_class(self, class_id):
+        if class_id not in self.classes: return False
+        self._drop_class(class_id)
+        return True
+
+    @_locked
+    def add_student(self, class_id, data):
+        if class_id not in self.classes: return None
+        student = {'id': new_id('s'), **{k: data.get(k, '') for k in STUDENT_FIELDS}}
+        student['status'] = student['status'] or 'Day Scholar'
+        self._put_student(class_id, student)
+        return student
+
+    @_locked
+    def get_student(self, student_id):
+        return self.students.get(student_id)
+
+    @_locked
+    def update_student(self, student_id, data):
+        student = self.students.get(student_id)
+        if student is None: return None
+        student.update({k: data[k] for k in EDITABLE_STUDENT_FIELDS if k in data})
+        return student
+
+    @_locked
+    def delete_student(self, student_id):
+        if student_id not in self.students: return False
+        self._drop_student(student_id)
+        return True
+
+    # timetable & notifications
+    @_locked
+    def list_timetable(self):
+        return [entry_dict(e) for e in self.timetable.values()]
+
+    @_locked
+    def add_timetable_entry(self, data):
+        entry = parse_entry(data, new_id('tt'))
+        check_batch(self.schedule, [entry])
+        self.timetable[entry['id']] = entry
+        return entry_dict(entry)
+
+    @_locked
+    def import_timetable(self, items, replace=False):
+        entries = parse_entries(items, lambda: new_id('tt'))
+        schedule = ScheduleIndex() if replace else self.schedule.copy()
+        check_batch(schedule, entries)
+        if replace: self.timetable.clear()
+        self.timetable.update((e['id'], e) for e in entries)
+        self.schedule = schedule
+        return len(entries)
+
+    @_locked
+    def delete_timetable_entry(self, entry_id):
+        entry = self.timetable.pop(entry_id, None)
+        if entry is None: return False
+        self.schedule.remove(entry)
+        return True
+
+    @_locked
+    def timetable_at(self, resource, name, at):
+        minute = at.hour * 60 + at.minute
+        now = self.schedule.on_at(resource, name, at.weekday(), minute)
+        upcoming = self.schedule.next_after(resource, name, at.weekday(), minute)
+        return {'now': entry_dict(self.timetable[now]) if now else None,
+                'next': entry_dict(self.timetable[upcoming]) if upcoming else None}
+
+    @_locked
+    def list_notifications(self):
+        return list(self.notifications.values())
+
+    @_locked
+    def add_notification(self, data):
+        class_id = self._class_named(data.get('className'))
+        if class_id is None: return None
+        n = {'id': new_id('n'), 'message': data.get('message'), 'className': data.get('className'), 'classId': class_id,
+             'timestamp': data.get('timestamp') or now_timestamp()}
+        self._put_notification(n)
+        return n
+
+    # attendance
+    @_locked
+    def list_attendance(self, date=None, class_id=None, date_from=None, date_to=None):
+        records = self.attendance.values() if date is None else self.attendance_by_date.get(parse_date(date), {}).values()
+        lo = parse_date(date_from).isoformat() if date_from else ''
+        hi = parse_date(date_to).isoformat() if date_to else '9999'
+        return [r for r in records if (class_id is None or r['classId'] == class_id) and lo <= r['isoDate'] <= hi]
+
+    @_locked
+    def save_attendance(self, records):
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+        keys = [(parse_date(r['date']), r['studentId'], r.get('period') or DEFAULT_PERIOD) for r in records]
+        for key, r in zip(keys, records):
+            existing = self.attendance.get(key)
+            if key[1] not in self.students:
+                counts['skipped'] += 1
+            elif existing is None:
+                self._put_attendance(self._attendance_record(*key, r['status']))
+                counts['inserted'] += 1
+            elif existing['status'] != r['status']:
+                existing['status'] = r['status']
+                counts['updated'] += 1
+            else:
+                counts['unchanged'] += 1
+        return counts
+
+    # exams & scores
+    @_locked
+    def list_exams(self):
+        return list(self.exams.values())
+
+    @_locked
+    def add_exam(self, data):
+        exam = {'id': new_id('e'), 'title': data.get('title'), 'totalMarks': int(data.get('totalMarks', 0)),
+                'classId': data.get('classId')}
+        self._put_exam(exam)
+        return exam
+
+    @_locked
+    def delete_exam(self, exam_id):
+        if exam_id not in self.exams: return False
+        self._drop_exam(exam_id)
+        return True
+
+    @_locked
+    def list_scores(self, exam_id, since=None):
+        return [s for s in self.scores_by_exam.get(exam_id, {}).values() if since is None or s['version'] > since]
+
+    @_locked
+    def score_sheet(self, exam_id, since=None):
+        exam = self.exams.get(exam_id)
+        if exam is None: return None
+        return {'examId': exam_id, 'version': exam['version'], 'scores': self.list_scores(exam_id, since)}
+
+    def _check_students(self, cells):
+        outside = sorted({s for e, s in cells if s not in self.class_students.get(self.exams[e]['classId'], ())})
+        if outside: raise ValueError(f"Not students of the exam's class: {', '.join(outside)}")
+
+    def _bump_version(self, exam_id):
+        exam = self.exams.get(exam_id)
+        if exam is None: return 0
+        exam['version'] += 1
+        return exam['version']
+
+    @_locked
+    def save_scores(self, records):
+        batch = {(r['examId'], r['studentId']): record_marks(r) for r in records if r['examId'] in self.exams}
+        self._check_students(batch)
+        versions = {exam_id: self._bump_version(exam_id) for exam_id, _ in batch}
+        for (exam_id, student_id), marks in batch.items():
+            self._put_score(score_dict(exam_id, student_id, *marks, versions[exam_id]))
+        return len(batch)
+
+    @_locked
+    def save_score_changes(self, exam_id, version, changes):
+        cells = {c['studentId']: record_marks(c) for c in changes}
+        exam = self.exams.get(exam_id)
+        if exam is None: return None
+        self._check_students((exam_id, student_id) for student_id in cells)
+        if exam['version'] != version:
+            raise StaleVersion(exam['version'], sorted((s for s in self.scores_by_exam.get(exam_id, {}).values()
+                                                        if s['version'] > version), key=lambda s: s['version']))
+        new = self._bump_version(exam_id)
+        for student_id, marks in cells.items(): self._put_score(score_dict(exam_id, student_id, *marks, new))
+        return new
+
+    # analytics
+    @_locked
+    def student_analytics(self, student_id):
+        by_period = {}
+        for r in self.attendance_by_student.get(student_id, {}).values():
+            p = by_period.setdefault(r['period'], {'period': r['period'], 'present': 0, 'total': 0})
+            p['present'] += r['status'] == 'P'
+            p['total'] += 1
+        scores = []
+        for exam_id, s in self.scores_by_student.get(student_id, {}).items():
+            exam = self.exams.get(exam_id)
+            if exam: scores.append({'exam': exam['title'], 'total': exam['totalMarks'], 'obtained': s['marks'], 'marker': s['marker']})
+        return {'attendance': attendance_summary([by_period[p] for p in sorted(by_period)]), 'scores': scores}
+
+    # uploads
+    @_locked
+    def add_upload(self, data):
+        u = {'id': new_id('u'), **{k: data.get(k) for k in UPLOAD_FIELDS}, 'createdAt': now_timestamp()}
+        self.uploads[u['id']] = u
+        self.upload_usage_by_owner[u['ownerId']] += u['size']
+        return u
+
+    @_locked
+    def get_upload(self, upload_id):
+        return self.uploads.get(upload_id)
+
+    @_locked
+    def upload_usage(self, owner_id):
+        return self.upload_usage_by_owner.get(owner_id, 0)
+
+    # assignments (the mock keys them by className; SqlStorage by classId)
+    @_locked
+    def list_assignments(self):
+        return list(self.assignments.values())
+
+    @_locked
+    def add_assignment(self, data):
+        a = {'id': new_id('a'), **{k: data.get(k) for k in ('title', 'className', 'date', 'category')}}
+        a['classId'] = self._class_named(a['className'])
+        self._put_assignment(a)
+        return a
+
+class SqlStorage(Storage):
+    """The SQLAlchemy engine behind server.py. Needs an application context.
+
+    With a WriteQueue (writequeue.py) attendance and score saves are batched
+    through the process's single writer thread instead of committing here. With
+    an EventBus (events.py) committed notifications, attendance and scores are
+    published for the /api/events stream.
+    """
+    def __init__(self, write_queue=None, events=None, hasher=None):
+        self.write_queue = write_queue
+        self.events = events
+        self.hasher = hasher or PasswordHasher()
+
+    def _publish(self, type, class_name, data):
+        if self.events is not None: self.events.publish(type, class_name, data, data.get('classId'))
+
+    def _write(self, fn, *args):
+        if self.write_queue is not None: return self.write_queue.run(tenancy.carry(fn), *args)
+        # Like the queue's batches: fn reads what it is about to change, so hold the write lock from its first read
+        db.session.rollback()
+        db.session.connection(execution_options={'sqlite_immediate': True})
+        try: result = fn(*args)
+        except Exception:
+            db.session.rollback()
+            raise
+        db.session.commit()
+        return result
+
+    # users
+    def add_user(self, data, school_id=None):
+        email = normalise_email(data['email'])
+        if Teacher.query.filter_by(email=email).first(): return None
+        if school_id is not None and not db.session.get(School, school_id): raise ValueError(f'Unknown school {school_id!r}')
+        db.session.rollback()
+        password = self.hasher.hash(data['password'])
+        if school_id is None:
+            school_id = new_id('sch')
+            db.session.add(School(id=school_id, name=data['name']))
+        teacher = Teacher(id=new_id('t'), name=data['name'], email=email, password=password, school_id=school_id)
+        db.session.add(teacher)
+        try: db.session.commit()
+        except IntegrityError:  # registered meanwhile
+            db.session.rollback()
+            return None
+        return teacher.to_dict()
+
+    def authenticate(self, email, password):
+        # emails are stored lower-cased, so this is an equality lookup on the unique email index
+        teacher = Teacher.query.filter_by(email=normalise_email(email)).first()
+        stored, user = (teacher.password, teacher.to_dict()) if teacher else (None, None)
+        db.session.rollback()  # don't hold a read transaction open while hashing
+        return user if self.hasher.verify(stored, password) else None
+
+    # classes & students
+    def list_classes(self):
+        return [c.to_dict() for c in Class.query.all()]
+
+    def get_class(self, class_id):
+        cls = db.session.get(Class, class_id)
+        return cls.to_dict() if cls else None
+
+    def add_class(self, data):
+        cls = Class(id=new_id('c'), name=data['name'], coordinator_name=data['coordinatorName'],
+                    coordinator_phone=data.get('coordinatorPhone'), **tenancy.owner_columns())
+        db.session.add(cls)
+        db.session.commit()
+        return cls.to_dict()
+
+    def delete_class(self, class_id, progress=None):
+        """Deletes the class with bulk DELETEs, PURGE_CHUNK students per transaction so a large
+        class never holds the write lock for long. Calls progress(done, total) after each chunk."""
+        if not db.session.get(Class, class_id): return False
+        student_ids = [sid for (sid,) in db.session.query(Student.id).filter_by(class_id=class_id)]
+        db.session.rollback()  # end the read transaction before the chunked writes
+        for start in range(0, len(student_ids), PURGE_CHUNK):
+            self._write(delete_students, student_ids[start:start + PURGE_CHUNK])
+            if progress: progress(min(start + PURGE_CHUNK, len(student_ids)), len(student_ids))
+        self._write(delete_class_rows, class_id)
+        return True
+
+    def add_student(self, class_id, data):
+        if not db.session.get(Class, class_id): return None
+        student = Student(id=new_id('s'), class_id=class_id,
+                          **{column: data[key] for key, column in STUDENT_FIELDS.items() if key in data})
+        db.session.add(student)
+        db.session.commit()
+        return student.to_dict()
+
+    def import_students(self, class_id, students):
+        """Inserts a chunk of validated roster rows (see roster.py) as one transaction."""
+        return self._write(insert_students, class_id, students)
+
+    def get_student(self, student_id):
+        student = db.session.get(Student, student_id)
+        return student.to_dict() if student else None
+
+    def update_student(self, student_id, data):
+        student = db.session.get(Student, student_id)
+        if not student: return None
+        for key in EDITABLE_STUDENT_FIELDS:
+            if key in data: setattr(student, STUDENT_FIELDS[key], data[key])
+        db.session.commit()
+        return student.to_dict()
+
+    def delete_student(self, student_id):
+        student = db.session.get(Student, student_id)
+        if not student: return False
+        db.session.delete(student)
+        db.session.commit()
+        return True
+
+    # timetable & notifications
+    def list_timetable(self):
+        return [t.to_dict() for t in Timetable.query.all()]
+
+    def add_timetable_entry(self, data):
+        entry = parse_entry(data, new_id('tt'))
+        self._write(insert_timetable, [entry])
+        return entry_dict(entry)
+
+    def import_timetable(self, items, replace=False):
+        return self._write(insert_timetable, parse_entries(items, lambda: new_id('tt')), replace)
+
+    def delete_timetable_entry(self, entry_id):
+        entry = db.session.get(Timetable, entry_id)
+        if not entry: return False
+        db.session.delete(entry)
+        db.session.commit()
+        return True
+
+    def timetable_at(self, resource, name, at):
+        minute = at.hour * 60 + at.minute
+        mine = Timetable.query.filter(getattr(Timetable, resource) == name)
+        by_slot = (Timetable.weekday, Timetable.start_minute)
+        now = (mine.filter(Timetable.weekday == at.weekday(), Timetable.start_minute <= minute)
+               .order_by(Timetable.start_minute.desc()).first())
+        upcoming = (mine.filter(db.tuple_(*by_slot) > (at.weekday(), minute)).order_by(*by_slot).first()
+                    or mine.order_by(*by_slot).first())  # wrap round to next week
+        return {'now': now.to_dict() if now and now.end_minute > minute else None,
+                'next': upcoming.to_dict() if upcoming else None}
+
+    def list_notifications(self):
+        return [n.to_dict() for n in Notification.query.all()]
+
+    def add_notification(self, data):
+        class_id = db.session.query(db.func.min(Class.id)).filter(Class.name == data['className']).scalar()
+        if class_id is None: return None  # a notification always belongs to a class: that is what scopes it (tenancy.py)
+        created_at = parse_timestamp(data['timestamp']) if data.get('timestamp') else datetime.now()
+        n = Notification(id=new_id('n'), message=data['message'], class_name=data['className'], class_id=class_id,
+                         created_at=created_at)
+        db.session.add(n)
+        db.session.commit()
+        self._publish('notification', n.class_name, n.to_dict())
+        return n.to_dict()
+
+    def add_notifications(self, message, class_names, timestamp=None):
+        """Posts the same message to several classes in one transaction, skipping names no class has (any more)."""
+        created_at = parse_timestamp(timestamp) if timestamp else datetime.now()
+        class_ids = dict(db.session.query(Class.name, db.func.min(Class.id)).filter(Class.name.in_(class_names)).group_by(Class.name))
+        rows = [{'id': new_id('n'), 'message': message, 'class_name': name, 'class_id': class_ids[name],
+                 'created_at': created_at} for name in class_names if name in class_ids]
+        count = self._write(insert_notifications, rows)
+        for r in rows:
+            self._publish('notification', r['class_name'], Notification(**r).to_dict())
+        return count
+
+    def archive_notifications(self, before):
+        """Moves up to PURGE_CHUNK notifications older than `before` into NotificationSummary; returns how many."""
+        return self._write(archive_notifications, before, PURGE_CHUNK)
+
+    # attendance
+    def list_attendance(self, date=None, class_id=None, date_from=None, date_to=None):
+        q = Attendance.query
+        if date is not None: q = q.filter(Attendance.date == parse_date(date))
+        if class_id is not None: q = q.filter(Attendance.class_id == class_id)
+        if date_from: q = q.filter(Attendance.date >= parse_date(date_from))
+        if date_to: q = q.filter(Attendance.date <= parse_date(date_to))
+        return [r.to_dict() for r in q.order_by(Attendance.date, Attendance.id)]
+
+    def save_attendance(self, records):
+        written = []
+        counts = self._write(upsert_attendance, records, written)
+        if self.events is not None:
+            by_class = defaultdict(list)
+            for w in written: by_class[w.pop('classId'), w.pop('className')].append(w)
+            for (class_id, class_name), changed in by_class.items():
+                self._publish('attendance', class_name, {'classId': class_id, 'records': changed})
+        return counts
+
+    # exams & scores
+    def list_exams(self):
+        return [e.to_dict() for e in Exam.query.all()]
+
+    def add_exam(self, data):
+        exam = Exam(id=new_id('e'), title=data['title'], total_marks=int(data['totalMarks']), class_id=data['classId'])
+        db.session.add(exam)
+        db.session.commit()
+        return exam.to_dict()
+
+    def delete_exam(self, exam_id):
+        exam = db.session.get(Exam, exam_id)
+        if not exam: return False
+        Score.query.filter_by(exam_id=exam_id).delete()
+        db.session.delete(exam)
+        db.session.commit()
+        return True
+
+    def list_scores(self, exam_id, since=None):
+        q = Score.query.filter_by(exam_id=exam_id)
+        if since is not None: q = q.filter(Score.version > since)
+        return [s.to_dict() for s in q.all()]
+
+    def save_scores(self, records):
+        classes = {}
+        saved = self._write(upsert_scores, records, classes)
+        if self.events is not None and classes:
+            by_exam = defaultdict(list)
+            for r in records:
+                marks, marker = record_marks(r)
+                by_exam[r['examId']].append({'studentId': r['studentId'], 'marks': mark_value(marks), 'marker': marker})
+            for exam_id, (class_id, class_name) in classes.items():
+                self._publish('scores', class_name, {'examId': exam_id, 'classId': class_id, 'scores': by_exam[exam_id]})
+        return saved
+
+    def score_sheet(self, exam_id, since=None):
+        version = db.session.execute(db.select(Exam.version).where(Exam.id == exam_id)).scalar()
+        if version is None: return None
+        return {'examId': exam_id, 'version': version, 'scores': self.list_scores(exam_id, since)}
+
+    def save_score_changes(self, exam_id, version, changes):
+        classes = {}
+        new = self._write(apply_score_changes, exam_id, version, changes, classes)
+        if new is not None and self.events is not None and changes:
+            class_id, class_name = classes[exam_id]
+            scores = [score_dict(exam_id, c['studentId'], *record_marks(c), new) for c in changes]
+            self._publish('scores', class_name, {'examId': exam_id, 'classId': class_id, 'version': new, 'scores': scores})
+        return new
+
+    # analytics
+    def student_analytics(self, student_id):
+        return {'attendance': student_attendance(student_id), 'scores': student_scores(student_id)}
+
+    # assignments & submissions
+    def add_assignment(self, data):
+        a = Assignment(id=new_id('a'), title=data['title'], class_id=data['classId'], date=data['date'],
+                       category=data.get('category') or 'Assignment')
+        db.session.add(a)
+        db.session.commit()
+        return a.to_dict()
+
+    def delete_assignment(self, assignment_id):
+        a = db.session.get(Assignment, assignment_id)
+        if not a: return False
+        db.session.delete(a)
+        db.session.commit()
+        return True
+
+    def add_submission(self, data):
+        if not db.session.get(Assignment, data['assignmentId']): return None
+        s = Submission(id=new_id('sb'), assignment_id=data['assignmentId'], student_id=data['studentId'],
+                       file_url=data['fileUrl'], submission_date=now_timestamp())
+        db.session.add(s)
+        db.session.commit()
+        return s.to_dict()
+
+    # uploads
+    def add_upload(self, data):
+        u = Upload(id=new_id('u'), digest=data['digest'], size=data['size'], filename=data['filename'],
+                   content_type=data['contentType'], owner_id=data.get('ownerId'), created_at=now_timestamp())
+        db.session.add(u)
+        db.session.commit()
+        return u.to_dict()
+
+    def get_upload(self, upload_id):
+        u = db.session.get(Upload, upload_id)
+        return u.to_dict() if u else None
+
+    def upload_usage(self, owner_id):
+        return db.session.query(db.func.coalesce(db.func.sum(Upload.size), 0)).filter(Upload.owner_id == owner_id).scalar()
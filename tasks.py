@@ -0,0 +1,50 @@
+"""Job bodies for JobRunner (jobs.py); each takes the RunningJob handle first.
+
+`done`/`on_chunk` callbacks let the server invalidate its response cache once
+the data has actually changed, since the request that queued the job has long
+returned by then.
+"""
+from database import db, Class, Notification
+from analytics import class_attendance, class_exam_stats
+from listing import CHUNK
+
+def delete_class(job, storage, class_id, done=None):
+    try: storage.delete_class(class_id, progress=lambda n, total: job.progress(n, total=total))
+    finally:
+        if done: done()
+
+def class_report(job, class_id, date_from=None, date_to=None, period=None):
+    """The class analytics payload, computed off the request path and stored as the job result."""
+    job.progress(0, total=2)
+    attendance = class_attendance(class_id, date_from, date_to, period)
+    job.progress(1)
+    exams = class_exam_stats(class_id)
+    job.progress(2, report={'classId': class_id, 'from': date_from, 'to': date_to, 'period': period,
+                            'attendance': attendance, 'exams': exams})
+
+def notify_classes(job, storage, data, done=None):
+    """Fans a notification out to data['classNames'] (or every class for className 'All'), CHUNK rows per transaction."""
+    names = data.get('classNames') or [name for (name,) in db.session.query(Class.name).distinct()]
+    db.session.rollback()
+    job.progress(0, total=len(names))
+    try:
+        for start in range(0, len(names), CHUNK):
+            storage.add_notifications(data['message'], names[start:start + CHUNK], data.get('timestamp'))
+            job.progress(min(start + CHUNK, len(names)))
+    finally:
+        if done: done()
+
+def compact_notifications(job, storage, before, done=None):
+    """Retention: archives every notification created before `before` into the monthly summary, a chunk per transaction."""
+    total = db.session.query(db.func.count(Notification.id)).filter(Notification.created_at < before).scalar()
+    db.session.rollback()
+    archived = 0
+    job.progress(0, total=total)
+    try:
+        while True:
+            n = storage.archive_notifications(before)
+            if not n: break
+            archived += n
+            job.progress(archived, archived=archived)
+    finally:
+        if done: done()
@@ -0,0 +1,118 @@
+"""Per-teacher query scoping: every ORM query only sees the current teacher's rows.
+
+Schools are the tenants. A class belongs to a school and, optionally, to the
+teacher who owns it; unowned classes are shared by the school's teachers. A
+teacher sees their own and their school's shared classes, and through those
+classes only their students, attendance, exams, scores, assignments,
+submissions and notifications. Timetables and uploads are per school, jobs per teacher.
+A teacher who signs up gets a school of their own. Joining an existing school,
+and with it its shared classes, takes an invite (auth.py).
+
+Handlers and storage code do not filter by hand. api_auth.py enters a Scope for
+the teacher in the request's token, and a do_orm_execute hook adds the
+matching with_loader_criteria() options to every ORM SELECT, UPDATE and DELETE
+run while it is set, in subqueries and relationship loads too. The criteria
+are subqueries on class ids (ix_class_school_teacher, then the existing
+class_id indexes), so scoping costs no extra statements. Without a scope (CLI
+commands, or AUTH_REQUIRED off and no token) queries see everything, as before.
+
+The scope lives in a ContextVar. Work handed to the write queue or a background
+job is wrapped with carry(), so it runs under the submitting request's scope
+on the other thread. Streamed response bodies are iterated after the request's
+teardown has left the scope: they go through carry_iter().
+"""
+import contextvars
+from collections import namedtuple
+from functools import lru_cache
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Session, with_loader_criteria
+from database import (db, DEFAULT_SCHOOL, Assignment, Attendance, AttendanceMonth, AttendanceRollup, Class, Exam, Job,
+                      Notification, NotificationSummary, Score, Student, Submission, Teacher, Timetable, Upload)
+
+CLASS_KEYED = (Student, Attendance, AttendanceMonth, Exam, Assignment, Notification, NotificationSummary)
+
+Scope = namedtuple('Scope', 'school_id teacher_id')
+
+_current = contextvars.ContextVar('edumate_scope', default=None)  # (Scope, loader criteria) or None
+
+def current():
+    entry = _current.get()
+    return entry[0] if entry else None
+
+def scope_for(identity):
+    """The Scope of a session token's identity (tokens from before schools belong to the default one)."""
+    return Scope(identity.get('schoolId') or DEFAULT_SCHOOL, identity['id'])
+
+def enter(scope):
+    _current.set((scope, _criteria(scope)) if scope else None)
+
+def leave():
+    _current.set(None)
+
+def carry(fn):
+    """fn, wrapped to run under the current scope on whichever thread calls it."""
+    entry = _current.get()
+    def run(*args, **kwargs):
+        token = _current.set(entry)
+        try: return fn(*args, **kwargs)
+        finally: _current.reset(token)
+    return run
+
+def carry_iter(iterable):
+    """Iterates `iterable` under the current scope, one step at a time, wherever it is consumed."""
+    entry = _current.get()  # now, not on the first next()
+    def run(it):
+        while True:
+            token = _current.set(entry)
+            try: item = next(it)
+            except StopIteration: return
+            finally: _current.reset(token)
+            yield item
+    return run(iter(iterable))
+
+def school_id():
+    scope = current()
+    return scope.school_id if scope else None
+
+def teacher_id():
+    scope = current()
+    return scope.teacher_id if scope else None
+
+def owner_columns():
+    """school_id/teacher_id for a new row: the current teacher's, or the default school and no owner."""
+    return {'school_id': school_id() or DEFAULT_SCHOOL, 'teacher_id': teacher_id()}
+
+def cache_key():
+    """The part of a response cache key that varies by tenant."""
+    scope = current()
+    return f'{scope.school_id}/{scope.teacher_id}' if scope else '*'
+
+@lru_cache(maxsize=1024)  # building the options costs more than the queries they go on; a scope's never change
+def _criteria(scope):
+    # The options apply inside subqueries too, so the bare SELECTs of ids below come out narrowed
+    # to the visible classes (and their exams, assignments, students) without repeating the filter
+    visible = and_(Class.school_id == scope.school_id, or_(Class.teacher_id == scope.teacher_id, Class.teacher_id.is_(None)))
+    return (with_loader_criteria(Class, visible),
+            *(with_loader_criteria(model, model.class_id.in_(db.select(Class.id))) for model in CLASS_KEYED),
+            with_loader_criteria(Score, Score.exam_id.in_(db.select(Exam.id))),
+            with_loader_criteria(Submission, Submission.assignment_id.in_(db.select(Assignment.id))),
+            with_loader_criteria(AttendanceRollup, AttendanceRollup.student_id.in_(db.select(Student.id))),
+            with_loader_criteria(Timetable, Timetable.school_id == scope.school_id),
+            with_loader_criteria(Upload, _uploads(scope)),
+            with_loader_criteria(Job, Job.teacher_id == scope.teacher_id))
+
+def _uploads(scope):
+    # An upload belongs to its uploader's school; those from before owners were recorded, to the default one
+    same_school = Upload.owner_id.in_(db.select(Teacher.id).where(Teacher.school_id == scope.school_id))
+    return or_(same_school, Upload.owner_id.is_(None)) if scope.school_id == DEFAULT_SCHOOL else same_school
+
+def _scope_statement(state):
+    entry = _current.get()
+    if entry is None or not (state.is_select or state.is_update or state.is_delete): return
+    if state.is_column_load or state.is_relationship_load: return  # relationship loads inherit the criteria
+    state.statement = state.statement.options(*entry[1])
+
+def init_app(app):
+    if not event.contains(Session, 'do_orm_execute', _scope_statement):
+        event.listen(Session, 'do_orm_execute', _scope_statement)
+    app.teardown_request(lambda exc: leave())
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+
+def pytest_configure(config):
+    config.addinivalue_line('filterwarnings', 'ignore::sqlalchemy.exc.LegacyAPIWarning')  # Query.get(), kept by the routes
+
+@pytest.fixture
+def app(tmp_path):
+    # A file rather than 'testing''s in-memory database: background jobs write from their own thread and connection
+    return server.create_app('testing', SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'edumate.db'}",
+                             UPLOAD_DIR=str(tmp_path / 'uploads'))
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def sign_in(client, email, password='pw', invite=None):
+    """Signs a teacher up (into the invite's school, else their own) and in; -> the Authorization header for their requests."""
+    client.post('/api/signup', json={'name': email.split('@')[0], 'email': email, 'password': password, 'invite': invite})
+    token = client.post('/api/login', json={'email': email, 'password': password}).json['token']
+    return {'Authorization': 'Bearer ' + token}
+
+@pytest.fixture
+def teacher_a(client):
+    return sign_in(client, 'a@school.test')
+
+@pytest.fixture
+def teacher_b(app, client, teacher_a):
+    # A colleague of teacher_a: invited into the same school
+    return sign_in(client, 'b@school.test', invite=app.extensions['edumate']['sessions'].invite(school_of(client, 'a@school.test')))
+
+def school_of(client, email):
+    return client.post('/api/login', json={'email': email, 'password': 'pw'}).json['schoolId']
+
+def add_class(client, headers, name='A', students=2):
+    """A class owned by the teacher in `headers`, with `students` students; -> (class, [student])."""
+    cls = client.post('/api/classes', json={'name': name, 'coordinatorName': 'Coordinator'}, headers=headers).json
+    added = [client.post(f"/api/classes/{cls['id']}/students", json={'name': f'{name}{i}', 'roll': str(i)}, headers=headers).json
+             for i in range(students)]
+    return cls, added
+
+def add_exam(client, headers, class_id, title='Unit test'):
+    client.post('/api/exams', json={'title': title, 'totalMarks': 100, 'classId': class_id}, headers=headers)
+    return next(e for e in client.get('/api/exams', headers=headers).json if e['title'] == title and e['classId'] == class_id)
+
+def wait_for_job(client, headers, job):
+    for _ in range(200):
+        job = client.get(f"/api/jobs/{job['id']}", headers=headers).json
+        if job['status'] not in ('queued', 'running'): return job
+        time.sleep(0.02)
+    raise AssertionError(f'job still {job["status"]}')
@@ -0,0 +1,28 @@
+from conftest import add_class, add_exam
+
+def mark(student, date, status, period='Period 1'):
+    return {'date': date, 'studentId': student['id'], 'className': 'A', 'status': status, 'period': period}
+
+def test_class_analytics(client, teacher_a):
+    cls, (first, second, absent) = add_class(client, teacher_a, 'A', students=3)
+    client.post('/api/attendance', json=[mark(first, '12/01/2025', 'P'), mark(first, '12/02/2025', 'A'),
+                                         mark(first, '12/02/2025', 'P', 'Period 2'), mark(second, '12/01/2025', 'P')], headers=teacher_a)
+    exam = add_exam(client, teacher_a, cls['id'])
+    client.post('/api/scores', json=[{'examId': exam['id'], 'studentId': first['id'], 'marks': 80},
+                                     {'examId': exam['id'], 'studentId': second['id'], 'marks': 40},
+                                     {'examId': exam['id'], 'studentId': absent['id'], 'marks': 'AB'}], headers=teacher_a)
+
+    analytics = client.get(f"/api/classes/{cls['id']}/analytics", headers=teacher_a).json
+    attendance = {a['studentId']: (a['present'], a['total'], a['percentage']) for a in analytics['attendance']}
+    assert attendance == {first['id']: (2, 3, 66.7), second['id']: (1, 1, 100.0), absent['id']: (0, 0, 0)}
+    (stats,) = analytics['exams']
+    assert (stats['count'], stats['absent'], stats['mean'], stats['min'], stats['max']) == (2, 1, 60, 40, 80)
+    assert sum(stats['distribution']) == 2 and stats['distribution'][8] == 1
+
+    narrowed = client.get(f"/api/classes/{cls['id']}/analytics?from=12/02/2025&period=Period 1", headers=teacher_a).json
+    assert {a['studentId']: (a['present'], a['total']) for a in narrowed['attendance']}[first['id']] == (0, 1)
+
+def test_class_analytics_errors(client, teacher_a):
+    cls, _ = add_class(client, teacher_a, 'A')
+    assert client.get('/api/classes/nope/analytics', headers=teacher_a).status_code == 404
+    assert client.get(f"/api/classes/{cls['id']}/analytics?from=someday", headers=teacher_a).status_code == 400
@@ -0,0 +1,35 @@
+from analytics import submission_matrix
+from conftest import add_class
+from database import db, Submission
+
+def add_assignment(client, headers, class_id, title, due):
+    return client.post('/api/assignments', json={'title': title, 'classId': class_id, 'date': due}, headers=headers).json
+
+def test_submission_matrix(app, client, teacher_a):
+    cls, (first, second) = add_class(client, teacher_a, 'A')
+    past = add_assignment(client, teacher_a, cls['id'], 'Essay', '01/10/2025')
+    future = add_assignment(client, teacher_a, cls['id'], 'Project', '02/10/2025')
+    with app.app_context():
+        db.session.add_all([Submission(id='sb1', assignment_id=past['id'], student_id=first['id'], submission_date='01/09/2025, 10:00:00'),
+                            Submission(id='sb2', assignment_id=past['id'], student_id=first['id'], submission_date='01/12/2025, 10:00:00'),
+                            Submission(id='sb3', assignment_id=future['id'], student_id=second['id'], submission_date='01/11/2025, 09:00:00'),
+                            Submission(id='sb4', assignment_id=future['id'], student_id=first['id'], submission_date='02/11/2025, 09:00:00')])
+        db.session.commit()
+        matrix = submission_matrix(cls['id'], today='20250115')
+    statuses = {s['studentId']: s['statuses'] for s in matrix['students']}
+    assert statuses[first['id']] == {past['id']: 'submitted', future['id']: 'late'}  # the first hand-in decides
+    assert statuses[second['id']] == {past['id']: 'missing', future['id']: 'submitted'}
+    assert [a['id'] for a in matrix['assignments']] == [past['id'], future['id']]
+    assert matrix['assignments'][0]['counts'] == {'submitted': 1, 'late': 0, 'missing': 1, 'pending': 0}
+
+def test_submission_matrix_before_the_due_date(client, teacher_a):
+    cls, (student, _) = add_class(client, teacher_a, 'A')
+    later = add_assignment(client, teacher_a, cls['id'], 'Project', '12/31/2099')
+    matrix = client.get(f"/api/classes/{cls['id']}/submissions/matrix", headers=teacher_a).json
+    assert {s['studentId']: s['statuses'] for s in matrix['students']}[student['id']] == {later['id']: 'pending'}
+    assert client.get('/api/classes/nope/submissions/matrix', headers=teacher_a).status_code == 404
+
+def test_a_class_without_assignments_lists_its_students(client, teacher_a):
+    cls, students = add_class(client, teacher_a, 'A')
+    matrix = client.get(f"/api/classes/{cls['id']}/submissions/matrix", headers=teacher_a).json
+    assert matrix['assignments'] == [] and [s['statuses'] for s in matrix['students']] == [{}, {}]
@@ -0,0 +1,59 @@
+import threading
+from sqlalchemy import event
+from conftest import add_class
+from database import db, Attendance, AttendanceRollup
+
+def save(client, headers, *records):
+    return client.post('/api/attendance', json=list(records), headers=headers)
+
+def test_save_counts_what_changed(client, teacher_a):
+    cls, (first, second) = add_class(client, teacher_a, 'A')
+    mark = lambda student, status, period=None: {'date': '12/01/2025', 'studentId': student['id'], 'className': 'A',
+                                                'status': status, 'period': period}
+    response = save(client, teacher_a, mark(first, 'A'), mark(first, 'P'), mark(second, 'P'), mark(second, 'P', 'Period 2'),
+                    dict(mark(first, 'P'), studentId='ghost'))
+    assert response.status_code == 201
+    assert {k: response.json[k] for k in ('inserted', 'updated', 'unchanged', 'skipped')} == \
+        {'inserted': 3, 'updated': 0, 'unchanged': 0, 'skipped': 1}  # the last record for a key wins
+    response = save(client, teacher_a, mark(first, 'P'), mark(second, 'A'))
+    assert (response.json['updated'], response.json['unchanged'], response.json['inserted']) == (1, 1, 0)
+    rows = client.get(f"/api/attendance?classId={cls['id']}", headers=teacher_a).json
+    assert sorted((r['studentId'], r['period'], r['status']) for r in rows) == sorted(
+        [(first['id'], 'Period 1', 'P'), (second['id'], 'Period 1', 'A'), (second['id'], 'Period 2', 'P')])
+
+def test_unreadable_date_saves_nothing(client, teacher_a):
+    cls, (student, _) = add_class(client, teacher_a, 'A')
+    good = {'date': '12/01/2025', 'studentId': student['id'], 'className': 'A', 'status': 'P'}
+    assert save(client, teacher_a, good, dict(good, date='someday')).status_code == 400
+    assert client.get(f"/api/attendance?classId={cls['id']}", headers=teacher_a).json == []
+
+def test_rollup_matches_a_recount_after_overlapping_saves(app, client, teacher_a):
+    app.config['ANALYTICS_ROLLUPS'] = True
+    cls, students = add_class(client, teacher_a, 'A')
+    record = {'date': '12/01/2025', 'studentId': students[0]['id'], 'className': 'A'}
+    writing, second_done = threading.Event(), threading.Event()
+
+    def pause_first_save(conn, cursor, statement, *args):
+        # The first save stops between reading the existing rows and writing; the second saves the same key meanwhile
+        if threading.current_thread().name == 'first' and statement.startswith('INSERT INTO attendance '):
+            writing.set()
+            second_done.wait(1)
+
+    def save(status):
+        app.test_client().post('/api/attendance', json=[dict(record, status=status)], headers=teacher_a)
+    with app.app_context(): engine = db.engine
+    event.listen(engine, 'before_cursor_execute', pause_first_save)
+    try:
+        first = threading.Thread(target=save, args=('P',), name='first')
+        first.start()
+        assert writing.wait(5)
+        save('A')
+        second_done.set()
+        first.join()
+    finally:
+        event.remove(engine, 'before_cursor_execute', pause_first_save)
+
+    with app.app_context():
+        rollup = [(r.present, r.total) for r in AttendanceRollup.query]
+        recount = [(sum(a.status == 'P' for a in Attendance.query), Attendance.query.count())]
+    assert rollup == recount
@@ -0,0 +1,50 @@
+import time
+import pytest
+from werkzeug.security import generate_password_hash
+from auth import PasswordHasher, Sessions
+from database import db, Teacher
+
+@pytest.fixture
+def later(monkeypatch):
+    """Moves the clock forward by the given number of seconds."""
+    now = time.time
+    return lambda seconds: monkeypatch.setattr(time, 'time', lambda: now() + seconds)
+
+def test_tokens_expire(later):
+    sessions = Sessions('secret', ttl=60)
+    token = sessions.issue({'id': 't1', 'name': 'A', 'email': 'a@school.test', 'schoolId': 'sch1'})
+    assert sessions.verify(token)['schoolId'] == 'sch1'
+    assert sessions.verify(token + 'x') is None
+    later(61)
+    assert sessions.verify(token) is None  # the cached verification expires with the token
+
+def test_invites_expire(later):
+    sessions = Sessions('secret', ttl=60, invite_ttl=3600)
+    invite = sessions.invite('sch1')
+    assert sessions.invited_school(invite) == 'sch1'
+    assert sessions.invited_school(sessions.issue({'id': 't1'})) is None  # a login token is not an invite
+    later(3601)
+    assert sessions.invited_school(invite) is None
+
+def test_api_needs_a_current_token(client, teacher_a, later):
+    assert client.get('/api/classes').status_code == 401
+    assert client.get('/api/classes', headers={'Authorization': 'Bearer forged'}).status_code == 401
+    assert client.get('/api/classes', headers=teacher_a).status_code == 200
+    later(12 * 3600 + 1)
+    assert client.get('/api/classes', headers=teacher_a).status_code == 401
+
+def test_passwords_are_stored_hashed_and_checked(app, client, teacher_a):
+    with app.app_context():
+        teacher = Teacher.query.filter_by(email='a@school.test').one()
+        assert teacher.password.startswith('scrypt:')
+        teacher.password = generate_password_hash('lighter', 'pbkdf2')  # the lighter method still logs in
+        db.session.commit()
+    assert client.post('/api/login', json={'email': 'A@School.test', 'password': 'lighter'}).status_code == 200
+    assert client.post('/api/login', json={'email': 'a@school.test', 'password': 'pw'}).status_code == 401
+    assert client.post('/api/login', json={'email': 'nobody@school.test', 'password': 'pw'}).status_code == 401
+
+def test_hasher_checks_a_dummy_for_unknown_users():
+    hasher = PasswordHasher(1)
+    stored = hasher.hash('pw')
+    assert hasher.verify(stored, 'pw') and not hasher.verify(stored, 'nope')
+    assert not hasher.verify(None, 'not a password')
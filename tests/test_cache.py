@@ -0,0 +1,23 @@
+import json
+import os
+import stat
+import server
+from cache import ResponseCache
+from conftest import add_class, sign_in
+
+def test_sqlite_cache_defaults_to_a_private_file_in_the_instance_folder(tmp_path):
+    backend, _ = ResponseCache._settings({'RESPONSE_CACHE': 'sqlite'}, str(tmp_path / 'instance'))
+    assert backend.path == str(tmp_path / 'instance' / 'cache.db')
+    assert stat.S_IMODE(os.stat(backend.path).st_mode) == 0o600
+
+def test_sqlite_cache_stores_json(tmp_path):
+    app = server.create_app('testing', SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'edumate.db'}", UPLOAD_DIR=str(tmp_path / 'uploads'),
+                            RESPONSE_CACHE='sqlite', RESPONSE_CACHE_PATH=str(tmp_path / 'cache.db'))
+    client = app.test_client()
+    headers = sign_in(client, 'a@school.test')
+    add_class(client, headers, 'A')
+    first, second = client.get('/api/classes', headers=headers), client.get('/api/classes', headers=headers)
+    assert second.json == first.json and second.headers['ETag'] == first.headers['ETag']
+    with app.app_context():
+        (value,) = [row[0] for row in app.extensions['response_cache'][0]._conn().execute("SELECT value FROM entries")]
+    assert json.loads(value)['mimetype'] == 'application/json'
@@ -0,0 +1,10 @@
+from conftest import add_class, wait_for_job
+from database import db, Notification
+
+def test_delete_class_removes_its_notifications(app, client, teacher_a):
+    cls, _ = add_class(client, teacher_a, 'A')
+    assert client.post('/api/notifications', json={'message': 'Trip', 'className': 'A'}, headers=teacher_a).status_code == 201
+    job = client.delete(f"/api/classes/{cls['id']}", headers=teacher_a).json['job']
+    assert wait_for_job(client, teacher_a, job)['status'] == 'done'
+    with app.app_context():
+        assert db.session.query(Notification).count() == 0
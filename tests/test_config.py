@@ -0,0 +1,39 @@
+import logging
+import sqlite3
+import pytest
+import migrate
+import server
+
+def create(tmp_path, version=None, **overrides):
+    path = tmp_path / 'edumate.db'
+    if version is not None:
+        with sqlite3.connect(path) as conn: conn.execute(f'PRAGMA user_version = {version}')
+    return server.create_app('development', SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', UPLOAD_DIR=str(tmp_path / 'uploads'),
+                             **overrides)
+
+def test_create_brings_the_schema_up_to_date(tmp_path):
+    app = create(tmp_path, SCHEMA_CHECK='create')
+    with app.app_context(): assert migrate.current_version() == migrate.LATEST
+
+def test_off_leaves_the_database_alone(tmp_path):
+    app = create(tmp_path, 0, SCHEMA_CHECK='off')
+    with app.app_context(): assert migrate.current_version() == 0
+
+def test_warn_logs_an_old_schema(tmp_path, caplog):
+    with caplog.at_level(logging.WARNING):
+        create(tmp_path, 3, SCHEMA_CHECK='warn')
+    assert f'Schema version 3, this code needs {migrate.LATEST}' in caplog.text
+
+def test_fail_refuses_an_old_schema(tmp_path):
+    with pytest.raises(RuntimeError, match='run `flask --app server bootstrap`'):
+        create(tmp_path, migrate.LATEST - 1, SCHEMA_CHECK='fail')
+    create(tmp_path, migrate.LATEST + 1, SCHEMA_CHECK='fail')  # a newer schema, mid rolling deploy
+
+def test_environments(tmp_path, monkeypatch):
+    with pytest.raises(RuntimeError, match='EDUMATE_ENV must be one of'): server.create_app('staging')
+    monkeypatch.delenv('EDUMATE_SECRET_KEY', raising=False)
+    with pytest.raises(RuntimeError, match='EDUMATE_SECRET_KEY'): server.create_app('production')
+    monkeypatch.setenv('EDUMATE_SESSION_TTL', '60')
+    monkeypatch.setenv('EDUMATE_RESPONSE_CACHE', 'off')
+    app = server.create_app('testing', RESPONSE_CACHE='memory')
+    assert (app.config['SESSION_TTL'], app.config['RESPONSE_CACHE'], app.config['TESTING']) == (60, 'memory', True)
@@ -0,0 +1,13 @@
+from conftest import add_class
+
+def published(app, type):
+    return [e for e in app.extensions['edumate']['events'].events if e.type == type]
+
+def test_attendance_publishes_only_written_records(app, client, teacher_a):
+    cls, students = add_class(client, teacher_a, 'A')
+    record = {'date': '12/01/2025', 'studentId': students[0]['id'], 'className': 'A', 'status': 'P'}
+    client.post('/api/attendance', json=[record, dict(record, studentId='ghost')], headers=teacher_a)
+    client.post('/api/attendance', json=[record], headers=teacher_a)  # unchanged
+    (event,) = published(app, 'attendance')
+    assert event.data['classId'] == cls['id']
+    assert [r['studentId'] for r in event.data['records']] == [students[0]['id']]
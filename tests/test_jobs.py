@@ -0,0 +1,43 @@
+import time
+import jobs
+import tenancy
+from conftest import add_class, wait_for_job
+from database import db, Job
+
+def submit(app, client, email, fn, *args):
+    with app.test_request_context():
+        tenancy.enter(tenancy.scope_for(client.post('/api/login', json={'email': email, 'password': 'pw'}).json))
+        return app.extensions['edumate']['jobs'].submit('test', fn, *args)
+
+def count_forever(job):
+    job.progress(0)
+    for n in range(1, 1000):
+        time.sleep(0.01)
+        job.progress(n)
+
+def test_cancel_stops_a_running_job(app, client, teacher_a, monkeypatch):
+    monkeypatch.setattr(jobs, 'FLUSH_INTERVAL', 0)
+    job = submit(app, client, 'a@school.test', count_forever)
+    assert client.post(f"/api/jobs/{job['id']}/cancel", headers=teacher_a).json['cancelRequested']
+    job = wait_for_job(client, teacher_a, job)
+    assert job['status'] == 'cancelled' and job['processed'] < 999
+    assert client.post(f"/api/jobs/{job['id']}/cancel", headers=teacher_a).status_code == 409
+
+def test_jobs_belong_to_the_teacher_who_started_them(client, teacher_a, teacher_b):
+    cls, _ = add_class(client, teacher_a, 'A')
+    job = client.post(f"/api/classes/{cls['id']}/reports", json={}, headers=teacher_a).json
+    assert wait_for_job(client, teacher_a, job)['result']['report']['classId'] == cls['id']
+    assert client.get(f"/api/jobs/{job['id']}", headers=teacher_b).status_code == 404
+    assert client.post(f"/api/jobs/{job['id']}/cancel", headers=teacher_b).status_code == 404
+    assert [j['id'] for j in client.get('/api/jobs', headers=teacher_a).json] == [job['id']]
+    assert client.get('/api/jobs', headers=teacher_b).json == []
+
+def test_a_job_whose_worker_is_gone_is_reported_failed(app, client, teacher_a):
+    job = submit(app, client, 'a@school.test', lambda job: None)
+    wait_for_job(client, teacher_a, job)
+    with app.app_context():
+        row = db.session.get(Job, job['id'])
+        row.status, row.worker = 'running', 2 ** 22 + 1  # above Linux's largest pid
+        db.session.commit()
+    job = client.get(f"/api/jobs/{job['id']}", headers=teacher_a).json
+    assert (job['status'], job['error']) == ('failed', 'worker exited before the job finished')
@@ -0,0 +1,36 @@
+import json
+from conftest import add_class
+
+def test_keyset_pages_cover_every_row_once(client, teacher_a):
+    ids = sorted(add_class(client, teacher_a, f'C{i}', students=0)[0]['id'] for i in range(5))
+    seen, cursor = [], None
+    while True:
+        page = client.get('/api/classes?limit=2' + (f'&cursor={cursor}' if cursor else ''), headers=teacher_a).json
+        seen += [c['id'] for c in page['items']]
+        cursor = page['nextCursor']
+        if cursor is None: break
+    assert seen == ids
+    assert client.get('/api/classes?limit=many', headers=teacher_a).status_code == 400
+
+def test_fields_keep_only_the_requested_keys(client, teacher_a):
+    add_class(client, teacher_a, 'A')
+    assert client.get('/api/classes?fields=id,name', headers=teacher_a).json[0].keys() == {'id', 'name'}
+
+def test_streams_hold_the_same_rows_as_the_list(client, teacher_a):
+    for i in range(3): add_class(client, teacher_a, f'C{i}')
+    listed = sorted(client.get('/api/classes', headers=teacher_a).json, key=lambda c: c['id'])
+    ndjson = client.get('/api/classes?format=ndjson', headers=teacher_a)
+    assert ndjson.mimetype == 'application/x-ndjson'
+    assert [json.loads(line) for line in ndjson.get_data(as_text=True).splitlines()] == listed
+    streamed = client.get('/api/classes?format=json-stream&fields=id', headers=teacher_a).json
+    assert streamed == [{'id': c['id']} for c in listed]
+
+def test_since_pages_do_not_skip_rows_sharing_a_timestamp(client, teacher_a):
+    add_class(client, teacher_a, 'A', students=0)
+    for message in ('one', 'two', 'three'):
+        client.post('/api/notifications', json={'message': message, 'className': 'A', 'timestamp': '12/01/2025, 08:00:00'},
+                    headers=teacher_a)
+    first = client.get('/api/notifications?since=2025-01-01T00:00:00&limit=2', headers=teacher_a).json
+    rest = client.get(f"/api/notifications?since={first['nextCursor']}&limit=2", headers=teacher_a).json
+    assert sorted(n['message'] for n in first['items'] + rest['items']) == ['one', 'three', 'two']
+    assert client.get('/api/notifications?since=yesterday', headers=teacher_a).status_code == 400
@@ -0,0 +1,72 @@
+import threading
+from storage import MemoryStorage, StaleVersion
+
+def filled_store():
+    store = MemoryStorage()
+    cls = store.add_class({'name': 'A'})
+    students = [store.add_student(cls['id'], {'name': f'S{i}', 'roll': str(i)}) for i in range(3)]
+    store.save_attendance([{'date': f'12/0{d}/2025', 'studentId': s['id'], 'status': 'P'} for d in (1, 2) for s in students])
+    exam = store.add_exam({'title': 'T', 'totalMarks': 100, 'classId': cls['id']})
+    store.save_scores([{'examId': exam['id'], 'studentId': s['id'], 'marks': 50} for s in students])
+    return store, cls, students, exam
+
+def test_deleting_a_student_clears_every_index():
+    store, cls, (gone, *kept), exam = filled_store()
+    assert store.delete_student(gone['id'])
+    assert gone['id'] not in store.attendance_by_student and gone['id'] not in store.scores_by_student
+    assert all(key[1] != gone['id'] for by_date in store.attendance_by_date.values() for key in by_date)
+    assert len(store.list_attendance('12/01/2025')) == 2
+    assert {s['studentId'] for s in store.list_scores(exam['id'])} == {s['id'] for s in kept}
+    assert not store.delete_student(gone['id'])
+
+def test_lookups_by_date_class_and_range():
+    store, cls, students, _ = filled_store()
+    other = store.add_class({'name': 'B'})
+    store.save_attendance([{'date': '12/01/2025', 'studentId': store.add_student(other['id'], {'name': 'X'})['id'], 'status': 'A'}])
+    assert len(store.list_attendance('12/01/2025')) == 4
+    assert len(store.list_attendance(class_id=cls['id'])) == 6
+    assert len(store.list_attendance(class_id=cls['id'], date_from='12/02/2025')) == 3
+    assert store.list_attendance('01/01/2025') == []
+
+def test_deleting_an_exam_drops_its_scores():
+    store, cls, students, exam = filled_store()
+    assert store.delete_exam(exam['id'])
+    assert exam['id'] not in store.scores_by_exam
+    assert all(not by_exam for by_exam in store.scores_by_student.values())
+    assert store.delete_class(cls['id']) and store.students == {} and store.attendance == {}
+
+def test_concurrent_writers_see_one_version_each():
+    store, cls, students, exam = filled_store()
+    version, outcomes, start = store.score_sheet(exam['id'])['version'], [], threading.Barrier(8)
+    def write(marks):
+        start.wait()
+        try: outcomes.append(store.save_score_changes(exam['id'], version, [{'studentId': students[0]['id'], 'marks': marks}]))
+        except StaleVersion: outcomes.append('stale')
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert sorted(outcomes, key=str) == [version + 1] + ['stale'] * 7
+    added = [threading.Thread(target=store.add_student, args=(cls['id'], {'name': f'N{i}'})) for i in range(50)]
+    for t in added: t.start()
+    for t in added: t.join()
+    assert len(store.get_class(cls['id'])['students']) == 53
+
+def test_delete_class_removes_its_assignments_and_notifications():
+    store = MemoryStorage()
+    cls = store.add_class({'name': 'A'})
+    store.add_class({'name': 'B'})
+    store.add_assignment({'title': 'Essay', 'className': 'A', 'date': '12/01/2025'})
+    kept = store.add_assignment({'title': 'Lab', 'className': 'B', 'date': '12/01/2025'})
+    store.add_notification({'message': 'Trip', 'className': 'A'})
+    notice = store.add_notification({'message': 'Exam', 'className': 'B'})
+    assert store.delete_class(cls['id'])
+    assert store.list_assignments() == [kept]
+    assert store.list_notifications() == [notice]
+    assert store.add_notification({'message': 'Trip', 'className': 'A'}) is None
+
+def test_notifications_need_a_class():
+    store = MemoryStorage()
+    assert store.add_notification({'message': 'Trip', 'className': 'Nobody'}) is None
+    first, second = store.add_class({'name': 'A'}), store.add_class({'name': 'A'})
+    assert store.add_notification({'message': 'Trip', 'className': 'A'})['classId'] == min(first['id'], second['id'])
+    assert store.list_notifications()[0]['className'] == 'A'
@@ -0,0 +1,104 @@
+import sqlite3
+import pytest
+import migrate
+import server
+from conftest import sign_in
+from database import db, DEFAULT_SCHOOL, Attendance, Class, Notification, Score, Teacher, Timetable
+
+# The tables as the first release created them: free-text dates, times and marks, and no assignment columns
+BASELINE = '''
+CREATE TABLE teacher (id VARCHAR(80) PRIMARY KEY, name VARCHAR(120) NOT NULL, email VARCHAR(120) NOT NULL UNIQUE,
+                      password VARCHAR(120) NOT NULL, notepad TEXT);
+CREATE TABLE class (id VARCHAR(80) PRIMARY KEY, name VARCHAR(120) NOT NULL, coordinator_name VARCHAR(120) NOT NULL,
+                    coordinator_phone VARCHAR(20));
+CREATE TABLE student (id VARCHAR(80) PRIMARY KEY, name VARCHAR(120) NOT NULL, roll VARCHAR(20) NOT NULL, email VARCHAR(120),
+                      status VARCHAR(50), phone VARCHAR(20), parent_phone VARCHAR(20), address TEXT, previous_marks TEXT,
+                      class_id VARCHAR(80) NOT NULL REFERENCES class (id));
+CREATE TABLE timetable (id VARCHAR(80) PRIMARY KEY, day VARCHAR(20) NOT NULL, time VARCHAR(20) NOT NULL,
+                        subject VARCHAR(100) NOT NULL, teacher VARCHAR(100), location VARCHAR(100));
+CREATE TABLE notification (id VARCHAR(80) PRIMARY KEY, message VARCHAR(500) NOT NULL, class_name VARCHAR(100) NOT NULL,
+                           timestamp VARCHAR(50) NOT NULL);
+CREATE TABLE attendance (id INTEGER PRIMARY KEY, date VARCHAR(20) NOT NULL, student_id VARCHAR(80) NOT NULL REFERENCES student (id),
+                         student_name VARCHAR(120) NOT NULL, class_name VARCHAR(120) NOT NULL, status VARCHAR(10) NOT NULL,
+                         period VARCHAR(50));
+CREATE TABLE exam (id VARCHAR(80) PRIMARY KEY, title VARCHAR(100) NOT NULL, total_marks INTEGER NOT NULL,
+                   class_id VARCHAR(80) NOT NULL REFERENCES class (id));
+CREATE TABLE score (id INTEGER PRIMARY KEY, exam_id VARCHAR(80) NOT NULL REFERENCES exam (id),
+                    student_id VARCHAR(80) NOT NULL REFERENCES student (id), marks_obtained VARCHAR(20));
+CREATE TABLE assignment (id VARCHAR(80) PRIMARY KEY);
+CREATE TABLE submission (id VARCHAR PRIMARY KEY, assignment_id VARCHAR REFERENCES assignment (id), file_url VARCHAR,
+                         submission_date VARCHAR, student_id VARCHAR);
+
+INSERT INTO teacher VALUES ('t1', 'Old Teacher', 'Old@School.test', 'secret', '');
+INSERT INTO class VALUES ('c1', 'Class 1', 'Coordinator', NULL);
+INSERT INTO student VALUES ('s1', 'Asha', '1', '', 'Day Scholar', '', '', '', '', 'c1'),
+                           ('s2', 'Ben', '2', '', 'Day Scholar', '', '', '', '', 'c1');
+INSERT INTO timetable VALUES ('tt1', 'Monday', '09:00', 'Maths', 'Old Teacher', 'Room 1'),
+                             ('tt2', 'Tue', '2:30 PM', 'Science', 'Old Teacher', 'Lab'),
+                             ('tt3', 'Someday', 'after lunch', 'Art', NULL, NULL);
+INSERT INTO notification VALUES ('n1', 'Trip on Friday', 'Class 1', '12/01/2025, 08:00:00');
+INSERT INTO attendance VALUES (1, '12/01/2025', 's1', 'Asha', 'Class 1', 'P', NULL),
+                              (2, '12/01/2025', 's1', 'Asha', 'Class 1', 'A', NULL),
+                              (3, 'yesterday', 's2', 'Ben', 'Class 1', 'P', 'Period 1'),
+                              (4, '13/01/2025', 'gone', 'Left', 'Class 1', 'P', NULL);
+INSERT INTO exam VALUES ('e1', 'Midterm', 100, 'c1');
+INSERT INTO score VALUES (1, 'e1', 's1', '72'), (2, 'e1', 's2', 'AB');
+'''
+
+@pytest.fixture
+def legacy(tmp_path):
+    path = tmp_path / 'legacy.db'
+    with sqlite3.connect(path) as conn: conn.executescript(BASELINE)
+    return server.create_app('testing', SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', SCHEMA_CHECK='off',
+                             UPLOAD_DIR=str(tmp_path / 'uploads'))
+
+def test_upgrade_from_baseline(legacy, capsys):
+    with legacy.app_context():
+        assert migrate.upgrade() == (0, migrate.LATEST)
+        migrate.report(0, migrate.LATEST)
+        assert migrate.current_version() == migrate.LATEST
+
+        assert {(t.id, t.weekday, t.start_minute) for t in Timetable.query} == {('tt1', 0, 540), ('tt2', 1, 870)}
+        assert migrate.unparsed_timetable() == [('tt3', 'Someday', 'after lunch', 'Art')]
+        (n,) = Notification.query.all()
+        assert (n.class_id, n.created_at.day) == ('c1', 1)
+        assert [(a.student_id, a.status, a.period) for a in Attendance.query] == [('s1', 'A', 'Period 1')]
+        assert {(s.student_id, s.marks_obtained, s.marker) for s in Score.query} == {('s1', 72, None), ('s2', None, 'absent')}
+        teacher = db.session.get(Teacher, 't1')
+        assert (teacher.email, teacher.school_id) == ('old@school.test', DEFAULT_SCHOOL)
+        assert teacher.password != 'secret'
+        assert (db.session.get(Class, 'c1').school_id, db.session.get(Class, 'c1').teacher_id) == (DEFAULT_SCHOOL, None)
+    out = capsys.readouterr().out
+    assert "tt3: 'Someday' 'after lunch' Art" in out
+
+def test_upgrade_keeps_unplaceable_attendance(legacy, capsys):
+    with legacy.app_context():
+        before, after = migrate.upgrade()
+        migrate.report(before, after)
+        with db.engine.connect() as conn:
+            kept = conn.exec_driver_sql("SELECT id, date, student_id, student_name FROM attendance_unparsed ORDER BY id").all()
+    assert kept == [(3, 'yesterday', 's2', 'Ben'), (4, '13/01/2025', 'gone', 'Left')]
+    assert '2 attendance rows' in capsys.readouterr().out
+
+def test_upgraded_database_serves_the_old_teacher(legacy):
+    with legacy.app_context(): migrate.upgrade()
+    client = legacy.test_client()
+    old = sign_in(client, 'OLD@school.test', password='secret')
+    assert [c['id'] for c in client.get('/api/classes', headers=old).json] == ['c1']
+    assert client.get('/api/exams/e1/stats', headers=old).json['count'] == 1
+    output = legacy.test_cli_runner().invoke(args=['bootstrap']).output
+    assert output.startswith(f'Schema version {migrate.LATEST} -> {migrate.LATEST}')
+
+def test_upgrade_hashes_passwords_and_reports_email_clashes(tmp_path, capsys):
+    path = tmp_path / 'legacy.db'
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE)
+        conn.execute("INSERT INTO teacher VALUES ('t2', 'Same Teacher', 'old@school.test', 'other', '')")
+    app = server.create_app('testing', SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', SCHEMA_CHECK='off', UPLOAD_DIR=str(tmp_path / 'uploads'))
+    with app.app_context():
+        migrate.report(*migrate.upgrade())
+        assert {t.id: t.email for t in Teacher.query} == {'t1': 'Old@School.test', 't2': 'old@school.test'}
+    assert 'cannot log in until merged: Old@School.test' in capsys.readouterr().out
+    client = app.test_client()
+    assert client.post('/api/login', json={'email': 'old@school.test', 'password': 'other'}).json['id'] == 't2'
+    assert client.post('/api/login', json={'email': 'old@school.test', 'password': 'secret'}).status_code == 401
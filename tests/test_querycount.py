@@ -0,0 +1,8 @@
+import pytest
+import querycount
+from database import db
+
+@pytest.mark.parametrize('classes, students', querycount.SIZES)
+def test_statement_counts_do_not_grow_with_the_data(app, classes, students):
+    failures = [line for ok, line in querycount.measure(app, db, classes, students) if not ok]
+    assert not failures, '\n'.join(failures)
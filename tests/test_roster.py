@@ -0,0 +1,41 @@
+import roster
+from conftest import add_class, wait_for_job
+
+CSV = '''Name,Roll,E-mail,Status
+Asha,1,asha@example.test,
+Ben,2,not-an-email,Hosteller
+,3,,
+Chen,0,,
+,,,
+Dev,4,,Hosteller
+'''
+
+def test_validate():
+    lengths = roster._lengths()
+    student, errors = roster.validate({'name': 'Asha', 'roll': '1'}, set(), lengths)
+    assert errors == [] and (student['name'], student['roll'], student['status']) == ('Asha', '1', 'Day Scholar')
+    assert roster.validate({'name': 'Ben', 'roll': '1'}, {'1'}, lengths) == (None, ['roll 1 is already used in this class'])
+    _, errors = roster.validate({'name': 'x' * 500, 'roll': '', 'email': 'nope'}, set(), lengths)
+    assert errors == ['roll is required', f"name is longer than {lengths['name']} characters", 'email is not valid']
+
+def test_import_reports_rows_it_could_not_take(client, teacher_a):
+    cls, _ = add_class(client, teacher_a, 'A', students=1)  # roll 0 is taken
+    response = client.post(f"/api/classes/{cls['id']}/students/import", data=CSV, content_type='text/csv', headers=teacher_a)
+    assert response.status_code == 202
+    job = wait_for_job(client, teacher_a, response.json)
+    assert (job['status'], job['total'], job['result']['inserted'], job['result']['errorRows']) == ('done', 6, 2, 3)
+    assert [e['row'] for e in job['result']['errors']] == [3, 4, 5]
+    (imported,) = client.get('/api/classes', headers=teacher_a).json
+    students = imported['students']
+    assert sorted((s['name'], s['status']) for s in students if s['roll'] != '0') == [('Asha', 'Day Scholar'), ('Dev', 'Hosteller')]
+
+def test_import_rejects_what_it_cannot_read(client, teacher_a):
+    cls, _ = add_class(client, teacher_a, 'A')
+    assert client.post(f"/api/classes/{cls['id']}/students/import?format=pdf", data='x', headers=teacher_a).status_code == 400
+    assert client.post('/api/classes/nope/students/import', data=CSV, content_type='text/csv', headers=teacher_a).status_code == 404
+
+def test_export_streams_the_class_roster(client, teacher_a):
+    cls, students = add_class(client, teacher_a, 'A', students=3)
+    lines = client.get(f"/api/export/students?classId={cls['id']}", headers=teacher_a).get_data(as_text=True).splitlines()
+    assert lines[0].split(',')[0] == 'id' and lines[0].endswith('classId')
+    assert sorted(line.split(',')[0] for line in lines[1:]) == sorted(s['id'] for s in students)
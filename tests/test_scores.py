@@ -0,0 +1,73 @@
+import pytest
+from conftest import add_class, add_exam
+from database import db, Score
+from storage import MemoryStorage, StaleVersion
+
+@pytest.fixture
+def sheet(client, teacher_a):
+    cls, students = add_class(client, teacher_a, 'A', students=3)
+    other, outsiders = add_class(client, teacher_a, 'B', students=1)
+    return add_exam(client, teacher_a, cls['id']), students, outsiders[0]
+
+def changes(exam, version, *cells):
+    return {'examId': exam['id'], 'version': version, 'changes': [{'studentId': s, 'marks': m} for s, m in cells]}
+
+def test_changes_against_the_current_version(client, teacher_a, sheet):
+    exam, students, _ = sheet
+    response = client.post('/api/scores', json=changes(exam, 0, (students[0]['id'], 40), (students[1]['id'], 'AB')), headers=teacher_a)
+    assert response.status_code == 201 and response.json['version'] == 1
+    scores = {s['studentId']: s for s in client.get(f"/api/exams/{exam['id']}/scores", headers=teacher_a).json['scores']}
+    assert scores[students[0]['id']]['marks'] == 40
+    assert scores[students[1]['id']]['marker'] == 'absent'
+
+def test_stale_version_gets_the_cells_written_since(client, teacher_a, sheet):
+    exam, students, _ = sheet
+    client.post('/api/scores', json=changes(exam, 0, (students[0]['id'], 40)), headers=teacher_a)
+    response = client.post('/api/scores', json=changes(exam, 0, (students[1]['id'], 70)), headers=teacher_a)
+    assert response.status_code == 409
+    assert response.json['version'] == 1
+    assert [c['studentId'] for c in response.json['changes']] == [students[0]['id']]
+    # merged and resent against the version it was told about
+    assert client.post('/api/scores', json=changes(exam, 1, (students[1]['id'], 70)), headers=teacher_a).json['version'] == 2
+    assert client.get(f"/api/exams/{exam['id']}/scores?since=1", headers=teacher_a).json['scores'][0]['studentId'] == students[1]['id']
+
+@pytest.mark.parametrize('student', ['outsider', 'ghost'])
+def test_students_outside_the_class_are_rejected(client, teacher_a, sheet, student):
+    exam, students, outsider = sheet
+    student_id = outsider['id'] if student == 'outsider' else 'ghost'
+    records = [{'examId': exam['id'], 'studentId': students[0]['id'], 'marks': 50}, {'examId': exam['id'], 'studentId': student_id, 'marks': 90}]
+    assert client.post('/api/scores', json=records, headers=teacher_a).status_code == 400
+    assert client.post('/api/scores', json=changes(exam, 0, (student_id, 90)), headers=teacher_a).status_code == 400
+    assert client.get(f"/api/exams/{exam['id']}/scores", headers=teacher_a).json == {'examId': exam['id'], 'version': 0, 'scores': []}
+    assert client.get(f"/api/exams/{exam['id']}/stats", headers=teacher_a).json['count'] == 0
+
+def test_memory_storage_rejects_students_outside_the_class():
+    store = MemoryStorage()
+    cls, other = store.add_class({'name': 'A'}), store.add_class({'name': 'B'})
+    student, outsider = store.add_student(cls['id'], {'name': 'In'}), store.add_student(other['id'], {'name': 'Out'})
+    exam = store.add_exam({'title': 'T', 'totalMarks': 100, 'classId': cls['id']})
+    with pytest.raises(ValueError): store.save_scores([{'examId': exam['id'], 'studentId': outsider['id'], 'marks': 1}])
+    with pytest.raises(ValueError): store.save_score_changes(exam['id'], 0, [{'studentId': 'ghost', 'marks': 1}])
+    assert store.save_score_changes(exam['id'], 0, [{'studentId': student['id'], 'marks': 1}]) == 1
+    with pytest.raises(StaleVersion): store.save_score_changes(exam['id'], 0, [{'studentId': student['id'], 'marks': 2}])
+
+def test_markers_round_trip_through_the_export(client, teacher_a, sheet):
+    exam, students, _ = sheet
+    client.post('/api/scores', json=changes(exam, 0, (students[0]['id'], 'AB'), (students[1]['id'], 55)), headers=teacher_a)
+    exported = client.get(f"/api/export/scores?classId={exam['classId']}", headers=teacher_a).get_data(as_text=True).splitlines()
+    assert exported[0] == 'examId,studentId,marks,marker'
+    assert f"{exam['id']},{students[0]['id']},,absent" in exported
+    records = [dict(zip(exported[0].split(','), line.split(','))) for line in exported[1:]]
+    assert client.post('/api/scores', json=records, headers=teacher_a).status_code == 201
+    scores = {s['studentId']: s for s in client.get(f"/api/exams/{exam['id']}/scores", headers=teacher_a).json['scores']}
+    assert (scores[students[0]['id']]['marker'], scores[students[1]['id']]['marks']) == ('absent', 55)
+
+def test_statistics_leave_out_students_no_longer_in_the_class(app, client, teacher_a, sheet):
+    exam, students, outsider = sheet
+    client.post('/api/scores', json=changes(exam, 0, (students[0]['id'], 40), (students[1]['id'], 'EX')), headers=teacher_a)
+    with app.app_context():  # a student deleted without their scores, and one written before writes were checked
+        db.session.add_all([Score(exam_id=exam['id'], student_id='ghost', marks_obtained=100),
+                            Score(exam_id=exam['id'], student_id=outsider['id'], marker='exempt')])
+        db.session.commit()
+    stats = client.get(f"/api/exams/{exam['id']}/stats", headers=teacher_a).json
+    assert (stats['count'], stats['exempt']) == (1, 1)
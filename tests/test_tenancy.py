@@ -0,0 +1,84 @@
+import json
+import pytest
+from conftest import add_class, school_of, sign_in
+from database import db, DEFAULT_SCHOOL, Class, Student
+
+@pytest.fixture
+def classes(client, teacher_a, teacher_b):
+    return add_class(client, teacher_a, 'A'), add_class(client, teacher_b, 'B')
+
+def test_lists_only_own_classes(client, teacher_b, classes):
+    (a, _), (b, _) = classes
+    assert [c['id'] for c in client.get('/api/classes', headers=teacher_b).json] == [b['id']]
+
+def test_other_teachers_student_is_not_found(client, teacher_b, classes):
+    (_, a_students), _ = classes
+    student_id = a_students[0]['id']
+    assert client.put(f'/api/students/{student_id}', json={'name': 'X'}, headers=teacher_b).status_code == 404
+    nobody = client.get('/api/students/nobody/analytics', headers=teacher_b).json
+    assert client.get(f'/api/students/{student_id}/analytics', headers=teacher_b).json == nobody
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'json-stream'])
+def test_streamed_list_is_scoped(client, teacher_b, classes, fmt):
+    (a, _), (b, _) = classes
+    body = client.get(f'/api/classes?format={fmt}', headers=teacher_b).get_data(as_text=True)
+    rows = [json.loads(line) for line in body.splitlines()] if fmt == 'ndjson' else json.loads(body)
+    assert [c['id'] for c in rows] == [b['id']]
+
+def test_csv_export_is_scoped(client, teacher_b, classes):
+    (a, a_students), (b, b_students) = classes
+    body = client.get('/api/export/students', headers=teacher_b).get_data(as_text=True)
+    for row in a_students: assert row['id'] not in body
+    for row in b_students: assert row['id'] in body
+
+def test_json_export_is_scoped(client, teacher_b, classes):
+    (a, a_students), (b, b_students) = classes
+    rows = [json.loads(line) for line in client.get('/api/export/students?format=ndjson', headers=teacher_b).get_data(as_text=True).splitlines()]
+    assert sorted(s['id'] for s in rows) == sorted(s['id'] for s in b_students)
+
+@pytest.fixture
+def legacy_class(app):
+    # From before schools: in the default school, with no owner
+    with app.app_context():
+        db.session.add(Class(id='c1', name='Legacy', coordinator_name='X', school_id=DEFAULT_SCHOOL))
+        db.session.add(Student(id='s1', name='Old', roll='1', class_id='c1'))
+        db.session.commit()
+
+def test_signup_ignores_school_id(client, legacy_class):
+    client.post('/api/signup', json={'name': 'S', 'email': 'stranger@evil.test', 'password': 'pw', 'schoolId': DEFAULT_SCHOOL})
+    assert school_of(client, 'stranger@evil.test') != DEFAULT_SCHOOL
+    stranger = sign_in(client, 'stranger@evil.test')
+    assert client.get('/api/classes', headers=stranger).json == []
+    assert client.put('/api/students/s1', json={'name': 'Pwned'}, headers=stranger).status_code == 404
+
+def test_invite_joins_the_school(app, client, legacy_class):
+    invite = app.extensions['edumate']['sessions'].invite(DEFAULT_SCHOOL)
+    colleague = sign_in(client, 'colleague@school.test', invite=invite)
+    assert [c['id'] for c in client.get('/api/classes', headers=colleague).json] == ['c1']
+
+def test_bad_invite_is_rejected(client):
+    response = client.post('/api/signup', json={'name': 'S', 'email': 's@school.test', 'password': 'pw', 'invite': 'forged'})
+    assert response.status_code == 400
+
+def test_invite_command(app):
+    result = app.test_cli_runner().invoke(args=['invite', DEFAULT_SCHOOL])
+    assert app.extensions['edumate']['sessions'].invited_school(result.output.strip()) == DEFAULT_SCHOOL
+    assert app.test_cli_runner().invoke(args=['invite', 'nowhere']).exit_code != 0
+
+def test_notification_needs_a_visible_class(client, teacher_a, teacher_b, classes):
+    assert client.post('/api/notifications', json={'message': 'Hi', 'className': 'A'}, headers=teacher_b).status_code == 404
+    assert client.post('/api/notifications', json={'message': 'Hi', 'classNames': ['A', 'B']}, headers=teacher_b).json['classNames'] == ['A']
+    assert client.post('/api/notifications', json={'message': 'Hi', 'className': 'B'}, headers=teacher_b).status_code == 201
+    assert [n['className'] for n in client.get('/api/notifications', headers=teacher_b).json] == ['B']
+    assert client.get('/api/notifications', headers=teacher_a).json == []
+
+def test_event_stream_is_scoped(app, client, teacher_a, teacher_b, classes):
+    (a, a_students), (b, b_students) = classes
+    since = app.extensions['edumate']['events'].last_id
+    for headers, student in ((teacher_a, a_students[0]), (teacher_b, b_students[0])):
+        client.post('/api/attendance', json=[{'date': '12/01/2025', 'studentId': student['id'], 'status': 'P'}], headers=headers)
+    response = client.get(f'/api/events?since={since}', headers=teacher_b, buffered=False)
+    chunks = (chunk.decode() for chunk in response.response)
+    event = next(chunk for chunk in chunks if chunk.startswith('id:'))
+    response.close()
+    assert json.loads(event.split('data: ', 1)[1])['classId'] == b['id']
@@ -0,0 +1,24 @@
+import io
+from conftest import sign_in
+
+def upload(client, headers, content=b'worksheet', name='sheet.pdf'):
+    return client.post('/api/upload', data={'file': (io.BytesIO(content), name)}, headers=headers,
+                       content_type='multipart/form-data')
+
+def test_upload_is_charged_to_the_token_teacher(client, teacher_a):
+    response = upload(client, teacher_a)
+    assert response.status_code == 200
+    assert response.json['ownerId'] == client.post('/api/login', json={'email': 'a@school.test', 'password': 'pw'}).json['id']
+
+def test_quota_ignores_the_owner_in_the_query(app, client, teacher_a):
+    app.config['UPLOAD_QUOTA_BYTES'] = 10
+    assert upload(client, teacher_a, b'0123456789').status_code == 200
+    response = client.post('/api/upload?ownerId=someone-else', data={'file': (io.BytesIO(b'x'), 'x.txt')}, headers=teacher_a,
+                           content_type='multipart/form-data')
+    assert response.status_code == 413
+
+def test_download_is_limited_to_the_school(client, teacher_a, teacher_b):
+    file_id = upload(client, teacher_a).json['id']
+    assert client.get(f'/api/files/{file_id}', headers=teacher_b).data == b'worksheet'  # a colleague
+    stranger = sign_in(client, 'stranger@elsewhere.test')
+    assert client.get(f'/api/files/{file_id}', headers=stranger).status_code == 404
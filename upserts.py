@@ -0,0 +1,240 @@
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.sqlite import insert
+from schedule import ScheduleIndex, check_batch
+from gradestats import record_marks
+from database import db, DATE_FORMAT, DEFAULT_PERIOD, Assignment, Attendance, AttendanceMonth, AttendanceRollup, Class, Exam, Notification, NotificationSummary, Score, Student, Submission, Timetable
+import tenancy
+from analytics import apply_attendance_deltas, bitmaps_enabled, month_bits_select, next_month, parse_date, rollups_enabled
+
+def attendance_key(r):
+    return (parse_date(r['date']), r['studentId'], r.get('period') or DEFAULT_PERIOD)
+
+def upsert_attendance(records, written=None):
+    """Writes a batch of attendance records keyed by (date, studentId, period).
+
+    The students' classes and their existing rows for the batch's dates come
+    from one outer join, to work out what changed; new and changed rows are
+    then written with a single INSERT ... ON CONFLICT DO UPDATE against
+    uq_attendance_date_student_period. Records for unknown students are
+    skipped. Nothing is committed here so the caller controls the transaction.
+    Returns a dict of inserted/updated/unchanged/skipped counts; raises
+    ValueError for an unreadable date. The records actually inserted or updated
+    are appended to `written`, with their class, for SqlStorage to publish.
+    """
+    batch = {}
+    for r in records:
+        batch[attendance_key(r)] = r  # last record for a key wins
+
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    if not batch: return counts
+
+    dates = {k[0] for k in batch}
+    student_ids = {k[1] for k in batch}
+    rows = db.session.execute(
+        db.select(Student.id, Student.class_id, Class.name.label('class_name'), Attendance.date, Attendance.period, Attendance.status)
+        .join(Class, Class.id == Student.class_id)
+        .outerjoin(Attendance, and_(Attendance.student_id == Student.id, Attendance.date.in_(dates)))
+        .where(Student.id.in_(student_ids))
+    ).all()
+    classes = {row.id: (row.class_id, row.class_name) for row in rows}
+    existing = {(row.date, row.id, row.period): row.status for row in rows if row.date is not None}
+
+    writes, deltas = [], {}
+    for key, r in batch.items():
+        if key[1] not in classes:
+            counts['skipped'] += 1
+            continue
+        status = existing.get(key)
+        if status == r['status']:
+            counts['unchanged'] += 1
+            continue
+        class_id, class_name = classes[key[1]]
+        writes.append({'date': key[0], 'student_id': key[1], 'period': key[2], 'status': r['status'], 'class_id': class_id})
+        if written is not None:
+            written.append({'classId': class_id, 'className': class_name, 'date': key[0].strftime(DATE_FORMAT),
+                            'studentId': key[1], 'period': key[2], 'status': r['status']})
+        d = deltas.setdefault((key[1], key[2]), [0, 0])
+        if status is None:
+            counts['inserted'] += 1
+            d[0] += r['status'] == 'P'; d[1] += 1
+        else:
+            counts['updated'] += 1
+            d[0] += (r['status'] == 'P') - (status == 'P')
+
+    if writes:
+        stmt = insert(Attendance)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['date', 'student_id', 'period'], set_={'status': stmt.excluded.status}), writes)
+        if bitmaps_enabled(): refresh_attendance_months({w['student_id'] for w in writes}, {w['date'] for w in writes})
+    if rollups_enabled(): apply_attendance_deltas(deltas)
+    return counts
+
+def refresh_attendance_months(student_ids, dates):
+    """Re-folds the AttendanceMonth rows of these students for the months spanning `dates`
+    with one INSERT ... SELECT ... ON CONFLICT DO UPDATE. Nothing is committed here."""
+    first = min(dates).replace(day=1)
+    stmt = insert(AttendanceMonth).from_select(
+        ['student_id', 'month', 'period', 'class_id', 'present', 'marked'],
+        month_bits_select(Attendance.student_id.in_(student_ids), Attendance.date >= first,
+                          Attendance.date < next_month(max(dates).replace(day=1))))
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['student_id', 'month', 'period'],
+        set_={'class_id': stmt.excluded.class_id, 'present': stmt.excluded.present, 'marked': stmt.excluded.marked}))
+
+class StaleVersion(Exception):
+    def __init__(self, version, changes):
+        super().__init__(f'exam sheet is at version {version}')
+        self.version, self.changes = version, changes  # current version, cells written since the caller's
+
+def _bump_versions(exam_ids):
+    """Increments the version of each exam in one UPDATE ... RETURNING; -> {exam id: new version}."""
+    return dict(db.session.execute(db.update(Exam).where(Exam.id.in_(exam_ids)).values(version=Exam.version + 1)
+                                   .returning(Exam.id, Exam.version)).all())
+
+def _write_scores(cells):
+    """cells: {(exam id, student id): (marks, marker, version)} -> one INSERT ... ON CONFLICT DO UPDATE."""
+    stmt = insert(Score)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['exam_id', 'student_id'],
+        set_={'marks_obtained': stmt.excluded.marks_obtained, 'marker': stmt.excluded.marker, 'version': stmt.excluded.version}),
+        [{'exam_id': e, 'student_id': s, 'marks_obtained': m, 'marker': k, 'version': v} for (e, s), (m, k, v) in cells.items()])
+
+def _exam_students(exam_ids, student_ids):
+    """One SELECT: {exam id: (class id, class name)} of the exams that exist (in the teacher's scope),
+    and the (exam id, student id) pairs whose student is in the exam's class."""
+    rows = db.session.execute(
+        db.select(Exam.id, Exam.class_id, Class.name.label('class_name'), Student.id.label('student_id'))
+        .join(Class, Class.id == Exam.class_id)
+        .outerjoin(Student, and_(Student.class_id == Exam.class_id, Student.id.in_(student_ids)))
+        .where(Exam.id.in_(exam_ids))
+    ).all()
+    return {r.id: (r.class_id, r.class_name) for r in rows}, {(r.id, r.student_id) for r in rows if r.student_id}
+
+def _check_students(cells, pairs):
+    outside = sorted({s for e, s in cells if (e, s) not in pairs})
+    if outside: raise ValueError(f"Not students of the exam's class: {', '.join(outside)}")
+
+def upsert_scores(records, classes=None):
+    """Writes {examId, studentId, marks} records with one INSERT ... ON CONFLICT DO UPDATE
+    against uq_score_exam_student; marks may be a number or an absent/exempt marker
+    (gradestats.record_marks, which raises ValueError). Every exam touched gets a new
+    version, unconditionally; records for unknown exams are skipped, and a student
+    outside the exam's class is a ValueError. Nothing is committed here. Returns the
+    number of records written; `classes` gets {exam id: (class id, class name)}."""
+    batch = {(r['examId'], r['studentId']): record_marks(r) for r in records}
+    if not batch: return 0
+    exams, pairs = _exam_students({e for e, _ in batch}, {s for _, s in batch})
+    batch = {(e, s): marks for (e, s), marks in batch.items() if e in exams}
+    if not batch: return 0
+    _check_students(batch, pairs)
+    if classes is not None: classes.update(exams)
+    versions = _bump_versions(set(exams))
+    _write_scores({(e, s): (m, k, versions[e]) for (e, s), (m, k) in batch.items()})
+    return len(batch)
+
+def apply_score_changes(exam_id, version, changes, classes=None):
+    """Writes the changed cells [{studentId, marks}] of one exam sheet if it is still at `version`.
+
+    The version check and bump are one conditional UPDATE, so of two editors
+    holding the same version exactly one wins; the other gets StaleVersion with
+    the cells written since, to merge and resend. Nothing is committed here.
+    Returns the new version, or None if there is no such exam; a student outside
+    the exam's class is a ValueError. `classes` gets {exam id: (class id, class name)}.
+    """
+    cells = {c['studentId']: record_marks(c) for c in changes}
+    exams, pairs = _exam_students({exam_id}, set(cells))
+    if exam_id not in exams: return None
+    _check_students({(exam_id, s) for s in cells}, pairs)
+    if classes is not None: classes.update(exams)
+    new = db.session.execute(db.update(Exam).where(Exam.id == exam_id, Exam.version == version)
+                             .values(version=Exam.version + 1).returning(Exam.version)).scalar()
+    if new is None:
+        current = db.session.execute(db.select(Exam.version).where(Exam.id == exam_id)).scalar()
+        if current is None: return None
+        raise StaleVersion(current, [s.to_dict() for s in
+                                     Score.query.filter(Score.exam_id == exam_id, Score.version > version).order_by(Score.version)])
+    if cells: _write_scores({(exam_id, s): (m, k, new) for s, (m, k) in cells.items()})
+    return new
+
+def insert_students(class_id, students):
+    """Inserts already validated student dicts (column names as keys) into class_id with one
+    executemany INSERT. Nothing is committed here. Returns the number of rows written."""
+    if not students: return 0
+    db.session.execute(insert(Student), [{**s, 'class_id': class_id} for s in students])
+    return len(students)
+
+def _delete(model, *where):
+    db.session.execute(db.delete(model).where(*where).execution_options(synchronize_session=False))
+
+def delete_students(student_ids):
+    """Bulk-deletes students and their scores, attendance, rollups and bitmaps (the ORM cascade,
+    without loading any rows). Nothing is committed here."""
+    for model in (Score, Attendance, AttendanceRollup, AttendanceMonth):
+        _delete(model, model.student_id.in_(student_ids))
+    _delete(Student, Student.id.in_(student_ids))
+
+def delete_class_rows(class_id):
+    """Bulk-deletes a class, its exams, assignments and their scores and submissions, and its
+    notifications and their summaries, once its students are gone. Nothing is committed here."""
+    exam_ids = db.select(Exam.id).where(Exam.class_id == class_id)
+    _delete(Score, Score.exam_id.in_(exam_ids))
+    _delete(Exam, Exam.class_id == class_id)
+    _delete(Submission, Submission.assignment_id.in_(db.select(Assignment.id).where(Assignment.class_id == class_id)))
+    _delete(Assignment, Assignment.class_id == class_id)
+    _delete(Notification, Notification.class_id == class_id)
+    _delete(NotificationSummary, NotificationSummary.class_id == class_id)
+    _delete(Class, Class.id == class_id)
+
+def insert_notifications(notifications):
+    """Inserts notification dicts (column names as keys) with one executemany INSERT. Nothing is committed here."""
+    if notifications: db.session.execute(insert(Notification), notifications)
+    return len(notifications)
+
+def archive_notifications(before, limit):
+    """Folds up to `limit` of the oldest notifications created before `before` into NotificationSummary
+    (one row per class name and month) and deletes them. Nothing is committed here. Returns how many."""
+    rows = db.session.execute(
+        db.select(Notification.id, Notification.class_name, Notification.class_id, Notification.created_at)
+        .where(Notification.created_at < before).order_by(Notification.created_at).limit(limit)
+    ).all()
+    if not rows: return 0
+    summary = {}
+    for r in rows:
+        s = summary.setdefault((r.class_name, r.created_at.strftime('%Y-%m')), {
+            'class_name': r.class_name, 'month': r.created_at.strftime('%Y-%m'), 'class_id': r.class_id,
+            'count': 0, 'first_at': r.created_at, 'last_at': r.created_at})
+        s['count'] += 1
+        s['first_at'], s['last_at'] = min(s['first_at'], r.created_at), max(s['last_at'], r.created_at)
+    stmt = insert(NotificationSummary)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['class_name', 'month'], set_={
+        'count': NotificationSummary.count + stmt.excluded.count,
+        'class_id': db.func.coalesce(NotificationSummary.class_id, stmt.excluded.class_id),
+        'first_at': db.func.min(NotificationSummary.first_at, stmt.excluded.first_at),
+        'last_at': db.func.max(NotificationSummary.last_at, stmt.excluded.last_at)}), list(summary.values()))
+    _delete(Notification, Notification.id.in_([r.id for r in rows]))
+    return len(rows)
+
+def insert_timetable(entries, replace=False):
+    """Inserts parsed schedule entries (schedule.parse_entry) after checking them for double-bookings
+    against the stored timetable, or against nothing when `replace` empties it first, and against each
+    other. Only the teacher and location days the batch touches are loaded (through the slot indexes).
+    Raises schedule.ScheduleConflict before writing anything. Nothing is committed here."""
+    if replace:
+        db.session.execute(db.delete(Timetable))
+        existing = []
+    else:
+        days = {e['weekday'] for e in entries}
+        teachers = {e['teacher'] for e in entries if e['teacher']}
+        locations = {e['location'] for e in entries if e['location']}
+        existing = db.session.execute(
+            db.select(Timetable.id, Timetable.weekday, Timetable.start_minute.label('start'), Timetable.end_minute.label('end'),
+                      Timetable.teacher, Timetable.location)
+            .where(or_(and_(Timetable.teacher.in_(teachers), Timetable.weekday.in_(days)),
+                       and_(Timetable.location.in_(locations), Timetable.weekday.in_(days))))
+        ).mappings().all()
+    check_batch(ScheduleIndex(existing), entries)
+    school_id = tenancy.owner_columns()['school_id']
+    db.session.execute(insert(Timetable), [
+        {'id': e['id'], 'school_id': school_id, 'weekday': e['weekday'], 'start_minute': e['start'], 'end_minute': e['end'],
+         'subject': e['subject'], 'teacher': e['teacher'], 'location': e['location']} for e in entries])
+    return len(entries)
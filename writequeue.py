@@ -0,0 +1,68 @@
+"""Single-writer queue for SQLite.
+
+Request threads hand their write work to WriteQueue.run() instead of opening
+their own write transactions. One writer thread per process drains the queue,
+grouping whatever arrived within WRITE_QUEUE_LINGER_MS (up to
+WRITE_QUEUE_BATCH jobs) into one BEGIN IMMEDIATE transaction. Each job runs in
+its own SAVEPOINT, so a failing job is rolled back and reported to its caller
+without affecting the rest of the batch, and the whole batch costs one commit
+(one WAL fsync) instead of one per request.
+
+Jobs are plain functions that write through db.session without committing, e.g.
+upserts.upsert_attendance. Requires the 'production' DATABASE_PROFILE (dbprofile.py),
+which makes SQLite savepoints and BEGIN IMMEDIATE work.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class WriteQueue:
+    def __init__(self, app, db, max_batch=64, linger=0.002):
+        self.app, self.db = app, db
+        self.max_batch, self.linger = max_batch, linger
+        self.jobs = queue.Queue()
+        self.thread = None  # started by the first write, in the process that serves (gunicorn --preload forks after create_app)
+        self.lock = threading.Lock()
+
+    def run(self, fn, *args, timeout=30):
+        """Runs fn(*args) inside the next write batch and returns its result (or raises its exception)."""
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name='edumate-writer', daemon=True)
+                    self.thread.start()
+        future = Future()
+        self.jobs.put((fn, args, future))
+        return future.result(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.jobs.get()]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try: batch.append(self.jobs.get(timeout=remaining) if remaining > 0 else self.jobs.get_nowait())
+                except queue.Empty: break
+            self._apply(batch)
+
+    def _apply(self, batch):
+        outcomes = []
+        with self.app.app_context():
+            session = self.db.session
+            try:
+                session.connection(execution_options={'sqlite_immediate': True})
+                for fn, args, future in batch:
+                    try:
+                        with session.begin_nested():
+                            outcomes.append((future, fn(*args), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+                session.commit()
+            except Exception as exc:
+                session.rollback()
+                for _, _, future in batch: future.set_exception(exc)
+                return
+        for future, result, exc in outcomes:
+            if exc is not None: future.set_exception(exc)
+            else: future.set_result(result)